@@ -0,0 +1,69 @@
+# diff_engines.py
+# Benchmark of the diff engines against difflib on large inputs.
+#
+# From the root directory, run:
+# python -m benchmarks.diff_engines [--lines N] [--repeat N]
+
+import argparse
+import difflib
+import random
+import time
+from src.diff_engines import ENGINES, unified_diff
+
+def source_like(lines, rng):
+    """Mostly distinct lines, like source code."""
+    return [f"    value_{i} = compute({rng.randint(0, 1000)}, '{i:x}')" for i in range(lines)]
+
+def lockfile_like(lines, rng):
+    """Lines from a small vocabulary repeated throughout, like lockfiles and generated data."""
+    vocabulary = [f"  integrity sha512-{rng.getrandbits(64):016x}" for _ in range(lines // 400)]
+    vocabulary += ["  dependencies:", "    tslib: ^2.0.0", "  resolved: true", ""]
+    return [rng.choice(vocabulary) for _ in range(lines)]
+
+def edit(lines, rng, changes):
+    """Replace, insert and delete a number of scattered lines."""
+    edited = list(lines)
+    for _ in range(changes):
+        position = rng.randrange(len(edited))
+        action = rng.random()
+        if action < 0.4:
+            edited[position] = f"changed {rng.getrandbits(32):08x}"
+        elif action < 0.7:
+            edited.insert(position, f"inserted {rng.getrandbits(32):08x}")
+        else:
+            del edited[position]
+    return edited
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the diff engines against difflib.")
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    cases = [
+        ("source, 1% edited", source_like, args.lines // 100),
+        ("source, 10% edited", source_like, args.lines // 10),
+        ("lockfile, 1% edited", lockfile_like, args.lines // 100),
+    ]
+    print(f"{'case':<22}{'engine':<12}{'seconds':>10}{'speedup':>10}{'diff lines':>12}")
+    for name, generate, changes in cases:
+        old = generate(args.lines, rng)
+        new = edit(old, rng, changes)
+        baseline, _ = timed(lambda: list(difflib.unified_diff(old, new, lineterm='', n=0)), args.repeat)
+        print(f"{name:<22}{'(stdlib)':<12}{baseline:>10.2f}{1:>10.1f}")
+        for engine in ENGINES:
+            seconds, diff = timed(lambda: list(unified_diff(old, new, lineterm='', n=0, engine=engine)), args.repeat)
+            print(f"{'':<22}{engine:<12}{seconds:>10.2f}{baseline / seconds:>10.1f}{len(diff):>12}")
+
+if __name__ == "__main__":
+    main()
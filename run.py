@@ -1,4 +1,8 @@
-from src.main import main
+import multiprocessing
+import sys
+from src.cli import main
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Worker processes of a frozen build start by running the application again
+    multiprocessing.freeze_support()
+    sys.exit(main())
\ No newline at end of file
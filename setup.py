@@ -11,7 +11,7 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "llm-coding-toolset=src.main:main",
+            "llm-coding-toolset=src.cli:main",
         ],
     },
     include_package_data=True,
@@ -0,0 +1,79 @@
+# cli.py
+# This module provides the command line entry point: headless subcommands, or the GUI by default.
+#
+# Subcommands only import Qt-free modules, so they start quickly and work without a display.
+
+import argparse
+import multiprocessing
+import os
+import sys
+from src.export import FileSink, StdoutSink
+from src.file_index import FileIndex
+from src.folder_core import export_folder
+from src.ignore_rules import DEFAULT_IGNORE_PATTERNS, IgnoreMatcher
+from src.parallel import DEFAULT_READER_WORKERS, MAX_READER_WORKERS, ReaderPool
+
+SUBCOMMANDS = ("export",)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="llm-coding-toolset",
+                                     description="Run without arguments to start the graphical interface.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export the structure of a folder")
+    export_parser.add_argument("folder", help="The folder to export")
+    export_parser.add_argument("--depth", type=int, default=3, choices=range(1, 11), metavar="N",
+                               help="Number of levels to include, 1 to 10 (default: 3)")
+    export_parser.add_argument("--contents", action="store_true", help="Include the contents of every file")
+    export_parser.add_argument("--out", metavar="FILE", help="Write to a file instead of standard output")
+    export_parser.add_argument("--ignore", action="append", default=[], metavar="PATTERN",
+                               help="Additional pattern to ignore, in .gitignore syntax (repeatable)")
+    export_parser.add_argument("--no-default-ignores", action="store_true",
+                               help="Do not ignore " + ", ".join(DEFAULT_IGNORE_PATTERNS))
+    export_parser.add_argument("--no-gitignore", action="store_true", help="Do not honour .gitignore files")
+    export_parser.add_argument("--workers", type=int, default=DEFAULT_READER_WORKERS,
+                               help=f"Number of threads reading files, 1 to {MAX_READER_WORKERS} "
+                                    f"(default: {DEFAULT_READER_WORKERS})")
+    return parser
+
+def run_export(args):
+    if not os.path.isdir(args.folder):
+        print(f"Not a folder: {args.folder}", file=sys.stderr)
+        return 1
+
+    patterns = ([] if args.no_default_ignores else list(DEFAULT_IGNORE_PATTERNS)) + args.ignore
+    matcher = IgnoreMatcher(args.folder, patterns, not args.no_gitignore)
+    file_index = FileIndex.open_default() if args.contents else None
+    reader_pool = ReaderPool(args.workers)
+    try:
+        try:
+            sink = FileSink(args.out) if args.out else StdoutSink()
+        except OSError as e:
+            print(f"Cannot write to {args.out}: {e}", file=sys.stderr)
+            return 1
+        with sink:
+            export_folder(args.folder, sink, args.depth, args.contents, file_index, reader_pool, matcher)
+            if not args.out:
+                sink.write("\n")
+    finally:
+        reader_pool.shutdown()
+        if file_index is not None:
+            file_index.close()
+    return 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in SUBCOMMANDS and argv[0] not in ("-h", "--help"):
+        # The GUI is only imported when it is started
+        from src.main import main as gui_main
+        return gui_main()
+
+    args = build_parser().parse_args(argv)
+    if args.command == "export":
+        return run_export(args)
+    return 2
+
+if __name__ == "__main__":
+    # Worker processes of a frozen build start by running the application again
+    multiprocessing.freeze_support()
+    sys.exit(main())
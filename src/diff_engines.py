@@ -0,0 +1,733 @@
+# diff_engines.py
+# This module provides line diff algorithms and unified diff output for the diff viewer.
+
+import difflib
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from itertools import accumulate
+from functools import lru_cache
+
+ENGINE_DIFFLIB = "difflib"
+ENGINE_MYERS = "myers"
+ENGINE_PATIENCE = "patience"
+ENGINE_HISTOGRAM = "histogram"
+
+DEFAULT_ENGINE = ENGINE_DIFFLIB
+
+# Lines occurring more often than this on the old side are not used as histogram anchors
+HISTOGRAM_MAX_CHAIN = 64
+
+# Lines longer than this are not compared word by word
+INTRALINE_MAX_LENGTH = 1000
+
+# Number of line pairs whose changed spans are remembered
+INTRALINE_CACHE_SIZE = 4096
+
+# Tokens that are compared one-to-one for intra-line changes
+_TOKEN_PATTERN = re.compile(r"\w+|\s+|[^\w\s]")
+
+class DiffCancelled(Exception):
+    """Raised when a diff is stopped through its `cancelled` callback."""
+
+def intern_lines(a, b):
+    """
+    Map the lines of two texts to integer IDs, equal lines getting equal IDs.
+
+    Comparing small integers is much cheaper than comparing strings in the inner loops.
+    """
+    ids = {}
+    a_ids = [ids.setdefault(line, len(ids)) for line in a]
+    b_ids = [ids.setdefault(line, len(ids)) for line in b]
+    return a_ids, b_ids
+
+def _bisect_split(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    Find the middle snake of the shortest edit script for a[a_lo:a_hi] and b[b_lo:b_hi].
+
+    Runs Myers' search from both ends at once in linear space. Returns the (x, y) where the
+    region is split in two, or None if the two sides have nothing in common.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    max_d = (n + m + 1) // 2
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v1 = [-1] * v_length
+    v2 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2[v_offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    k1_start = k1_end = k2_start = k2_end = 0
+    for d in range(max_d):
+        # Walk the forward path one step
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a_lo + x1] == b[b_lo + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1_end += 2
+            elif y1 > m:
+                k1_start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1 and x1 >= n - v2[k2_offset]:
+                    return a_lo + x1, b_lo + y1
+
+        # Walk the reverse path one step
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a_hi - x2 - 1] == b[b_hi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2_end += 2
+            elif y2 > m:
+                k2_start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = v_offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return a_lo + x1, b_lo + y1
+    return None
+
+def _myers_split(a, b, a_lo, a_hi, b_lo, b_hi):
+    split = _bisect_split(a, b, a_lo, a_hi, b_lo, b_hi)
+    if split is None or split in ((a_lo, b_lo), (a_hi, b_hi)):
+        return None
+    x, y = split
+    return [(a_lo, x, b_lo, y, False), (x, a_hi, y, b_hi, False)]
+
+def _patience_split(a, b, a_lo, a_hi, b_lo, b_hi):
+    """Anchor on the longest increasing run of lines that occur exactly once on both sides."""
+    counts = {}
+    for i in range(a_lo, a_hi):
+        line = a[i]
+        entry = counts.get(line)
+        counts[line] = [1, i, 0, -1] if entry is None else [entry[0] + 1, i, 0, -1]
+    for j in range(b_lo, b_hi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[2] += 1
+            entry[3] = j
+    unique = sorted((entry[1], entry[3]) for entry in counts.values() if entry[0] == 1 and entry[2] == 1)
+    if not unique:
+        return _myers_split(a, b, a_lo, a_hi, b_lo, b_hi)
+
+    # Patience sorting: the longest subsequence of pairs increasing in b
+    tails = []
+    tail_indexes = []
+    previous = [-1] * len(unique)
+    for index, (_, j) in enumerate(unique):
+        position = bisect_left(tails, j)
+        if position > 0:
+            previous[index] = tail_indexes[position - 1]
+        if position == len(tails):
+            tails.append(j)
+            tail_indexes.append(index)
+        else:
+            tails[position] = j
+            tail_indexes[position] = index
+    anchors = []
+    index = tail_indexes[-1]
+    while index != -1:
+        anchors.append(unique[index])
+        index = previous[index]
+    anchors.reverse()
+
+    pieces = []
+    i, j = a_lo, b_lo
+    for anchor_i, anchor_j in anchors:
+        pieces.append((i, anchor_i, j, anchor_j, False))
+        pieces.append((anchor_i, anchor_i + 1, anchor_j, anchor_j + 1, True))
+        i, j = anchor_i + 1, anchor_j + 1
+    pieces.append((i, a_hi, j, b_hi, False))
+    return pieces
+
+def _histogram_split(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    Anchor on the longest common run around the rarest line of the old side that also occurs on the new side.
+
+    Falls back to Myers when every common line occurs more than HISTOGRAM_MAX_CHAIN times.
+    """
+    occurrences = {}
+    for i in range(a_lo, a_hi):
+        positions = occurrences.get(a[i])
+        if positions is None:
+            occurrences[a[i]] = [i]
+        else:
+            positions.append(i)
+
+    best = None
+    best_count = HISTOGRAM_MAX_CHAIN + 1
+    best_length = 0
+    j = b_lo
+    while j < b_hi:
+        positions = occurrences.get(b[j])
+        if positions is None or len(positions) > best_count:
+            j += 1
+            continue
+        next_j = j + 1
+        for i in positions:
+            start_i, start_j = i, j
+            while start_i > a_lo and start_j > b_lo and a[start_i - 1] == b[start_j - 1]:
+                start_i -= 1
+                start_j -= 1
+            end_i, end_j = i + 1, j + 1
+            while end_i < a_hi and end_j < b_hi and a[end_i] == b[end_j]:
+                end_i += 1
+                end_j += 1
+            length = end_i - start_i
+            if len(positions) < best_count or length > best_length:
+                best = (start_i, end_i, start_j, end_j)
+                best_count = len(positions)
+                best_length = length
+            next_j = max(next_j, end_j)
+        j = next_j
+    if best is None:
+        return _myers_split(a, b, a_lo, a_hi, b_lo, b_hi)
+
+    start_i, end_i, start_j, end_j = best
+    return [(a_lo, start_i, b_lo, start_j, False),
+            (start_i, end_i, start_j, end_j, True),
+            (end_i, a_hi, end_j, b_hi, False)]
+
+def _matching_blocks(a, b, split, cancelled=None):
+    """
+    Diff two sequences of line IDs by repeatedly splitting regions, and return difflib-style matching blocks.
+
+    `split` returns the pieces of a region in order, as (a_lo, a_hi, b_lo, b_hi, is_match)
+    tuples, or None if the two sides of the region have nothing in common. An explicit stack
+    is used, so deep splits do not hit the recursion limit. `cancelled` is checked before
+    every region is split.
+    """
+    blocks = []
+    stack = [(0, len(a), 0, len(b), False)]
+    while stack:
+        if cancelled is not None and cancelled():
+            raise DiffCancelled()
+        a_lo, a_hi, b_lo, b_hi, is_match = stack.pop()
+        if is_match:
+            blocks.append((a_lo, b_lo, a_hi - a_lo))
+            continue
+
+        # The common prefix is next in order; the common suffix comes after the rest of the region
+        start = a_lo
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            a_lo += 1
+            b_lo += 1
+        if a_lo > start:
+            blocks.append((start, b_lo - (a_lo - start), a_lo - start))
+        end = a_hi
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+        if a_hi < end:
+            stack.append((a_hi, end, b_hi, b_hi + (end - a_hi), True))
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        pieces = split(a, b, a_lo, a_hi, b_lo, b_hi)
+        if pieces:
+            stack.extend(reversed(pieces))
+
+    return _merge_blocks(blocks, len(a), len(b))
+
+def _merge_blocks(blocks, a_length, b_length):
+    """Merge blocks that continue each other and add difflib's closing sentinel."""
+    merged = []
+    for i, j, size in blocks:
+        if size == 0:
+            continue
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    merged.append((a_length, b_length, 0))
+    return merged
+
+def _without_unique_lines(a, b, split, cancelled=None):
+    """
+    Diff with the lines that only occur on one side left out, then map the result back.
+
+    Such lines can never match, and dropping them keeps the edit distance the Myers search
+    has to cover small when large parts of a file were rewritten.
+    """
+    in_a = set(a)
+    in_b = set(b)
+    a_index = [i for i, line in enumerate(a) if line in in_b]
+    b_index = [j for j, line in enumerate(b) if line in in_a]
+    if len(a_index) == len(a) and len(b_index) == len(b):
+        return _matching_blocks(a, b, split, cancelled)
+
+    blocks = []
+    for i, j, size in _matching_blocks([a[i] for i in a_index], [b[j] for j in b_index], split, cancelled)[:-1]:
+        for offset in range(size):
+            original_i = a_index[i + offset]
+            original_j = b_index[j + offset]
+            if blocks and blocks[-1][0] + blocks[-1][2] == original_i and blocks[-1][1] + blocks[-1][2] == original_j:
+                blocks[-1][2] += 1
+            else:
+                blocks.append([original_i, original_j, 1])
+    return [tuple(block) for block in blocks] + [(len(a), len(b), 0)]
+
+def difflib_blocks(a, b, cancelled=None):
+    # SequenceMatcher cannot be interrupted, so it is only cancelled once it is done
+    return difflib.SequenceMatcher(None, a, b).get_matching_blocks()
+
+def myers_blocks(a, b, cancelled=None):
+    return _without_unique_lines(a, b, _myers_split, cancelled)
+
+def patience_blocks(a, b, cancelled=None):
+    return _matching_blocks(a, b, _patience_split, cancelled)
+
+def histogram_blocks(a, b, cancelled=None):
+    return _matching_blocks(a, b, _histogram_split, cancelled)
+
+# Matching block functions by engine name
+ENGINES = {
+    ENGINE_DIFFLIB: difflib_blocks,
+    ENGINE_MYERS: myers_blocks,
+    ENGINE_PATIENCE: patience_blocks,
+    ENGINE_HISTOGRAM: histogram_blocks,
+}
+
+def get_opcodes(blocks):
+    """Turn matching blocks into difflib-style (tag, i1, i2, j1, j2) opcodes."""
+    i = j = 0
+    opcodes = []
+    for block_i, block_j, size in blocks:
+        tag = ''
+        if i < block_i and j < block_j:
+            tag = 'replace'
+        elif i < block_i:
+            tag = 'delete'
+        elif j < block_j:
+            tag = 'insert'
+        if tag:
+            opcodes.append((tag, i, block_i, j, block_j))
+        i, j = block_i + size, block_j + size
+        if size:
+            opcodes.append(('equal', block_i, i, block_j, j))
+    return opcodes
+
+def group_opcodes(opcodes, n=3):
+    """Group opcodes into hunks with up to n lines of context, like SequenceMatcher.get_grouped_opcodes."""
+    codes = list(opcodes) or [('equal', 0, 1, 0, 1)]
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > n + n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+def format_range(start, stop):
+    """Format a line range the way unified diff hunk headers do."""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+def format_unified(a, b, blocks, fromfile='', tofile='', n=3, lineterm='\n'):
+    """Yield the lines of a unified diff of two lists of lines from their matching blocks."""
+    started = False
+    for group in group_opcodes(get_opcodes(blocks), n):
+        if not started:
+            started = True
+            yield f"--- {fromfile}{lineterm}"
+            yield f"+++ {tofile}{lineterm}"
+        first, last = group[0], group[-1]
+        yield f"@@ -{format_range(first[1], last[2])} +{format_range(first[3], last[4])} @@{lineterm}"
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                for line in a[i1:i2]:
+                    yield ' ' + line
+                continue
+            if tag in ('replace', 'delete'):
+                for line in a[i1:i2]:
+                    yield '-' + line
+            if tag in ('replace', 'insert'):
+                for line in b[j1:j2]:
+                    yield '+' + line
+
+def diff_blocks(a, b, engine=DEFAULT_ENGINE, cancelled=None):
+    """
+    Match the lines of two lists of lines.
+
+    Args:
+        engine (str): The name of the algorithm used to match lines; see ENGINES.
+        cancelled (callable): Polled while diffing; once it returns True, DiffCancelled is raised.
+
+    Returns:
+        list: (i, j, size) matching blocks ending with (len(a), len(b), 0), like
+            SequenceMatcher.get_matching_blocks.
+    """
+    a_ids, b_ids = intern_lines(a, b)
+    blocks = ENGINES[engine](a_ids, b_ids, cancelled)
+    if cancelled is not None and cancelled():
+        raise DiffCancelled()
+    return blocks
+
+def unified_diff(a, b, fromfile='', tofile='', n=3, lineterm='\n', engine=DEFAULT_ENGINE, cancelled=None):
+    """
+    Yield the lines of a unified diff of two lists of lines, like difflib.unified_diff.
+
+    Args:
+        engine (str): The name of the algorithm used to match lines; see ENGINES.
+        cancelled (callable): Polled while diffing; once it returns True, DiffCancelled is raised.
+    """
+    blocks = diff_blocks(a, b, engine, cancelled)
+    yield from format_unified(a, b, blocks, fromfile, tofile, n, lineterm)
+
+# Number of lines compared at a time when looking for the unchanged start and end of an edited text
+COMPARE_STEP = 1024
+
+def common_prefix_length(old, new):
+    """Count the leading lines two lists share, comparing slices a step at a time at C speed."""
+    if old is new:
+        return len(old)
+    limit = min(len(old), len(new))
+    length = 0
+    step = COMPARE_STEP
+    while length < limit:
+        end = min(length + step, limit)
+        if old[length:end] == new[length:end]:
+            length = end
+        elif step > 1:
+            step = max(1, step // 8)
+        else:
+            break
+    return length
+
+def common_suffix_length(old, new, limit):
+    """Count the trailing lines two lists share, at most limit of them."""
+    limit = min(limit, len(old), len(new))
+    if old is new:
+        return limit
+    length = 0
+    step = COMPARE_STEP
+    while length < limit:
+        end = min(length + step, limit)
+        if old[len(old) - end:len(old) - length] == new[len(new) - end:len(new) - length]:
+            length = end
+        elif step > 1:
+            step = max(1, step // 8)
+        else:
+            break
+    return length
+
+# A pending update of an IncrementalDiff: the new texts, the matches kept from the previous diff in
+# the new line numbers, the (a_lo, a_hi, b_lo, b_hi) regions left to diff again, and their total number of lines
+DiffUpdate = namedtuple("DiffUpdate", ["a", "b", "kept", "regions", "size"])
+
+def _edited_range(old, new):
+    # The (start, end) of the changed lines of the old list and how far the lines after them
+    # moved, or None if the lists are the same
+    prefix = common_prefix_length(old, new)
+    if prefix == len(old) == len(new):
+        return None
+    suffix = common_suffix_length(old, new, min(len(old), len(new)) - prefix)
+    return prefix, len(old) - suffix, len(new) - len(old)
+
+def _in_range(edit, line):
+    return edit is not None and edit[0] <= line < edit[1]
+
+def _moved(edit, line):
+    return line + edit[2] if edit is not None and line >= edit[1] else line
+
+def _touches(edit, lo, hi):
+    # Whether lines lo to hi of a new text meet its changed lines
+    return edit is not None and edit[0] <= hi and lo <= edit[1] + edit[2]
+
+class IncrementalDiff:
+    """
+    Diff of two texts that is kept up to date as they are edited.
+
+    Each text's edited range is found on its own. The matches of the previous diff outside the
+    edited ranges are kept, moved by the number of lines added or removed before them, and only
+    the unmatched regions that meet an edited range are diffed again. Editing a line of one
+    text therefore only diffs again the few lines around it, wherever it is in the file.
+
+    An update is made in three steps so that the diffing can run on another thread: plan()
+    works out what to keep and what to diff, compute() diffs, and apply() takes the result.
+
+    Args:
+        engine (str): The name of the algorithm used to match lines; see ENGINES.
+    """
+
+    def __init__(self, engine=DEFAULT_ENGINE):
+        self.engine = engine
+        self.a = []
+        self.b = []
+        self.blocks = [(0, 0, 0)]
+
+    def set_texts(self, a, b):
+        """Diff two lists of lines from scratch."""
+        self.a = []
+        self.b = []
+        self.blocks = [(0, 0, 0)]
+        self.update(a, b)
+
+    def plan(self, a, b):
+        """
+        Work out how to bring the diff up to date with new versions of the two lists of lines.
+
+        Returns:
+            DiffUpdate: The update to compute, or None if neither text changed.
+        """
+        a_edit = _edited_range(self.a, a)
+        b_edit = _edited_range(self.b, b)
+        if a_edit is None and b_edit is None:
+            return None
+
+        # Cut the matches at the edges of the edited ranges and keep the pieces outside them
+        kept = []
+        for i, j, size in self.blocks[:-1]:
+            cuts = {0, size}
+            for edit, origin in ((a_edit, i), (b_edit, j)):
+                if edit is not None:
+                    cuts.update(bound - origin for bound in edit[:2] if 0 < bound - origin < size)
+            cuts = sorted(cuts)
+            for lo, hi in zip(cuts, cuts[1:]):
+                if not _in_range(a_edit, i + lo) and not _in_range(b_edit, j + lo):
+                    kept.append((_moved(a_edit, i + lo), _moved(b_edit, j + lo), hi - lo))
+
+        # Diff again the gaps between the kept matches that meet an edited range
+        regions = []
+        a_lo = b_lo = 0
+        for i, j, size in kept + [(len(a), len(b), 0)]:
+            if (i > a_lo or j > b_lo) and (_touches(a_edit, a_lo, i) or _touches(b_edit, b_lo, j)):
+                regions.append((a_lo, i, b_lo, j))
+            a_lo, b_lo = i + size, j + size
+        size = sum(a_hi - a_lo + b_hi - b_lo for a_lo, a_hi, b_lo, b_hi in regions)
+        return DiffUpdate(a, b, kept, regions, size)
+
+    def compute(self, update, cancelled=None):
+        """
+        Diff the regions of an update. Only reads the update, so it can run on another thread.
+
+        Args:
+            cancelled (callable): Polled while diffing; once it returns True, DiffCancelled is raised.
+
+        Returns:
+            list: The matching blocks of the new texts, to pass to apply().
+        """
+        blocks = list(update.kept)
+        for a_lo, a_hi, b_lo, b_hi in update.regions:
+            a_ids, b_ids = intern_lines(update.a[a_lo:a_hi], update.b[b_lo:b_hi])
+            middle = ENGINES[self.engine](a_ids, b_ids, cancelled)
+            if cancelled is not None and cancelled():
+                raise DiffCancelled()
+            blocks.extend((i + a_lo, j + b_lo, size) for i, j, size in middle[:-1])
+        blocks.sort()
+        return _merge_blocks(blocks, len(update.a), len(update.b))
+
+    def apply(self, update, blocks):
+        """Take the texts of an update and the blocks compute() returned for it."""
+        self.a = update.a
+        self.b = update.b
+        self.blocks = blocks
+
+    def update(self, a, b):
+        """
+        Bring the diff up to date with new versions of the two lists of lines.
+
+        Returns:
+            bool: False if neither text changed.
+        """
+        update = self.plan(a, b)
+        if update is None:
+            return False
+        self.apply(update, self.compute(update))
+        return True
+
+    def unified_diff(self, fromfile='', tofile='', n=3, lineterm='\n'):
+        return format_unified(self.a, self.b, self.blocks, fromfile, tofile, n, lineterm)
+
+def _spans(opcodes, old_offsets, new_offsets):
+    old_spans = []
+    new_spans = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            continue
+        if i1 < i2:
+            old_spans.append((old_offsets[i1], old_offsets[i2]))
+        if j1 < j2:
+            new_spans.append((new_offsets[j1], new_offsets[j2]))
+    return old_spans, new_spans
+
+@lru_cache(maxsize=INTRALINE_CACHE_SIZE)
+def intraline_changes(old, new):
+    """
+    Find the changed parts of a removed line and the added line that replaced it.
+
+    Lines are compared word by word, and a word replaced by a similar one is compared
+    character by character.
+
+    Returns:
+        tuple: (old_spans, new_spans), tuples of (start, end) character ranges. Both are
+            empty for lines longer than INTRALINE_MAX_LENGTH.
+    """
+    if len(old) > INTRALINE_MAX_LENGTH or len(new) > INTRALINE_MAX_LENGTH:
+        return (), ()
+    old_tokens = _TOKEN_PATTERN.findall(old)
+    new_tokens = _TOKEN_PATTERN.findall(new)
+    old_offsets = [0]
+    for token in old_tokens:
+        old_offsets.append(old_offsets[-1] + len(token))
+    new_offsets = [0]
+    for token in new_tokens:
+        new_offsets.append(new_offsets[-1] + len(token))
+
+    old_spans = []
+    new_spans = []
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'replace' and i2 - i1 == 1 and j2 - j1 == 1:
+            word_matcher = difflib.SequenceMatcher(None, old_tokens[i1], new_tokens[j1], autojunk=False)
+            if word_matcher.ratio() >= 0.5:
+                old_start, new_start = old_offsets[i1], new_offsets[j1]
+                chars_old, chars_new = _spans(word_matcher.get_opcodes(),
+                                              range(old_start, old_offsets[i2] + 1),
+                                              range(new_start, new_offsets[j2] + 1))
+                old_spans += chars_old
+                new_spans += chars_new
+                continue
+        word_old, word_new = _spans([(tag, i1, i2, j1, j2)], old_offsets, new_offsets)
+        old_spans += word_old
+        new_spans += word_new
+    return tuple(old_spans), tuple(new_spans)
+
+# Kinds of rows of a side-by-side diff
+ROW_EQUAL = "equal"
+ROW_CHANGE = "change"
+ROW_FOLD = "fold"
+
+class HunkIndex:
+    """
+    Row layout of a side-by-side diff, with the unchanged lines away from changes folded.
+
+    The layout is a list of segments, (kind, i1, i2, j1, j2) tuples over the old and new lines.
+    Unchanged segments take a row per line, changes a row per line of their longer side, and
+    folds a single row however many lines they hide. The first row of every segment and of
+    every change is indexed, so finding the lines of a row or the next change is a binary search.
+
+    Args:
+        blocks (list): The matching blocks of the two texts, as returned by diff_blocks.
+        context (int): The number of unchanged lines shown before and after each change.
+    """
+
+    def __init__(self, blocks, context=3):
+        self.blocks = blocks
+        self.set_context(context)
+
+    def set_context(self, context):
+        """Lay the rows out again with a different number of context lines, folding expanded lines again."""
+        self.context = context
+        opcodes = get_opcodes(self.blocks)
+        segments = []
+        for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+            if tag != 'equal':
+                segments.append((ROW_CHANGE, i1, i2, j1, j2))
+                continue
+            before = context if index > 0 else 0
+            after = context if index < len(opcodes) - 1 else 0
+            if i2 - i1 <= before + after + 1:
+                segments.append((ROW_EQUAL, i1, i2, j1, j2))
+                continue
+            if before:
+                segments.append((ROW_EQUAL, i1, i1 + before, j1, j1 + before))
+            segments.append((ROW_FOLD, i1 + before, i2 - after, j1 + before, j2 - after))
+            if after:
+                segments.append((ROW_EQUAL, i2 - after, i2, j2 - after, j2))
+        self.segments = segments
+        self._index()
+
+    def _index(self):
+        sizes = [1 if kind == ROW_FOLD else max(i2 - i1, j2 - j1) for kind, i1, i2, j1, j2 in self.segments]
+        self.segment_rows = list(accumulate(sizes, initial=0))
+        self.change_rows = [row for row, segment in zip(self.segment_rows, self.segments) if segment[0] == ROW_CHANGE]
+
+    def __len__(self):
+        return self.segment_rows[-1]
+
+    def segment_at(self, row):
+        """Get the index of the segment a row belongs to, and the row's offset within it."""
+        index = bisect_right(self.segment_rows, row) - 1
+        return index, row - self.segment_rows[index]
+
+    def row(self, row):
+        """
+        Get what a row shows.
+
+        Returns:
+            tuple: (kind, old, new) with the indices of the old and new lines of the row, None
+                for the shorter side of a change. For a fold, old and new are the old and new
+                line ranges it hides.
+        """
+        index, offset = self.segment_at(row)
+        kind, i1, i2, j1, j2 = self.segments[index]
+        if kind == ROW_FOLD:
+            return kind, range(i1, i2), range(j1, j2)
+        old = i1 + offset if i1 + offset < i2 else None
+        new = j1 + offset if j1 + offset < j2 else None
+        return kind, old, new
+
+    def next_change_row(self, row):
+        """The first row of the first change starting after a row, or None."""
+        index = bisect_right(self.change_rows, row)
+        return self.change_rows[index] if index < len(self.change_rows) else None
+
+    def previous_change_row(self, row):
+        """The first row of the last change starting before a row, or None."""
+        index = bisect_left(self.change_rows, row) - 1
+        return self.change_rows[index] if index >= 0 else None
+
+    def expand(self, row, count):
+        """
+        Show up to count of the lines hidden by the fold at a row, the ones nearest to the change above it first.
+
+        Returns:
+            bool: False if the row is not a fold.
+        """
+        index, _ = self.segment_at(row)
+        kind, i1, i2, j1, j2 = self.segments[index]
+        if kind != ROW_FOLD:
+            return False
+        count = min(count, i2 - i1)
+        expanded = [(ROW_EQUAL, i1, i1 + count, j1, j1 + count)]
+        if count < i2 - i1:
+            expanded.append((ROW_FOLD, i1 + count, i2, j1 + count, j2))
+        self.segments[index:index + 1] = expanded
+        self._index()
+        return True
@@ -1,16 +1,159 @@
 # diff_viewer.py
 # This module provides a tab for comparing and visualizing differences between two texts.
 
-import difflib
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, 
-                             QPushButton, QScrollArea, QFileDialog)
-from PyQt5.QtGui import QPainter, QColor
-from PyQt5.QtCore import Qt, QRect, QSize
+import os
+import re
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QCheckBox, QSpinBox, QListWidget,
+                             QListWidgetItem, QPushButton, QFileDialog, QComboBox, QLabel,
+                             QProgressBar, QDialog, QPlainTextEdit, QMessageBox)
+from PyQt5.QtGui import QPainter, QColor, QFont, QTextCursor
+from PyQt5.QtCore import Qt, QObject, QSize, QThread, QTimer, pyqtSignal
+from src.diff_engines import (DEFAULT_ENGINE, ENGINE_DIFFLIB, ENGINE_HISTOGRAM, ENGINE_MYERS, ENGINE_PATIENCE,
+                              ROW_CHANGE, ROW_EQUAL, ROW_FOLD, DiffCancelled, HunkIndex, IncrementalDiff,
+                              diff_blocks, format_unified, intraline_changes)
+from src.export import FileSink, write_lines
+from src.file_index import KIND_BINARY, FileIndex
+from src.folder_compare import STATUS_ADDED, STATUS_MODIFIED, STATUS_REMOVED, compare_folders
+from src.folder_core import skipped_summary
+from src.ignore_rules import DEFAULT_IGNORE_PATTERNS, IgnoreMatcher
+from src.line_view import TEXT_MARGIN, TOP_MARGIN, LineView
+from src.mapped_lines import MappedLines
+from src.parallel import DEFAULT_READER_WORKERS, ReaderPool
+from src.patches import apply_hunks, apply_patch_to_folder, iter_folder_patch_lines, iter_patch_lines, parse_patch
+
+# Comparisons of at least this many lines in total are run in the background
+BACKGROUND_DIFF_MIN_LINES = 5000
+
+# Time without edits after which the auto-compare mode updates the diff, in milliseconds
+AUTO_COMPARE_DELAY = 300
+
+# Files of at least this size are memory-mapped and only previewed in the editors, in bytes
+LARGE_FILE_MIN_SIZE = 32 * 1024 * 1024
+
+# Number of lines of a memory-mapped file shown in its editor, and how many of them come before the hunk in view
+PREVIEW_LINES = 500
+PREVIEW_CONTEXT = 10
+
+# Unchanged lines shown around each change in the side-by-side view, by default
+DEFAULT_CONTEXT_LINES = 3
+
+# Letter and color of the changed files of a folder comparison, per status
+STATUS_LETTERS = {STATUS_ADDED: "A", STATUS_REMOVED: "D", STATUS_MODIFIED: "M"}
+STATUS_COLORS = {STATUS_ADDED: QColor(46, 160, 67), STATUS_REMOVED: QColor(215, 58, 73),
+                 STATUS_MODIFIED: QColor(154, 103, 0)}
+
+# Old and new start lines of a hunk header
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+
+class DiffWorker(QObject):
+    """
+    Compute a unified diff off the GUI thread.
+
+    Given an IncrementalDiff and an update planned with it, only the regions of the update are
+    diffed; the update is applied to the IncrementalDiff once the result reaches the GUI thread.
+
+    `finished` carries the generation the worker was started for, and a (lines1, lines2, blocks,
+    diff lines) tuple, or None if the worker was cancelled.
+    """
+    finished = pyqtSignal(int, object)
+
+    def __init__(self, generation, lines1, lines2, engine, live_diff=None, update=None):
+        super().__init__()
+        self.generation = generation
+        self.lines1 = lines1
+        self.lines2 = lines2
+        self.engine = engine
+        self.live_diff = live_diff
+        self.update = update
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        try:
+            if self.update is not None:
+                blocks = self.live_diff.compute(self.update, self.is_cancelled)
+            else:
+                blocks = diff_blocks(self.lines1, self.lines2, self.engine, self.is_cancelled)
+            diff = list(format_unified(self.lines1, self.lines2, blocks, lineterm='', n=0))
+            result = (self.lines1, self.lines2, blocks, diff)
+        except DiffCancelled:
+            result = None
+        self.finished.emit(self.generation, result)
+
+class FolderCompareWorker(QObject):
+    """
+    Compare two folders off the GUI thread.
+
+    `finished` carries the list of FileChange tuples, or None if the worker was cancelled.
+    """
+    finished = pyqtSignal(object)
+
+    def __init__(self, old_folder, new_folder, file_index, reader_pool, old_matcher, new_matcher):
+        super().__init__()
+        self.old_folder = old_folder
+        self.new_folder = new_folder
+        self.file_index = file_index
+        self.reader_pool = reader_pool
+        self.old_matcher = old_matcher
+        self.new_matcher = new_matcher
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        changes = compare_folders(self.old_folder, self.new_folder, self.file_index, self.reader_pool,
+                                  self.old_matcher, self.new_matcher, self.is_cancelled)
+        self.finished.emit(changes)
+
+class PatchDialog(QDialog):
+    """Dialog for pasting a unified diff and choosing whether to apply it to Text 1 or to a folder."""
+
+    APPLY_TO_TEXT = 2
+    APPLY_TO_FOLDER = 3
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Apply Patch")
+        self.resize(700, 500)
+        layout = QVBoxLayout(self)
+
+        self.patch_edit = QPlainTextEdit()
+        self.patch_edit.setPlaceholderText("Paste a unified diff here")
+        self.patch_edit.setLineWrapMode(QPlainTextEdit.NoWrap)
+        layout.addWidget(self.patch_edit)
+
+        button_layout = QHBoxLayout()
+        apply_text_button = QPushButton("Apply to Text 1")
+        apply_text_button.clicked.connect(lambda: self.done(self.APPLY_TO_TEXT))
+        apply_folder_button = QPushButton("Apply to Folder...")
+        apply_folder_button.clicked.connect(lambda: self.done(self.APPLY_TO_FOLDER))
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+        button_layout.addStretch()
+        button_layout.addWidget(apply_text_button)
+        button_layout.addWidget(apply_folder_button)
+        button_layout.addWidget(cancel_button)
+        layout.addLayout(button_layout)
 
 class DiffViewerTab(QWidget):
-    def __init__(self):
+    def __init__(self, file_index=None):
         super().__init__()
         self.layout = QVBoxLayout(self)
+        self.file_index = file_index if file_index is not None else FileIndex()
+        self.reader_pool = ReaderPool(DEFAULT_READER_WORKERS)
+        self.ignore_patterns = list(DEFAULT_IGNORE_PATTERNS)
+        self.use_gitignore = True
 
         # Create text inputs
         self.text1 = QTextEdit()
@@ -19,11 +162,13 @@ class DiffViewerTab(QWidget):
         # Create buttons
         self.load_file1_button = QPushButton("Load File 1")
         self.load_file2_button = QPushButton("Load File 2")
+        self.compare_folders_button = QPushButton("Compare Folders")
         self.compare_button = QPushButton("Compare")
 
         # Connect buttons to functions
         self.load_file1_button.clicked.connect(lambda: self.load_file(1))
         self.load_file2_button.clicked.connect(lambda: self.load_file(2))
+        self.compare_folders_button.clicked.connect(self.select_folders)
         self.compare_button.clicked.connect(self.compare_texts)
 
         # Create layout for inputs and buttons
@@ -35,70 +180,791 @@ class DiffViewerTab(QWidget):
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.load_file1_button)
         button_layout.addWidget(self.load_file2_button)
+        button_layout.addWidget(self.compare_folders_button)
+        button_layout.addWidget(QLabel("Algorithm:"))
+        self.algorithm_combo = QComboBox()
+        self.algorithm_combo.addItem("difflib", ENGINE_DIFFLIB)
+        self.algorithm_combo.addItem("Myers", ENGINE_MYERS)
+        self.algorithm_combo.addItem("Patience", ENGINE_PATIENCE)
+        self.algorithm_combo.addItem("Histogram", ENGINE_HISTOGRAM)
+        self.algorithm_combo.setCurrentIndex(self.algorithm_combo.findData(DEFAULT_ENGINE))
+        self.algorithm_combo.currentIndexChanged.connect(self.on_algorithm_changed)
+        button_layout.addWidget(self.algorithm_combo)
+        self.auto_compare_check = QCheckBox("Auto compare")
+        self.auto_compare_check.toggled.connect(self.on_auto_compare_toggled)
+        button_layout.addWidget(self.auto_compare_check)
         button_layout.addWidget(self.compare_button)
         self.layout.addLayout(button_layout)
 
-        # Create diff viewer
+        # Diff progress
+        progress_layout = QHBoxLayout()
+        self.diff_progress = QProgressBar()
+        self.diff_progress.setRange(0, 0)
+        self.diff_progress.setTextVisible(False)
+        self.diff_label = QLabel("Comparing...")
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_diff)
+        progress_layout.addWidget(self.diff_progress)
+        progress_layout.addWidget(self.diff_label)
+        progress_layout.addWidget(self.cancel_button)
+        self.layout.addLayout(progress_layout)
+        self.set_diff_controls_visible(False)
+
+        # Every comparison gets a new generation; results of older ones are dropped
+        self.diff_generation = 0
+        self.diff_worker = None
+        self.diff_threads = {}
+
+        # Auto compare: edits are collected until the texts have not changed for a moment; an
+        # update diffed in the background is kept with its IncrementalDiff until its result arrives
+        self.live_diff = None
+        self.live_update = None
+        self.auto_compare_timer = QTimer(self)
+        self.auto_compare_timer.setSingleShot(True)
+        self.auto_compare_timer.setInterval(AUTO_COMPARE_DELAY)
+        self.auto_compare_timer.timeout.connect(self.auto_compare)
+        self.text1.document().contentsChange.connect(self.on_contents_change)
+        self.text2.document().contentsChange.connect(self.on_contents_change)
+
+        # Large files are compared straight from their memory maps; the editors show a window of them
+        self.mapped_files = {1: None, 2: None}
+        self.preview_starts = {1: 0, 2: 0}
+
+        # Files the texts were loaded from, and the last comparison, for saving patches
+        self.loaded_paths = {1: None, 2: None}
+        self.current_diff = None
+
+        # Changed files of a folder comparison; a file is only diffed once it is selected
+        self.folder_panel = QWidget()
+        folder_layout = QVBoxLayout(self.folder_panel)
+        folder_layout.setContentsMargins(0, 0, 0, 0)
+        folder_status_layout = QHBoxLayout()
+        self.folder_label = QLabel()
+        self.folder_cancel_button = QPushButton("Cancel")
+        self.folder_cancel_button.clicked.connect(self.cancel_folder_compare)
+        self.close_folders_button = QPushButton("Close")
+        self.close_folders_button.clicked.connect(self.close_folder_compare)
+        folder_status_layout.addWidget(self.folder_label, 1)
+        folder_status_layout.addWidget(self.folder_cancel_button)
+        folder_status_layout.addWidget(self.close_folders_button)
+        folder_layout.addLayout(folder_status_layout)
+        self.folder_changes_list = QListWidget()
+        self.folder_changes_list.currentRowChanged.connect(self.on_folder_change_selected)
+        folder_layout.addWidget(self.folder_changes_list)
+        self.folder_panel.setVisible(False)
+        self.layout.addWidget(self.folder_panel)
+        self.folder_changes = []
+        self.folder_worker = None
+
+        # View options and change navigation
+        view_layout = QHBoxLayout()
+        self.side_by_side_check = QCheckBox("Side by side")
+        self.side_by_side_check.toggled.connect(self.on_side_by_side_toggled)
+        view_layout.addWidget(self.side_by_side_check)
+        view_layout.addWidget(QLabel("Context lines:"))
+        self.context_spin = QSpinBox()
+        self.context_spin.setRange(0, 100)
+        self.context_spin.setValue(DEFAULT_CONTEXT_LINES)
+        self.context_spin.setEnabled(False)
+        view_layout.addWidget(self.context_spin)
+        view_layout.addStretch()
+        self.save_patch_button = QPushButton("Save Patch")
+        self.save_patch_button.clicked.connect(self.save_patch)
+        self.apply_patch_button = QPushButton("Apply Patch")
+        self.apply_patch_button.clicked.connect(self.apply_patch)
+        view_layout.addWidget(self.save_patch_button)
+        view_layout.addWidget(self.apply_patch_button)
+        self.previous_change_button = QPushButton("Previous Change")
+        self.next_change_button = QPushButton("Next Change")
+        self.previous_change_button.clicked.connect(lambda: self.current_viewer().go_to_previous_change())
+        self.next_change_button.clicked.connect(lambda: self.current_viewer().go_to_next_change())
+        view_layout.addWidget(self.previous_change_button)
+        view_layout.addWidget(self.next_change_button)
+        self.layout.addLayout(view_layout)
+
+        # Create diff viewers; the side-by-side one is shown instead of the unified one when selected
         self.diff_viewer = DiffViewer()
-        scroll_area = QScrollArea()
-        scroll_area.setWidget(self.diff_viewer)
-        scroll_area.setWidgetResizable(True)
-        self.layout.addWidget(scroll_area)
+        self.diff_viewer.verticalScrollBar().valueChanged.connect(self.on_diff_scrolled)
+        self.layout.addWidget(self.diff_viewer)
+        self.side_by_side_viewer = SideBySideViewer(DEFAULT_CONTEXT_LINES)
+        self.side_by_side_viewer.setVisible(False)
+        self.context_spin.valueChanged.connect(self.side_by_side_viewer.set_context)
+        self.layout.addWidget(self.side_by_side_viewer)
+
+    def text_edit(self, text_box_number):
+        return self.text1 if text_box_number == 1 else self.text2
 
     def load_file(self, text_box_number):
         file_path, _ = QFileDialog.getOpenFileName(self, f"Select File for Text {text_box_number}")
         if file_path:
-            with open(file_path, 'r') as file:
+            self.load_path(text_box_number, file_path)
+
+        # Load a file into an editor, mapping it instead if it is large
+    def load_path(self, text_box_number, file_path, encoding=None):
+        try:
+            large = os.path.getsize(file_path) >= LARGE_FILE_MIN_SIZE
+        except OSError:
+            large = False
+        if not (large and self.load_mapped_file(text_box_number, file_path)):
+            with open(file_path, 'r', encoding=encoding) as file:
                 content = file.read()
-                if text_box_number == 1:
-                    self.text1.setPlainText(content)
-                else:
-                    self.text2.setPlainText(content)
+                self.load_text(text_box_number, content)
+        self.loaded_paths[text_box_number] = file_path
+
+    def load_text(self, text_box_number, content):
+        self.mapped_files[text_box_number] = None
+        self.loaded_paths[text_box_number] = None
+        text_edit = self.text_edit(text_box_number)
+        text_edit.setReadOnly(False)
+        text_edit.setToolTip("")
+        text_edit.setPlainText(content)
+
+        # Map a large file instead of reading it; returns False if it cannot be mapped
+    def load_mapped_file(self, text_box_number, file_path):
+        try:
+            lines = MappedLines(file_path)
+        except (OSError, ValueError):
+            return False
+        self.mapped_files[text_box_number] = lines
+        self.text_edit(text_box_number).setReadOnly(True)
+        self.show_preview(text_box_number, 0, force=True)
+        return True
+
+        # Show the window of a mapped file around a line, moving the window only if the line is outside it
+    def show_preview(self, text_box_number, line, force=False):
+        lines = self.mapped_files[text_box_number]
+        text_edit = self.text_edit(text_box_number)
+        start = self.preview_starts[text_box_number]
+        if force or not start <= line < start + PREVIEW_LINES - PREVIEW_CONTEXT:
+            start = max(0, min(line - PREVIEW_CONTEXT, len(lines) - PREVIEW_LINES))
+            self.preview_starts[text_box_number] = start
+            text_edit.setPlainText("\n".join(lines.lines(start, start + PREVIEW_LINES)))
+            text_edit.setToolTip(f"Read-only preview of lines {start + 1}-{min(len(lines), start + PREVIEW_LINES)} "
+                                 f"of {len(lines)} in {lines.path}")
+        block = text_edit.document().findBlockByNumber(line - start)
+        if block.isValid():
+            # Scroll to the end first so the line ends up at the top
+            text_edit.moveCursor(QTextCursor.End)
+            text_edit.setTextCursor(QTextCursor(block))
+            text_edit.ensureCursorVisible()
+
+        # Get the lines of a text: the mapped file if one is loaded, else the editor's text
+    def source_lines(self, text_box_number):
+        lines = self.mapped_files[text_box_number]
+        if lines is not None:
+            return lines
+        return self.text_edit(text_box_number).toPlainText().splitlines()
+
+        # Move the previews of mapped files to the hunk at the top of the diff view
+    def on_diff_scrolled(self, row):
+        if self.mapped_files[1] is None and self.mapped_files[2] is None:
+            return
+        match = HUNK_HEADER_PATTERN.match(self.diff_viewer.hunk_header(row) or "")
+        if match is None:
+            return
+        for text_box_number, start in ((1, match.group(1)), (2, match.group(2))):
+            if self.mapped_files[text_box_number] is not None:
+                self.show_preview(text_box_number, max(0, int(start) - 1))
+
+        # Ask for the original and the modified folder and compare them
+    def select_folders(self):
+        old_folder = QFileDialog.getExistingDirectory(self, "Select Original Folder")
+        if not old_folder:
+            return
+        new_folder = QFileDialog.getExistingDirectory(self, "Select Modified Folder")
+        if new_folder:
+            self.compare_folders(old_folder, new_folder)
+
+        # List the files that differ between two folders, in the background; supersedes a running folder comparison
+    def compare_folders(self, old_folder, new_folder):
+        self.cancel_folder_compare()
+        self.folder_changes = []
+        self.folder_changes_list.clear()
+        self.folder_label.setText(f"Comparing {old_folder} with {new_folder}...")
+        self.folder_cancel_button.setVisible(True)
+        self.folder_panel.setVisible(True)
+
+        thread = QThread()
+        worker = FolderCompareWorker(old_folder, new_folder, self.file_index, self.reader_pool,
+                                     IgnoreMatcher(old_folder, self.ignore_patterns, self.use_gitignore),
+                                     IgnoreMatcher(new_folder, self.ignore_patterns, self.use_gitignore))
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(self.on_folder_compare_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(self.on_diff_thread_finished)
+        self.diff_threads[thread] = worker
+        self.folder_worker = worker
+        thread.start()
 
+    def cancel_folder_compare(self):
+        if self.folder_worker is not None:
+            self.folder_worker.cancel()
+            self.folder_worker = None
+            self.folder_label.setText("Folder comparison cancelled")
+        self.folder_cancel_button.setVisible(False)
+
+    def close_folder_compare(self):
+        self.cancel_folder_compare()
+        self.folder_changes = []
+        self.folder_changes_list.clear()
+        self.folder_panel.setVisible(False)
+
+    def on_folder_compare_finished(self, changes):
+        if self.sender() is not self.folder_worker or changes is None:
+            return
+        self.folder_worker = None
+        self.folder_cancel_button.setVisible(False)
+        self.folder_changes = changes
+        counts = {status: 0 for status in STATUS_LETTERS}
+        for change in changes:
+            counts[change.status] += 1
+            item = QListWidgetItem(f"{STATUS_LETTERS[change.status]}  {change.path}")
+            item.setForeground(STATUS_COLORS[change.status])
+            item.setToolTip("\n".join(path for path in (change.old_path, change.new_path) if path))
+            self.folder_changes_list.addItem(item)
+        self.folder_label.setText(f"{len(changes)} changed files: {counts[STATUS_ADDED]} added, "
+                                  f"{counts[STATUS_REMOVED]} removed, {counts[STATUS_MODIFIED]} modified")
+
+        # Diff a changed file of the folder comparison; a missing side compares as empty
+    def on_folder_change_selected(self, row):
+        if not 0 <= row < len(self.folder_changes):
+            return
+        change = self.folder_changes[row]
+        for text_box_number, path in ((1, change.old_path), (2, change.new_path)):
+            info = self.file_index.get_for_path(path) if path is not None else None
+            if path is None:
+                self.load_text(text_box_number, "")
+            elif info is not None and info.kind == KIND_BINARY:
+                self.load_text(text_box_number, skipped_summary(info.kind, os.path.getsize(path)))
+            else:
+                try:
+                    self.load_path(text_box_number, path, info.encoding if info is not None else None)
+                except (OSError, UnicodeDecodeError) as e:
+                    self.load_text(text_box_number, f"[Cannot read file: {e}]")
+        self.compare_texts()
+
+        # Change the number of threads used to compare the files of two folders
+    def set_reader_workers(self, workers):
+        if workers == self.reader_pool.workers:
+            return
+        self.cancel_folder_compare()
+        self.reader_pool.shutdown()
+        self.reader_pool = ReaderPool(workers)
+
+        # Change the entries left out of folder comparisons
+    def set_ignore_rules(self, patterns, use_gitignore):
+        self.ignore_patterns = list(patterns)
+        self.use_gitignore = use_gitignore
+
+        # Compare the two texts, in the background unless they are small; supersedes a running comparison
     def compare_texts(self):
-        text1 = self.text1.toPlainText().splitlines()
-        text2 = self.text2.toPlainText().splitlines()
-        diff = list(difflib.unified_diff(text1, text2, lineterm='', n=0))
+        self.cancel_diff()
+        self.diff_generation += 1
+        text1 = self.source_lines(1)
+        text2 = self.source_lines(2)
+        engine = self.algorithm_combo.currentData()
+
+        if len(text1) + len(text2) < BACKGROUND_DIFF_MIN_LINES:
+            blocks = diff_blocks(text1, text2, engine)
+            self.show_diff(text1, text2, blocks, list(format_unified(text1, text2, blocks, lineterm='', n=0)))
+            return
+
+        self.start_diff_worker(DiffWorker(self.diff_generation, text1, text2, engine))
+
+        # Run a comparison on its own thread, showing the progress controls until it finishes
+    def start_diff_worker(self, worker):
+        thread = QThread()
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(self.on_diff_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(self.on_diff_thread_finished)
+        # Cancelled threads are not waited for, so keep them and their workers until they have stopped
+        self.diff_threads[thread] = worker
+        self.diff_worker = worker
+
+        self.set_diff_controls_visible(True)
+        thread.start()
+
+        # Restart the auto-compare delay on every edit
+    def on_contents_change(self, position, chars_removed, chars_added):
+        if self.auto_compare_check.isChecked():
+            self.auto_compare_timer.start()
+
+    def on_auto_compare_toggled(self, checked):
+        self.live_diff = None
+        if checked:
+            self.auto_compare()
+        else:
+            self.auto_compare_timer.stop()
+
+    def on_algorithm_changed(self):
+        self.live_diff = None
+        if self.auto_compare_check.isChecked():
+            self.auto_compare_timer.start()
+
+        # Update the diff after edits, only diffing again the region around the edited lines;
+        # the first diff and large regions are diffed in the background
+    def auto_compare(self):
+        lines1 = self.source_lines(1)
+        lines2 = self.source_lines(2)
+        if self.live_diff is None:
+            self.live_diff = IncrementalDiff(self.algorithm_combo.currentData())
+        update = self.live_diff.plan(lines1, lines2)
+        if update is None:
+            # Edited back to the texts of the last diff while a later one was still running
+            if self.live_update is not None:
+                self.cancel_diff()
+                self.diff_generation += 1
+                self.show_diff(lines1, lines2, self.live_diff.blocks, list(self.live_diff.unified_diff(lineterm='', n=0)))
+            return
+        self.cancel_diff()
+        self.diff_generation += 1
+
+        if update.size >= BACKGROUND_DIFF_MIN_LINES:
+            self.live_update = (self.live_diff, update)
+            self.start_diff_worker(DiffWorker(self.diff_generation, lines1, lines2, self.live_diff.engine,
+                                              self.live_diff, update))
+            return
+        self.live_diff.apply(update, self.live_diff.compute(update))
+        self.show_diff(lines1, lines2, self.live_diff.blocks, list(self.live_diff.unified_diff(lineterm='', n=0)))
+
+        # Stop the running comparison without waiting for it; its result will be ignored
+    def cancel_diff(self):
+        if self.diff_worker is not None:
+            self.diff_worker.cancel()
+            self.diff_worker = None
+        self.live_update = None
+        self.set_diff_controls_visible(False)
+
+        # Stop all comparisons and wait for their threads, before the tab is closed; the threads
+        # are still let go of by on_diff_thread_finished
+    def shutdown(self):
+        self.cancel_diff()
+        self.cancel_folder_compare()
+        for thread, worker in list(self.diff_threads.items()):
+            worker.cancel()
+            thread.quit()
+            thread.wait()
+        self.reader_pool.shutdown()
+
+    def set_diff_controls_visible(self, visible):
+        self.diff_progress.setVisible(visible)
+        self.diff_label.setVisible(visible)
+        self.cancel_button.setVisible(visible)
+
+    def on_diff_thread_finished(self):
+        thread = self.sender()
+        # finished is emitted just before the thread exits
+        thread.wait()
+        self.diff_threads.pop(thread, None)
+
+    def on_diff_finished(self, generation, result):
+        if generation != self.diff_generation or result is None:
+            return
+        if self.live_update is not None:
+            live_diff, update = self.live_update
+            live_diff.apply(update, result[2])
+            self.live_update = None
+        self.diff_worker = None
+        self.set_diff_controls_visible(False)
+        self.show_diff(*result)
+
+        # Show a comparison in both viewers; only the visible one is painted
+    def show_diff(self, lines1, lines2, blocks, diff):
+        self.current_diff = (lines1, lines2, blocks)
         self.diff_viewer.set_diff(diff)
+        self.side_by_side_viewer.set_diff(lines1, lines2, blocks)
+
+        # Save the changed files of the folder comparison, or else the last comparison, as a unified patch
+    def save_patch(self):
+        if not self.folder_changes and self.current_diff is None:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Patch", "", "Patch Files (*.patch *.diff);;All Files (*)")
+        if not file_path:
+            return
+        engine = self.algorithm_combo.currentData()
+        if self.folder_changes:
+            lines = iter_folder_patch_lines(self.folder_changes, self.file_index, engine)
+        else:
+            lines1, lines2, blocks = self.current_diff
+            lines = iter_patch_lines(lines1, lines2, self.patch_path(1, "a"), self.patch_path(2, "b"), blocks)
+        with FileSink(file_path) as sink:
+            if write_lines(lines, sink):
+                sink.write("\n")
+
+        # Name of a text in patch headers: the name of the file it was loaded from, if any
+    def patch_path(self, text_box_number, prefix):
+        path = self.loaded_paths[text_box_number]
+        name = os.path.basename(path) if path else f"text{text_box_number}"
+        return f"{prefix}/{name}"
+
+    def apply_patch(self):
+        dialog = PatchDialog(self)
+        target = dialog.exec_()
+        if target not in (PatchDialog.APPLY_TO_TEXT, PatchDialog.APPLY_TO_FOLDER):
+            return
+        patches = parse_patch(dialog.patch_edit.toPlainText())
+        if not any(patch.hunks for patch in patches):
+            QMessageBox.warning(self, "Apply Patch", "No hunks found in the patch.")
+            return
+        if target == PatchDialog.APPLY_TO_TEXT:
+            self.patch_text(patches)
+            return
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder to Patch")
+        if folder:
+            self.patch_folder(folder, patches)
+
+        # Apply all hunks of a patch to Text 1 and compare the result, put in Text 2, with it
+    def patch_text(self, patches):
+        hunks = [hunk for patch in patches for hunk in patch.hunks]
+        lines, failed = apply_hunks(list(self.source_lines(1)), hunks)
+        self.load_text(2, "\n".join(lines))
+        self.compare_texts()
+        if failed:
+            QMessageBox.warning(self, "Apply Patch", f"{len(failed)} of {len(hunks)} hunks could not be applied: "
+                                f"hunks {', '.join(str(number + 1) for number in failed)}.")
+
+        # Apply a patch to the files of a folder, in place
+    def patch_folder(self, folder, patches):
+        results = apply_patch_to_folder(folder, patches)
+        problems = []
+        for result in results:
+            if result.error:
+                problems.append(f"{result.path}: {result.error}")
+            elif result.failed:
+                problems.append(f"{result.path}: hunks {', '.join(str(number + 1) for number in result.failed)} "
+                                "could not be applied")
+        summary = f"Patched {sum(1 for result in results if result.applied)} of {len(results)} files."
+        if problems:
+            QMessageBox.warning(self, "Apply Patch", summary + "\n\n" + "\n".join(problems))
+        else:
+            QMessageBox.information(self, "Apply Patch", summary)
+
+    def current_viewer(self):
+        return self.side_by_side_viewer if self.side_by_side_check.isChecked() else self.diff_viewer
+
+    def on_side_by_side_toggled(self, checked):
+        self.diff_viewer.setVisible(not checked)
+        self.side_by_side_viewer.setVisible(checked)
+        self.context_spin.setEnabled(checked)
+
+# Line styles of the diff view
+STYLE_CONTEXT = 0
+STYLE_ADDED = 1
+STYLE_REMOVED = 2
+STYLE_HEADER = 3
+
+# Style of a line by its first character
+STYLE_BY_PREFIX = {'+': STYLE_ADDED, '-': STYLE_REMOVED, '@': STYLE_HEADER}
+
+# Number of hunks whose removed/added line pairs are remembered
+HUNK_CACHE_SIZE = 64
+
+# Number of hidden unchanged lines a click on a fold of the side-by-side view shows
+FOLD_EXPAND_LINES = 20
+
+# Space between the two panes of the side-by-side view, in pixels
+PANE_GAP = 4
+
+class DiffViewer(LineView):
+    """
+    Scrollable view of unified diff lines that only paints the lines inside the exposed rectangle.
+
+    The style of every line is worked out once in set_diff. Changed words and
+    characters of a removed line and the added line replacing it are only worked out once
+    their hunk is painted.
+    """
+
+    # Background and text color per line style; None means no background
+    STYLES = {
+        STYLE_CONTEXT: (None, QColor(Qt.black)),
+        STYLE_ADDED: (QColor(230, 255, 237), QColor(46, 160, 67)),
+        STYLE_REMOVED: (QColor(255, 238, 240), QColor(215, 58, 73)),
+        STYLE_HEADER: (QColor(221, 244, 255), QColor(87, 96, 106)),
+    }
+
+    # Background of the changed parts of a line, per line style
+    CHANGE_BACKGROUNDS = {
+        STYLE_ADDED: QColor(172, 242, 189),
+        STYLE_REMOVED: QColor(253, 184, 192),
+    }
 
-class DiffViewer(QWidget):
     def __init__(self):
         super().__init__()
-        self.layout = QVBoxLayout(self)
         self.diff_lines = []
 
+        font = QFont("Courier")
+        font.setStyleHint(QFont.Monospace)
+        self.setFont(font)
+
         # Set the diff content to be displayed
     def set_diff(self, diff):
         self.diff_lines = diff[2:]  # Skip the first two lines (metadata)
-        self.update()
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self.update_scroll_bars()
+        self.viewport().update()
+
+    @property
+    def diff_lines(self):
+        return self._diff_lines
+
+        # Replacing the lines works out the style of every line and the longest line up front
+    @diff_lines.setter
+    def diff_lines(self, lines):
+        self._diff_lines = lines
+        self.line_styles = [STYLE_BY_PREFIX.get(line[:1], STYLE_CONTEXT) for line in lines]
+        self.max_line_length = max(map(len, lines), default=0)
+        self.hunk_starts = [row for row, style in enumerate(self.line_styles) if style == STYLE_HEADER]
+        self.hunk_pairs = OrderedDict()
+
+        # Get the row paired with a removed or added row: the n-th removed line of a change with its n-th added line
+    def partner_row(self, row):
+        hunk = bisect_right(self.hunk_starts, row) - 1
+        start = self.hunk_starts[hunk] + 1 if hunk >= 0 else 0
+        pairs = self.hunk_pairs.get(start)
+        if pairs is None:
+            end = self.hunk_starts[hunk + 1] if hunk + 1 < len(self.hunk_starts) else len(self.diff_lines)
+            pairs = self.pair_hunk_rows(start, end)
+            self.hunk_pairs[start] = pairs
+            if len(self.hunk_pairs) > HUNK_CACHE_SIZE:
+                self.hunk_pairs.popitem(last=False)
+        else:
+            self.hunk_pairs.move_to_end(start)
+        return pairs.get(row)
+
+    def pair_hunk_rows(self, start, end):
+        pairs = {}
+        styles = self.line_styles
+        row = start
+        while row < end:
+            if styles[row] != STYLE_REMOVED:
+                row += 1
+                continue
+            removed_start = row
+            while row < end and styles[row] == STYLE_REMOVED:
+                row += 1
+            added_start = row
+            while row < end and styles[row] == STYLE_ADDED:
+                row += 1
+            for removed, added in zip(range(removed_start, added_start), range(added_start, row)):
+                pairs[removed] = added
+                pairs[added] = removed
+        return pairs
+
+        # Get the changed character ranges of a removed or added row, without its +/- prefix
+    def changed_spans(self, row):
+        partner = self.partner_row(row)
+        if partner is None:
+            return ()
+        if self.line_styles[row] == STYLE_REMOVED:
+            return intraline_changes(self.diff_lines[row][1:], self.diff_lines[partner][1:])[0]
+        return intraline_changes(self.diff_lines[partner][1:], self.diff_lines[row][1:])[1]
+
+    def row_count(self):
+        return len(self.diff_lines)
 
-        # Custom paint event to render the diff view
+        # Changes are hunks in the unified view
+    def next_change_row(self, row):
+        index = bisect_right(self.hunk_starts, row)
+        return self.hunk_starts[index] if index < len(self.hunk_starts) else None
+
+    def previous_change_row(self, row):
+        index = bisect_left(self.hunk_starts, row) - 1
+        return self.hunk_starts[index] if index >= 0 else None
+
+        # Scroll the next change to the top of the view
+    def go_to_next_change(self):
+        row = self.next_change_row(self.verticalScrollBar().value())
+        if row is not None:
+            self.verticalScrollBar().setValue(row)
+
+    def go_to_previous_change(self):
+        row = self.previous_change_row(self.verticalScrollBar().value())
+        if row is not None:
+            self.verticalScrollBar().setValue(row)
+
+        # Get the header of the hunk a row belongs to
+    def hunk_header(self, row):
+        hunk = bisect_right(self.hunk_starts, row) - 1
+        return self.diff_lines[self.hunk_starts[hunk]] if hunk >= 0 else None
+
+        # Custom paint event that only renders the lines intersecting the exposed rectangle
     def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-
-        font = painter.font()
-        font.setFamily("Courier")
-        painter.setFont(font)
-
-        y = 5
-        line_height = painter.fontMetrics().height()
-
-        for line in self.diff_lines:
-            if line.startswith('+'):
-                painter.fillRect(0, y, self.width(), line_height, QColor(230, 255, 237))
-                painter.setPen(QColor(46, 160, 67))
-            elif line.startswith('-'):
-                painter.fillRect(0, y, self.width(), line_height, QColor(255, 238, 240))
-                painter.setPen(QColor(215, 58, 73))
-            else:
-                painter.setPen(Qt.black)
+        rect = event.rect()
+        line_height = self.line_height
+        first, last = self.rows_in(rect)
+        if last < first:
+            return
 
-            painter.drawText(5, y + line_height - 2, line)
-            y += line_height
+        painter = QPainter(self.viewport())
+        painter.setFont(self.font())
 
-        self.setMinimumHeight(y)
+        # Only the visible columns of long lines are drawn
+        x_offset = self.horizontalScrollBar().value()
+        first_column = max(0, (x_offset + rect.left() - TEXT_MARGIN) // self.char_width)
+        last_column = (x_offset + rect.right() - TEXT_MARGIN) // self.char_width + 1
+        text_x = TEXT_MARGIN + first_column * self.char_width - x_offset
+        width = self.viewport().width()
+
+        y = self.row_top(first)
+        for row in range(first, last + 1):
+            style = self.line_styles[row]
+            background, pen = self.STYLES[style]
+            if background is not None:
+                painter.fillRect(0, y, width, line_height, background)
+            if style in self.CHANGE_BACKGROUNDS:
+                for start, end in self.changed_spans(row):
+                    # Columns of the line include the +/- prefix
+                    start = max(start + 1, first_column)
+                    end = min(end + 1, last_column + 1)
+                    if start < end:
+                        painter.fillRect(text_x + (start - first_column) * self.char_width, y,
+                                         (end - start) * self.char_width, line_height,
+                                         self.CHANGE_BACKGROUNDS[style])
+            painter.setPen(pen)
+            painter.drawText(text_x, y + self.ascent, self.diff_lines[row][first_column:last_column + 1])
+            y += line_height
+        painter.end()
 
         # Provide a default size hint for the widget
     def sizeHint(self):
-        return QSize(600, len(self.diff_lines) * 20)
\ No newline at end of file
+        return QSize(600, self.row_count() * 20)
+
+class SideBySideViewer(DiffViewer):
+    """
+    Side-by-side view of two texts, the old one on the left, with unchanged lines away from changes folded.
+
+    Both panes are painted from a single HunkIndex, row by row, so they always scroll together.
+    Only the exposed rows are painted. Clicking a fold shows the lines it hides, FOLD_EXPAND_LINES
+    at a time. The longest line is only tracked among the lines painted so far, so opening a
+    large file does not decode all of its lines.
+    """
+
+    # Background of the missing side of a change
+    FILLER = QColor(246, 248, 250)
+
+    def __init__(self, context=DEFAULT_CONTEXT_LINES):
+        self.old_lines = []
+        self.new_lines = []
+        self.context = context
+        self.index = HunkIndex([(0, 0, 0)], context)
+        self.number_width = 2
+        super().__init__()
+
+        # Set the texts and their matching blocks
+    def set_diff(self, old_lines, new_lines, blocks):
+        self.old_lines = old_lines
+        self.new_lines = new_lines
+        self.index = HunkIndex(blocks, self.context)
+        self.number_width = len(str(max(len(old_lines), len(new_lines)))) + 1
+        self.max_line_length = 0
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self.update_scroll_bars()
+        self.viewport().update()
+
+    def set_context(self, context):
+        self.context = context
+        self.index.set_context(context)
+        self.update_scroll_bars()
+        self.viewport().update()
+
+    def row_count(self):
+        return len(self.index)
+
+    def pane_width(self):
+        return max(0, (self.viewport().width() - PANE_GAP) // 2 - self.number_width * self.char_width)
+
+    def next_change_row(self, row):
+        return self.index.next_change_row(row)
+
+    def previous_change_row(self, row):
+        return self.index.previous_change_row(row)
+
+        # Clicking a fold shows some of the lines it hides
+    def mousePressEvent(self, event):
+        row = self.verticalScrollBar().value() + (event.pos().y() - TOP_MARGIN) // self.line_height
+        if 0 <= row < self.row_count() and self.index.expand(row, FOLD_EXPAND_LINES):
+            self.update_scroll_bars()
+            self.viewport().update()
+            return
+        super().mousePressEvent(event)
+
+    def paintEvent(self, event):
+        rect = event.rect()
+        line_height = self.line_height
+        first, last = self.rows_in(rect)
+        if last < first:
+            return
+
+        painter = QPainter(self.viewport())
+        painter.setFont(self.font())
+        width = self.viewport().width()
+        pane_width = (width - PANE_GAP) // 2
+        longest = self.max_line_length
+
+        y = self.row_top(first)
+        for row in range(first, last + 1):
+            kind, old, new = self.index.row(row)
+            if kind == ROW_FOLD:
+                background, pen = self.STYLES[STYLE_HEADER]
+                painter.fillRect(0, y, width, line_height, background)
+                painter.setPen(pen)
+                painter.drawText(TEXT_MARGIN, y + self.ascent,
+                                 f"... {len(old)} unchanged lines, click to show {min(len(old), FOLD_EXPAND_LINES)}")
+                y += line_height
+                continue
+
+            old_spans = new_spans = ()
+            if kind == ROW_CHANGE and old is not None and new is not None:
+                old_spans, new_spans = intraline_changes(self.old_lines[old], self.new_lines[new])
+            panes = ((0, old, self.old_lines, STYLE_REMOVED, old_spans),
+                     (pane_width + PANE_GAP, new, self.new_lines, STYLE_ADDED, new_spans))
+            for x, line, lines, style, spans in panes:
+                if line is None:
+                    painter.fillRect(x, y, pane_width, line_height, self.FILLER)
+                    continue
+                text = lines[line]
+                longest = max(longest, len(text))
+                self.paint_line(painter, x, y, pane_width, line + 1, text,
+                                STYLE_CONTEXT if kind == ROW_EQUAL else style, spans)
+            y += line_height
+        painter.end()
+
+        # Lines longer than any painted before widen the horizontal scroll range
+        if longest > self.max_line_length:
+            self.max_line_length = longest
+            self.update_scroll_bars()
+
+        # Paint one side of a row: the line number, then the visible columns of the line clipped to the pane
+    def paint_line(self, painter, x, y, pane_width, number, text, style, spans):
+        line_height = self.line_height
+        background, pen = self.STYLES[style]
+        if background is not None:
+            painter.fillRect(x, y, pane_width, line_height, background)
+        painter.setPen(self.STYLES[STYLE_HEADER][1])
+        painter.drawText(x + TEXT_MARGIN, y + self.ascent, str(number).rjust(self.number_width - 1))
+
+        text_left = x + TEXT_MARGIN + self.number_width * self.char_width
+        text_width = x + pane_width - text_left
+        if text_width <= 0:
+            return
+        painter.setClipRect(text_left, y, text_width, line_height)
+        x_offset = self.horizontalScrollBar().value()
+        first_column = x_offset // self.char_width
+        last_column = (x_offset + text_width) // self.char_width + 1
+        text_x = text_left + first_column * self.char_width - x_offset
+        for start, end in spans:
+            start = max(start, first_column)
+            end = min(end, last_column + 1)
+            if start < end:
+                painter.fillRect(text_x + (start - first_column) * self.char_width, y,
+                                 (end - start) * self.char_width, line_height, self.CHANGE_BACKGROUNDS[style])
+        painter.setPen(pen)
+        painter.drawText(text_x, y + self.ascent, text[first_column:last_column + 1])
+        painter.setClipping(False)
@@ -0,0 +1,114 @@
+# export.py
+# This module provides streaming output for exports: reading files in chunks and writing to sinks.
+
+import sys
+
+# Number of characters read from a file, or collected before writing to a sink, at a time
+CHUNK_SIZE = 1 << 16
+
+def iter_file_lines(path, encoding='utf-8', chunk_size=CHUNK_SIZE):
+    """
+    Yield the lines of a text file without their line breaks, reading it in chunks.
+
+    Produces the same lines as f.read().splitlines(), but only holds one chunk (plus any
+    line that spans chunks) in memory. Files that cannot be opened yield nothing.
+    """
+    try:
+        f = open(path, 'r', encoding=encoding, errors='ignore')
+    except OSError:
+        return
+    with f:
+        pending = ""
+        for chunk in iter(lambda: f.read(chunk_size), ""):
+            pieces = (pending + chunk).splitlines(keepends=True)
+            last = pieces[-1]
+            if last.splitlines() == [last]:
+                # No line break yet, the line continues in the next chunk
+                pending = pieces.pop()
+            else:
+                pending = ""
+            for piece in pieces:
+                yield piece.splitlines()[0]
+        if pending:
+            yield pending
+
+def write_lines(lines, sink, chunk_size=CHUNK_SIZE):
+    """
+    Write lines to a sink separated by newlines, without a trailing newline.
+
+    Lines are collected into chunks of about chunk_size characters before being written.
+
+    Returns:
+        int: The number of lines written.
+    """
+    buffer = []
+    buffered = 0
+    count = 0
+    for line in lines:
+        if count:
+            buffer.append("\n")
+        buffer.append(line)
+        buffered += len(line) + 1
+        count += 1
+        if buffered >= chunk_size:
+            sink.write("".join(buffer))
+            buffer = []
+            buffered = 0
+    if buffer:
+        sink.write("".join(buffer))
+    return count
+
+class StreamSink:
+    """Write output to an open text stream."""
+
+    def __init__(self, stream, close_stream=False):
+        self.stream = stream
+        self.close_stream = close_stream
+
+    def write(self, text):
+        self.stream.write(text)
+
+    def close(self):
+        if self.close_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class FileSink(StreamSink):
+    """Write output to a file, replacing its contents."""
+
+    def __init__(self, path, encoding='utf-8'):
+        super().__init__(open(path, 'w', encoding=encoding, newline=''), close_stream=True)
+        self.path = path
+
+class StdoutSink(StreamSink):
+    """Write output to standard output."""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+class ClipboardSink(StreamSink):
+    """
+    Copy output to the clipboard when closed.
+
+    The clipboard only accepts a whole string, so unlike the other sinks this one has to
+    keep the complete output in memory.
+    """
+
+    def __init__(self):
+        super().__init__(None)
+        self._chunks = []
+
+    def write(self, text):
+        self._chunks.append(text)
+
+    def close(self):
+        import pyperclip
+        pyperclip.copy("".join(self._chunks))
+        self._chunks = []
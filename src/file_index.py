@@ -0,0 +1,232 @@
+# file_index.py
+# This module provides a persistent index of file metadata, so unchanged files are not read again.
+
+import codecs
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, namedtuple
+from itertools import chain
+
+from src.paths import app_data_dir
+from src.tokens import estimate_tokens
+
+INDEX_FILE_NAME = "file_index.sqlite3"
+
+# Bump when the table layout changes; older tables are dropped and rebuilt
+SCHEMA_VERSION = 3
+
+# Block size used when reading files for the index
+READ_CHUNK_SIZE = 1 << 16
+
+# Number of directories whose records are kept in memory
+DIR_CACHE_SIZE = 256
+
+# Number of new records written in one transaction
+WRITE_BATCH_SIZE = 500
+
+# Number of bytes looked at to tell text from binary files
+SNIFF_SIZE = 8192
+
+# Files larger than this are never read
+HUGE_FILE_SIZE = 10 * 1024 * 1024
+
+# Share of control characters above which a file is treated as binary
+BINARY_CONTROL_RATIO = 0.3
+
+KIND_TEXT = "text"
+KIND_BINARY = "binary"
+KIND_HUGE = "huge"
+
+# Control characters other than tab, line breaks, form feed and escape
+_NOT_CONTROL = bytes(b for b in range(256) if not (b < 32 and b not in b"\t\n\r\x0c\x1b" or b == 127))
+
+# Binary and huge files only have their kind recorded; lines and tokens are 0 and hash and encoding None
+FileInfo = namedtuple("FileInfo", ["lines", "tokens", "hash", "encoding", "kind"], defaults=[KIND_TEXT])
+
+def default_index_path():
+    return os.path.join(app_data_dir(), INDEX_FILE_NAME)
+
+def detect_encoding(head):
+    """Pick an encoding from the byte order mark of the first block of a file, if it has one."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16"
+    return None
+
+def classify(head, size):
+    """
+    Tell from a file's size and its first SNIFF_SIZE bytes whether it is text, binary or too large to read.
+
+    A file is binary if its first block contains a NUL byte (UTF-16 files with a byte order mark
+    excepted) or mostly control characters.
+    """
+    if size > HUGE_FILE_SIZE:
+        return KIND_HUGE
+    if detect_encoding(head) == "utf-16":
+        return KIND_TEXT
+    if b"\0" in head:
+        return KIND_BINARY
+    control = len(head.translate(None, _NOT_CONTROL))
+    if control > len(head) * BINARY_CONTROL_RATIO:
+        return KIND_BINARY
+    return KIND_TEXT
+
+def read_file_info(path, size=None):
+    """
+    Read a file once in blocks to count its lines and tokens, hash its contents and detect its encoding.
+
+    Files without a byte order mark are reported as UTF-8 if they decode as such, otherwise as latin-1.
+    Huge files are not opened, and binary files are not read past their first block.
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    if size > HUGE_FILE_SIZE:
+        return FileInfo(0, 0, None, None, KIND_HUGE)
+
+    lines = 0
+    tokens = 0
+    last = b""
+    digest = hashlib.blake2b(digest_size=16)
+    encoding = None
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    is_utf8 = True
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_SIZE)
+        kind = classify(head, size)
+        if kind != KIND_TEXT:
+            return FileInfo(0, 0, None, None, kind)
+        blocks = chain((head,), iter(lambda: f.read(READ_CHUNK_SIZE), b"")) if head else ()
+        for block in blocks:
+            if encoding is None and not last:
+                encoding = detect_encoding(block)
+            digest.update(block)
+            lines += block.count(b"\n")
+            tokens += estimate_tokens(block)
+            if is_utf8 and encoding is None:
+                try:
+                    decoder.decode(block)
+                except UnicodeDecodeError:
+                    is_utf8 = False
+            last = block
+    if is_utf8 and encoding is None:
+        try:
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            is_utf8 = False
+    if last and not last.endswith(b"\n"):
+        lines += 1
+    if encoding is None:
+        encoding = "utf-8" if is_utf8 else "latin-1"
+    return FileInfo(lines, tokens, digest.hexdigest(), encoding)
+
+class FileIndex:
+    """
+    SQLite-backed index of line count, token estimate, content hash, encoding and kind per file.
+
+    A record is only reused while the file's (mtime_ns, size, inode) match the ones it was
+    recorded with. Records are looked up one directory at a time, and the index can be shared
+    between the GUI thread and scan workers.
+    """
+
+    def __init__(self, db_path=":memory:"):
+        self._lock = threading.RLock()
+        try:
+            self._connection = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+            self._create_schema()
+        except sqlite3.Error:
+            self._connection = sqlite3.connect(":memory:", check_same_thread=False)
+            self._create_schema()
+        self._dir_cache = OrderedDict()
+        self._pending = []
+
+    @classmethod
+    def open_default(cls):
+        try:
+            return cls(default_index_path())
+        except OSError:
+            return cls()
+
+    def _create_schema(self):
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS files")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "dir TEXT NOT NULL, name TEXT NOT NULL, mtime_ns INTEGER, size INTEGER, inode INTEGER, "
+            "lines INTEGER, tokens INTEGER, hash TEXT, encoding TEXT, kind TEXT, PRIMARY KEY (dir, name)) WITHOUT ROWID")
+        self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._connection.commit()
+
+    def _records_for_dir(self, directory):
+        records = self._dir_cache.get(directory)
+        if records is not None:
+            self._dir_cache.move_to_end(directory)
+            return records
+        rows = self._connection.execute(
+            "SELECT name, mtime_ns, size, inode, lines, tokens, hash, encoding, kind FROM files WHERE dir = ?",
+            (directory,))
+        records = {row[0]: row[1:] for row in rows}
+        self._dir_cache[directory] = records
+        if len(self._dir_cache) > DIR_CACHE_SIZE:
+            self._dir_cache.popitem(last=False)
+        return records
+
+    def get(self, path, mtime_ns, size, inode=0):
+        """
+        Return the FileInfo of a file, reading the file only if it changed since it was indexed.
+
+        Returns None if the file cannot be read.
+        """
+        if os.name == 'nt':
+            # DirEntry.stat() does not fill in st_ino on Windows, so it cannot be compared
+            inode = 0
+        directory, name = os.path.split(path)
+        with self._lock:
+            record = self._records_for_dir(directory).get(name)
+        if record is not None and record[:3] == (mtime_ns, size, inode):
+            return FileInfo(*record[3:])
+
+        try:
+            info = read_file_info(path, size)
+        except OSError:
+            return None
+
+        with self._lock:
+            self._records_for_dir(directory)[name] = (mtime_ns, size, inode) + tuple(info)
+            self._pending.append((directory, name, mtime_ns, size, inode) + tuple(info))
+            if len(self._pending) >= WRITE_BATCH_SIZE:
+                self.flush()
+        return info
+
+    def get_for_path(self, path):
+        """Return the FileInfo of a file, stat'ing it first."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return self.get(path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def line_count(self, path, mtime_ns, size, inode=0):
+        info = self.get(path, mtime_ns, size, inode)
+        return info.lines if info is not None else 0
+
+    def flush(self):
+        """Write records added since the last flush to disk."""
+        with self._lock:
+            if not self._pending:
+                return
+            try:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self._pending)
+                self._connection.commit()
+            except sqlite3.Error:
+                pass
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._connection.close()
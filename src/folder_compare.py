@@ -0,0 +1,125 @@
+# folder_compare.py
+# This module provides the comparison of two folders, such as a snapshot of a repository before and after an edit.
+
+import filecmp
+from collections import namedtuple
+from src.file_index import FileIndex
+from src.folder_core import scan_directory
+from src.parallel import ReaderPool
+
+STATUS_ADDED = "added"
+STATUS_REMOVED = "removed"
+STATUS_MODIFIED = "modified"
+
+# A file that differs between the two folders; the path of the side it is missing from is None
+FileChange = namedtuple("FileChange", ["path", "status", "old_path", "new_path"])
+
+def _iter_files(path, relative, matcher):
+    for name, full_path, is_dir, stat in scan_directory(path, matcher):
+        if is_dir:
+            child_matcher = matcher.child(full_path) if matcher is not None else None
+            yield from _iter_files(full_path, relative + name + "/", child_matcher)
+        else:
+            yield relative + name, (full_path, stat)
+
+def iter_file_pairs(old_dir, new_dir, relative="", old_matcher=None, new_matcher=None):
+    """
+    Walk two folders side by side, pairing up the files at the same relative path.
+
+    Directories that only exist on one side are walked without being paired. Paths are
+    relative to the folders and use "/" as separator.
+
+    Yields:
+        tuple: (relative_path, old, new) with (full_path, stat) for each side the file exists
+            on and None for the other, in sorted order of the relative paths within each folder.
+    """
+    old_entries = {name: (path, is_dir, stat) for name, path, is_dir, stat in scan_directory(old_dir, old_matcher)}
+    new_entries = {name: (path, is_dir, stat) for name, path, is_dir, stat in scan_directory(new_dir, new_matcher)}
+    for name in sorted(old_entries.keys() | new_entries.keys()):
+        old = old_entries.get(name)
+        new = new_entries.get(name)
+        path = relative + name
+        if old is not None and new is not None and old[1] and new[1]:
+            yield from iter_file_pairs(old[0], new[0], path + "/",
+                                       old_matcher.child(old[0]) if old_matcher is not None else None,
+                                       new_matcher.child(new[0]) if new_matcher is not None else None)
+            continue
+        if old is not None and new is not None and not old[1] and not new[1]:
+            yield path, (old[0], old[2]), (new[0], new[2])
+            continue
+        # A file or directory on one side only, or a file on one side and a directory on the other
+        for entry, matcher, is_old in ((old, old_matcher, True), (new, new_matcher, False)):
+            if entry is None:
+                continue
+            full_path, is_dir, stat = entry
+            if is_dir:
+                files = _iter_files(full_path, path + "/", matcher.child(full_path) if matcher is not None else None)
+            else:
+                files = [(path, (full_path, stat))]
+            for file_path, file_entry in files:
+                yield (file_path, file_entry, None) if is_old else (file_path, None, file_entry)
+
+def same_contents(old_path, old_stat, new_path, new_stat, file_index):
+    """
+    Tell whether two files have the same contents.
+
+    Files of different sizes differ. Otherwise the hashes recorded in the file index are
+    compared, so an unchanged file is only read once; binary and huge files, which the index
+    does not hash, are compared byte by byte.
+    """
+    if old_stat.st_size != new_stat.st_size:
+        return False
+    old_info = file_index.get(old_path, old_stat.st_mtime_ns, old_stat.st_size, old_stat.st_ino)
+    new_info = file_index.get(new_path, new_stat.st_mtime_ns, new_stat.st_size, new_stat.st_ino)
+    if old_info is not None and new_info is not None and old_info.hash and new_info.hash:
+        return old_info.hash == new_info.hash
+    try:
+        return filecmp.cmp(old_path, new_path, shallow=False)
+    except OSError:
+        return False
+
+def compare_folders(old_folder, new_folder, file_index=None, reader_pool=None, old_matcher=None, new_matcher=None,
+                    cancelled=None):
+    """
+    List the files added, removed and modified between two folders.
+
+    Files present in both folders are compared on the reader pool; see same_contents.
+
+    Args:
+        file_index (FileIndex): Caches the hashes of the files; an in-memory index by default.
+        reader_pool (ReaderPool): Compares files concurrently; inline by default.
+        old_matcher (IgnoreMatcher): Leaves out the entries of the old folder it ignores.
+        new_matcher (IgnoreMatcher): Leaves out the entries of the new folder it ignores.
+        cancelled (callable): Polled between files; once it returns True, the comparison stops
+            and returns None.
+
+    Returns:
+        list: FileChange tuples, sorted by path.
+    """
+    file_index = file_index if file_index is not None else FileIndex()
+    reader_pool = reader_pool if reader_pool is not None else ReaderPool(1)
+
+    # Runs on the reader pool
+    def compare(pair):
+        path, old, new = pair
+        if cancelled is not None and cancelled():
+            return None
+        if old is None:
+            return FileChange(path, STATUS_ADDED, None, new[0])
+        if new is None:
+            return FileChange(path, STATUS_REMOVED, old[0], None)
+        old_path, old_stat = old
+        new_path, new_stat = new
+        if same_contents(old_path, old_stat, new_path, new_stat, file_index):
+            return False
+        return FileChange(path, STATUS_MODIFIED, old_path, new_path)
+
+    changes = []
+    for change in reader_pool.map_ordered(compare, iter_file_pairs(old_folder, new_folder, "", old_matcher, new_matcher)):
+        if change is None:
+            return None
+        if change:
+            changes.append(change)
+    file_index.flush()
+    changes.sort()
+    return changes
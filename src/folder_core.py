@@ -0,0 +1,138 @@
+# folder_core.py
+# This module provides the Qt-free parts of the folder structure tool: walking, totals and export.
+
+import os
+from src.export import iter_file_lines, write_lines
+from src.file_index import HUGE_FILE_SIZE, KIND_BINARY, KIND_HUGE, KIND_TEXT, FileIndex
+from src.parallel import ReaderPool
+from src.tokens import CONTENT_HEADER_TOKENS, entry_tokens, estimate_tokens
+
+# Files up to this size are read ahead by the reader pool during export; larger ones are streamed
+PREFETCH_MAX_SIZE = 1 << 20
+
+def scan_directory(path, matcher=None):
+    """
+    List a single directory using os.scandir so the stat result of each entry is reused.
+
+    Args:
+        path (str): The directory to list.
+        matcher (IgnoreMatcher): Leaves out the entries it ignores, before they are stat'ed.
+
+    Returns:
+        list: (name, full_path, is_dir, stat) tuples. Entries that cannot be stat'ed are skipped.
+    """
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                    if matcher is not None and matcher.is_ignored(entry.path, is_dir):
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.name, entry.path, is_dir, stat))
+    except OSError:
+        pass
+    return entries
+
+# Why the contents of binary and huge files are left out of the export
+SKIPPED_REASONS = {
+    KIND_BINARY: "binary file",
+    KIND_HUGE: f"larger than {HUGE_FILE_SIZE // (1024 * 1024)} MB",
+}
+
+def skipped_summary(kind, size):
+    """The line exported in place of the contents of a binary or huge file."""
+    return f"[Contents skipped: {SKIPPED_REASONS[kind]}, {size} bytes]"
+
+# Totals are (size, lines, tokens) tuples
+EMPTY_TOTALS = (0, 0, 0)
+
+def add_totals(a, b):
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+
+def subtract_totals(a, b):
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+
+def file_totals(name, size, info=None):
+    """
+    Totals of one file in the export: its size, and the lines and estimated tokens it adds.
+
+    Without a FileInfo only the file's entry in the structure counts towards the tokens, and
+    binary or huge files only add the line that replaces their contents.
+    """
+    if info is None:
+        return (size, 0, entry_tokens(name))
+    if info.kind != KIND_TEXT:
+        return (size, 0, entry_tokens(name) + CONTENT_HEADER_TOKENS + estimate_tokens(skipped_summary(info.kind, size)))
+    return (size, info.lines, entry_tokens(name) + CONTENT_HEADER_TOKENS + info.tokens + info.lines)
+
+def iter_disk_entries(path, depth, level=0, matcher=None):
+    """
+    Yield (level, name, path, is_dir) for every entry below a directory, up to depth levels down.
+
+    Directories are followed by their own entries; ignored directories are not descended into.
+    """
+    if depth == 0:
+        return
+    for name, full_path, is_dir, _ in scan_directory(path, matcher):
+        yield level, name, full_path, is_dir
+        if is_dir:
+            child_matcher = matcher.child(full_path) if matcher is not None else None
+            yield from iter_disk_entries(full_path, depth - 1, level + 1, child_matcher)
+
+def iter_folder_entries(folder, depth, matcher=None):
+    """Yield the folder itself at level 0, followed by its entries up to the given depth."""
+    yield 0, folder, folder, True
+    yield from iter_disk_entries(folder, depth, 1, matcher)
+
+def iter_output_lines(entries, include_contents=False, file_index=None, reader_pool=None):
+    """
+    Yield the exported lines for (level, name, path, is_dir) entries, indenting two spaces per level.
+
+    With include_contents every file is followed by a "Content:" line and its indented lines.
+    Small files are read ahead on the reader pool, in the encoding recorded in the file index,
+    while larger ones are streamed. Binary and huge files get a one-line summary instead.
+    """
+    reader_pool = reader_pool if reader_pool is not None else ReaderPool(1)
+    file_index = file_index if file_index is not None else FileIndex()
+
+    # Runs on the reader pool: look up the encoding and read small files ahead
+    def read_entry(entry):
+        level, name, path, is_dir = entry
+        if is_dir or not include_contents:
+            return entry, None, None
+        info = file_index.get_for_path(path)
+        try:
+            size = os.path.getsize(path)
+            if info is not None and info.kind != KIND_TEXT:
+                return entry, None, [skipped_summary(info.kind, size)]
+            encoding = info.encoding if info is not None else 'utf-8'
+            if size <= PREFETCH_MAX_SIZE:
+                with open(path, 'r', encoding=encoding, errors='ignore') as f:
+                    return entry, encoding, f.read().splitlines()
+        except OSError:
+            return entry, 'utf-8', None
+        return entry, encoding, None
+
+    for (level, name, path, is_dir), encoding, lines in reader_pool.map_ordered(read_entry, entries):
+        yield "  " * level + name
+        if not is_dir and include_contents:
+            yield "  " * (level + 1) + "Content:"
+            indent = "  " * (level + 2)
+            if lines is None:
+                lines = iter_file_lines(path, encoding)
+            for line in lines:
+                yield indent + line
+
+def export_folder(folder, sink, depth, include_contents=False, file_index=None, reader_pool=None, matcher=None):
+    """
+    Write the structure of a folder, and optionally the contents of its files, to a sink.
+
+    Returns:
+        int: The number of lines written.
+    """
+    entries = iter_folder_entries(folder, depth, matcher)
+    return write_lines(iter_output_lines(entries, include_contents, file_index, reader_pool), sink)
@@ -1,15 +1,439 @@
 # folder_structure.py
 # This module provides a tab for visualizing and exporting folder structures.
 
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, 
-                             QPushButton, QTreeWidget, QTreeWidgetItem, QCheckBox, 
-                             QLabel, QFileDialog, QComboBox)
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
+                             QPushButton, QTreeView, QCheckBox,
+                             QLabel, QFileDialog, QComboBox, QProgressBar, QSpinBox)
+from PyQt5.QtCore import Qt, QObject, QThread, QAbstractItemModel, QModelIndex, pyqtSignal
 import os
-import pyperclip
+from src.export import ClipboardSink, FileSink, StdoutSink, write_lines
+from src.file_index import HUGE_FILE_SIZE, KIND_HUGE, FileIndex
+from src.folder_core import (EMPTY_TOTALS, SKIPPED_REASONS, add_totals, file_totals, iter_disk_entries,
+                             iter_output_lines, scan_directory, skipped_summary, subtract_totals)
+from src.ignore_rules import DEFAULT_IGNORE_PATTERNS, IgnoreMatcher
+from src.parallel import DEFAULT_READER_WORKERS, ReaderPool
+from src.tokens import FIT_LARGEST_FIRST, FIT_LOWEST_PRIORITY_FIRST, select_files_to_drop
+
+# Number of directory totals collected by the scan worker before they are handed to the GUI thread
+SCAN_BATCH_SIZE = 500
+
+class ScanWorker(QObject):
+    """
+    Walk a folder up to a given depth off the GUI thread and total up every directory.
+
+    Totals are emitted in batches of (dir_path, totals) tuples once the whole subtree of a
+    directory has been walked. Only files count towards the totals, and their contents are
+    only counted when a file index is given. Contents of a directory's files are looked up
+    on the reader pool while its subdirectories are walked. Ignored entries are skipped and
+    ignored directories are never descended into.
+    """
+    batch_ready = pyqtSignal(list)
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(bool)
+
+    def __init__(self, folder, depth, file_index=None, batch_size=SCAN_BATCH_SIZE, reader_pool=None,
+                 matcher=None):
+        super().__init__()
+        self.folder = folder
+        self.depth = depth
+        self.matcher = matcher
+        self.file_index = file_index
+        self.reader_pool = reader_pool if reader_pool is not None else ReaderPool(1)
+        self.batch_size = batch_size
+        self._cancelled = False
+        self._batch = []
+        self._scanned = 0
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        self._batch = []
+        self._scanned = 0
+        self._walk(self.folder, self.depth, self.matcher)
+        if self._batch and not self._cancelled:
+            self._flush()
+        self.finished.emit(not self._cancelled)
+
+    def _file_totals(self, name, full_path, stat):
+        info = self.file_index.get(full_path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        return file_totals(name, stat.st_size, info)
+
+    def _walk(self, path, depth, matcher):
+        totals = EMPTY_TOTALS
+        if depth > 0:
+            entries = scan_directory(path, matcher)
+            self._scanned += len(entries)
+            contents = []
+            if self.file_index is not None:
+                contents = [self.reader_pool.submit(self._file_totals, name, full_path, stat)
+                            for name, full_path, is_dir, stat in entries if not is_dir]
+            for name, full_path, is_dir, stat in entries:
+                if self._cancelled:
+                    return EMPTY_TOTALS
+                if is_dir:
+                    child_matcher = matcher.child(full_path) if matcher is not None else None
+                    totals = add_totals(totals, self._walk(full_path, depth - 1, child_matcher))
+                elif self.file_index is None:
+                    totals = add_totals(totals, file_totals(name, stat.st_size))
+            for future in contents:
+                totals = add_totals(totals, future.result())
+        if self._cancelled:
+            return EMPTY_TOTALS
+        self._batch.append((path, totals))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+        return totals
+
+    def _flush(self):
+        self.batch_ready.emit(self._batch)
+        self.progress.emit(self._scanned)
+        self._batch = []
+
+class FileNode:
+    """
+    A single entry of the folder tree. Directories list their children only once fetched.
+
+    `total` holds the totals of the whole entry (for directories, the scanned subtree) and
+    `selected` the part of it that is currently checked. `matcher` is the IgnoreMatcher for
+    a directory's entries, set once it is needed. `kind` is a file's kind from the file
+    index, once known.
+    """
+    __slots__ = ("name", "parent", "children", "row", "size", "mtime_ns", "inode", "is_dir", "depth",
+                 "check_state", "total", "selected", "matcher", "kind")
+
+    def __init__(self, name, parent, row, size, mtime_ns, inode, is_dir, depth, check_state):
+        self.name = name
+        self.parent = parent
+        self.children = None
+        self.row = row
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.is_dir = is_dir
+        self.depth = depth
+        self.check_state = check_state
+        self.total = EMPTY_TOTALS
+        self.selected = EMPTY_TOTALS
+        self.matcher = None
+        self.kind = None
+
+    def path(self):
+        parts = []
+        node = self
+        while node is not None and node.name is not None:
+            parts.append(node.name)
+            node = node.parent
+        return os.path.join(*reversed(parts))
+
+class FolderTreeModel(QAbstractItemModel):
+    """
+    Tree model over a folder that lists a directory only when its node is first expanded.
+
+    `depth` has the same meaning as the Depth selector: the root lists its entries when depth
+    is at least 1, and every level below uses one less. Every node keeps the totals of its
+    checked entries, which are updated by deltas along the ancestor chain.
+    """
+    selection_changed = pyqtSignal()
+
+    HEADERS = ["Name", "Size"]
+
+    def __init__(self, parent=None, file_index=None, reader_pool=None):
+        super().__init__(parent)
+        self.reader_pool = reader_pool if reader_pool is not None else ReaderPool(1)
+        self.invisible_root = FileNode(None, None, 0, 0, 0, 0, True, 0, Qt.Checked)
+        self.invisible_root.children = []
+        self.root = None
+        self.file_index = file_index if file_index is not None else FileIndex()
+        self.count_contents = False
+        self.dir_totals = {}
+        self.dir_nodes = {}
+
+        # Replace the tree with a single checked root node for the given folder, leaving out what the matcher ignores
+    def set_root(self, folder, depth, matcher=None):
+        self.beginResetModel()
+        self.dir_totals = {}
+        self.dir_nodes = {}
+        self.root = FileNode(folder, self.invisible_root, 0, 0, 0, 0, True, depth, Qt.Checked)
+        self.root.matcher = matcher
+        self.dir_nodes[folder] = self.root
+        self.invisible_root.children = [self.root]
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.root = None
+        self.dir_totals = {}
+        self.dir_nodes = {}
+        self.invisible_root.children = []
+        self.endResetModel()
+
+    def node_from_index(self, index):
+        if index.isValid():
+            return index.internalPointer()
+        return self.invisible_root
+
+    def index_for_node(self, node, column=0):
+        if node is None or node is self.invisible_root:
+            return QModelIndex()
+        return self.createIndex(node.row, column, node)
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node_from_index(parent)
+        if node.children is None or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_for_node(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self.node_from_index(parent)
+        return len(node.children) if node.children is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node_from_index(parent)
+        if node.children is not None:
+            return len(node.children) > 0
+        return node.is_dir and node.depth > 0
+
+    def canFetchMore(self, parent):
+        node = self.node_from_index(parent)
+        return node.children is None and node.is_dir and node.depth > 0
+
+        # Get the ignore matcher for a directory's entries, reading its .gitignore on first use
+    def matcher_for(self, node):
+        if node.matcher is None and node is not self.root:
+            parent_matcher = self.matcher_for(node.parent)
+            if parent_matcher is not None:
+                node.matcher = parent_matcher.child(node.path())
+        return node.matcher
+
+    def fetchMore(self, parent):
+        node = self.node_from_index(parent)
+        if not self.canFetchMore(parent):
+            return
+        children = []
+        for row, (name, full_path, is_dir, stat) in enumerate(scan_directory(node.path(), self.matcher_for(node))):
+            child = FileNode(name, node, row, stat.st_size, stat.st_mtime_ns, stat.st_ino,
+                             is_dir, node.depth - 1, node.check_state)
+            if is_dir:
+                self.dir_nodes[full_path] = child
+                child.total = self.dir_totals.pop(full_path, EMPTY_TOTALS)
+            children.append(child)
+
+        files = [child for child in children if not child.is_dir]
+        for child, totals in zip(files, self.reader_pool.map_ordered(self.node_file_totals, files)):
+            child.total = totals
+
+        for child in children:
+            if child.check_state == Qt.Checked:
+                child.selected = child.total
+        if not children:
+            node.children = []
+            return
+        self.beginInsertRows(parent, 0, len(children) - 1)
+        node.children = children
+        self.endInsertRows()
+
+    def node_file_totals(self, node):
+        info = None
+        if self.count_contents:
+            info = self.file_index.get(node.path(), node.mtime_ns, node.size, node.inode)
+        if info is not None:
+            node.kind = info.kind
+        elif node.size > HUGE_FILE_SIZE:
+            node.kind = KIND_HUGE
+        return file_totals(node.name, node.size, info)
+
+        # Make sure every checked directory up to the depth limit has been fetched
+    def fetch_checked(self, node=None):
+        node = node if node is not None else self.root
+        pending = [node] if node is not None else []
+        while pending:
+            current = pending.pop()
+            if current.check_state == Qt.Unchecked or not current.is_dir:
+                continue
+            index = self.index_for_node(current)
+            if self.canFetchMore(index):
+                self.fetchMore(index)
+            if current.children:
+                pending.extend(current.children)
+
+        # Recompute the totals of loaded directories from their children
+    def refresh_loaded_totals(self, node=None):
+        node = node if node is not None else self.root
+        if node is None or node.children is None:
+            return
+        total = EMPTY_TOTALS
+        selected = EMPTY_TOTALS
+        for child in node.children:
+            self.refresh_loaded_totals(child)
+            total = add_totals(total, child.total)
+            selected = add_totals(selected, child.selected)
+        node.total = total
+        node.selected = selected
+
+        # Yield every loaded, checked file node
+    def iter_checked_files(self, node=None):
+        node = node if node is not None else self.root
+        pending = [node] if node is not None else []
+        while pending:
+            current = pending.pop()
+            if current.check_state == Qt.Unchecked:
+                continue
+            if current.children is not None:
+                pending.extend(reversed(current.children))
+            elif not current.is_dir:
+                yield current
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            if index.column() == 0:
+                return node.name
+            if node is not self.root:
+                if node.kind in SKIPPED_REASONS:
+                    return f"{node.size} bytes ({SKIPPED_REASONS[node.kind]}, contents skipped)"
+                return f"{node.size} bytes"
+        elif role == Qt.ToolTipRole and node.kind in SKIPPED_REASONS:
+            return skipped_summary(node.kind, node.size)
+        elif role == Qt.CheckStateRole and index.column() == 0:
+            return node.check_state
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or not index.isValid():
+            return False
+        self.set_check_state(index.internalPointer(), Qt.CheckState(value))
+        return True
+
+        # Apply a check state to a node, its loaded descendants and its ancestors
+    def set_check_state(self, node, check_state):
+        self.set_check_states([node], check_state)
+
+        # Apply a check state to several nodes, updating each ancestor and announcing the new selection once
+    def set_check_states(self, nodes, check_state):
+        deltas = {}
+        for node in nodes:
+            previous = node.selected
+            self.update_children(node, check_state)
+            delta = subtract_totals(node.selected, previous)
+            deltas[node.parent] = add_totals(deltas.get(node.parent, EMPTY_TOTALS), delta)
+        self.update_ancestors(deltas)
+        self.selection_changed.emit()
+
+        # Update the check state and selected totals of loaded descendants, one dataChanged per directory
+    def update_children(self, node, check_state):
+        checked = check_state == Qt.Checked
+        node.check_state = check_state
+        node.selected = node.total if checked else EMPTY_TOTALS
+        index = self.index_for_node(node)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            if not current.children:
+                continue
+            for child in current.children:
+                child.check_state = check_state
+                child.selected = child.total if checked else EMPTY_TOTALS
+                if child.children:
+                    pending.append(child)
+            first = self.index_for_node(current.children[0])
+            last = self.index_for_node(current.children[-1])
+            self.dataChanged.emit(first, last, [Qt.CheckStateRole])
+
+        # Update the check state of ancestors from their children and apply the change in selected totals
+    def update_parents(self, node, delta=EMPTY_TOTALS):
+        self.update_ancestors({node: delta})
+
+        # Apply {directory: delta} changes level by level, deepest first, so every directory is updated once
+    def update_ancestors(self, deltas):
+        deltas.pop(self.invisible_root, None)
+        deltas.pop(None, None)
+        while deltas:
+            # Deeper directories have less depth left
+            level = min(node.depth for node in deltas)
+            for node in [node for node in deltas if node.depth == level]:
+                delta = deltas.pop(node)
+                node.selected = add_totals(node.selected, delta)
+                states = {child.check_state for child in node.children}
+                if states == {Qt.Checked}:
+                    check_state = Qt.Checked
+                elif states == {Qt.Unchecked}:
+                    check_state = Qt.Unchecked
+                else:
+                    check_state = Qt.PartiallyChecked
+                if check_state != node.check_state:
+                    node.check_state = check_state
+                    index = self.index_for_node(node)
+                    self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+                elif delta == EMPTY_TOTALS:
+                    continue
+                parent = node.parent
+                if parent is not None and parent is not self.invisible_root:
+                    deltas[parent] = add_totals(deltas.get(parent, EMPTY_TOTALS), delta)
+
+        # Record directory totals reported by the scan worker, keeping the rest for when they are fetched
+    def apply_dir_totals(self, batch):
+        for path, totals in batch:
+            node = self.dir_nodes.get(path)
+            if node is None:
+                self.dir_totals[path] = totals
+                continue
+            node.total = totals
+            if node.check_state == Qt.Checked:
+                delta = subtract_totals(totals, node.selected)
+                node.selected = totals
+                self.update_parents(node.parent, delta)
+        self.selection_changed.emit()
+
+        # Switch counting of file contents on or off and reset directory totals until they are scanned again
+    def set_count_contents(self, count_contents):
+        self.count_contents = count_contents
+        self.dir_totals = {}
+        if self.root is None:
+            return
+        self.reset_totals(self.root)
+        self.selection_changed.emit()
+
+    def reset_totals(self, node):
+        node.total = EMPTY_TOTALS if node.is_dir else self.node_file_totals(node)
+
+        if node.children is not None and node.check_state == Qt.PartiallyChecked:
+            node.selected = EMPTY_TOTALS
+            for child in node.children:
+                self.reset_totals(child)
+                node.selected = add_totals(node.selected, child.selected)
+            return
+
+        if node.children is not None:
+            for child in node.children:
+                self.reset_totals(child)
+        node.selected = node.total if node.check_state == Qt.Checked else EMPTY_TOTALS
 
 class FolderStructureTab(QWidget):
-    def __init__(self):
+    def __init__(self, file_index=None):
         super().__init__()
         self.layout = QVBoxLayout(self)
 
@@ -33,26 +457,77 @@ class FolderStructureTab(QWidget):
         depth_layout.addWidget(self.view_button)
         self.layout.addLayout(depth_layout)
 
+        # Scan progress
+        progress_layout = QHBoxLayout()
+        self.scan_progress = QProgressBar()
+        self.scan_progress.setRange(0, 0)
+        self.scan_progress.setTextVisible(False)
+        self.scan_label = QLabel()
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.on_cancel_clicked)
+        progress_layout.addWidget(self.scan_progress)
+        progress_layout.addWidget(self.scan_label)
+        progress_layout.addWidget(self.cancel_button)
+        self.layout.addLayout(progress_layout)
+        self.set_scan_controls_visible(False)
+        self.scan_thread = None
+        self.scan_worker = None
+
+        # Entries left out of the tree and the export
+        self.ignore_patterns = list(DEFAULT_IGNORE_PATTERNS)
+        self.use_gitignore = True
+
         # Tree view
-        self.tree = QTreeWidget()
-        self.tree.setHeaderLabels(["Name", "Size"])
-        self.tree.itemChanged.connect(self.on_item_changed)
+        self.file_index = file_index if file_index is not None else FileIndex()
+        self.reader_pool = ReaderPool(DEFAULT_READER_WORKERS)
+        self.model = FolderTreeModel(self, self.file_index, self.reader_pool)
+        self.model.selection_changed.connect(self.update_info)
+        self.tree = QTreeView()
+        self.tree.setUniformRowHeights(True)
+        self.tree.setModel(self.model)
         self.layout.addWidget(self.tree)
 
         # Options
         self.include_contents = QCheckBox("Include file contents")
+        self.include_contents.stateChanged.connect(self.on_include_contents_changed)
         self.layout.addWidget(self.include_contents)
 
         # Info labels
         self.line_count_label = QLabel("Total lines: 0")
         self.file_size_label = QLabel("Total size: 0 bytes")
+        self.token_count_label = QLabel("Estimated tokens: 0")
         self.layout.addWidget(self.line_count_label)
         self.layout.addWidget(self.file_size_label)
+        self.layout.addWidget(self.token_count_label)
+
+        # Token budget
+        budget_layout = QHBoxLayout()
+        budget_layout.addWidget(QLabel("Token budget:"))
+        self.token_budget_spin = QSpinBox()
+        self.token_budget_spin.setRange(0, 10000000)
+        self.token_budget_spin.setSingleStep(1000)
+        self.token_budget_spin.setSpecialValueText("None")
+        self.token_budget_spin.valueChanged.connect(self.update_info)
+        budget_layout.addWidget(self.token_budget_spin)
+        self.fit_mode_combo = QComboBox()
+        self.fit_mode_combo.addItem("Largest files first", FIT_LARGEST_FIRST)
+        self.fit_mode_combo.addItem("Lowest priority first", FIT_LOWEST_PRIORITY_FIRST)
+        budget_layout.addWidget(self.fit_mode_combo)
+        self.fit_button = QPushButton("Fit to Budget")
+        self.fit_button.clicked.connect(self.fit_to_budget)
+        budget_layout.addWidget(self.fit_button)
+        self.layout.addLayout(budget_layout)
 
-        # Generate button
-        self.generate_button = QPushButton("Generate and Copy to Clipboard")
-        self.generate_button.clicked.connect(self.generate_output)
-        self.layout.addWidget(self.generate_button)
+        # Output selection and generate button
+        generate_layout = QHBoxLayout()
+        generate_layout.addWidget(QLabel("Output:"))
+        self.output_combo = QComboBox()
+        self.output_combo.addItems(["Clipboard", "File", "Standard Output"])
+        generate_layout.addWidget(self.output_combo)
+        self.generate_button = QPushButton("Generate")
+        self.generate_button.clicked.connect(lambda: self.generate_output())
+        generate_layout.addWidget(self.generate_button)
+        self.layout.addLayout(generate_layout)
 
         # Open a file dialog to select a folder
     def browse_folder(self):
@@ -60,121 +535,194 @@ class FolderStructureTab(QWidget):
         if folder:
             self.folder_input.setText(folder)
 
-        # Display the folder structure in the tree view
+        # Display the folder structure in the tree view; directories are listed when expanded
     def view_structure(self):
-        self.tree.clear()
+        self.cancel_scan()
+        self.model.clear()
         folder = self.folder_input.text()
         depth = int(self.depth_combo.currentText())
 
         if not os.path.isdir(folder):
+            self.update_info()
             return
 
-        root = QTreeWidgetItem(self.tree, [folder])
-        root.setFlags(root.flags() | Qt.ItemIsUserCheckable)
-        root.setCheckState(0, Qt.Checked)
-        self.add_tree_items(root, folder, depth)
-        self.tree.expandAll()
-        self.update_info()
+        self.model.count_contents = self.include_contents.isChecked()
+        self.model.set_root(folder, depth, IgnoreMatcher(folder, self.ignore_patterns, self.use_gitignore))
+        root_index = self.model.index_for_node(self.model.root)
+        self.model.fetchMore(root_index)
+        self.tree.expand(root_index)
+        self.start_scan()
 
-        # Recursively add items to the tree view
-    def add_tree_items(self, parent, path, depth):
-        if depth == 0:
+        # Total up the selected folder in the background
+    def start_scan(self):
+        self.cancel_scan()
+        root = self.model.root
+        if root is None:
             return
 
-        for name in os.listdir(path):
-            full_path = os.path.join(path, name)
-            size = os.path.getsize(full_path)
-            item = QTreeWidgetItem(parent, [name, f"{size} bytes"])
-            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-            item.setCheckState(0, Qt.Checked)
-
-            if os.path.isdir(full_path):
-                self.add_tree_items(item, full_path, depth - 1)
-
-        # Handle changes in item selection
-    def on_item_changed(self, item, column):
-        if column == 0:
-            new_state = item.checkState(0)
-            self.update_children(item, new_state)
-            self.update_parents(item.parent())
+        file_index = self.file_index if self.model.count_contents else None
+        self.scan_thread = QThread(self)
+        self.scan_worker = ScanWorker(root.name, root.depth, file_index, reader_pool=self.reader_pool,
+                                      matcher=root.matcher)
+        self.scan_worker.moveToThread(self.scan_thread)
+        self.scan_thread.started.connect(self.scan_worker.run)
+        self.scan_worker.batch_ready.connect(self.add_scan_batch)
+        self.scan_worker.progress.connect(self.on_scan_progress)
+        self.scan_worker.finished.connect(self.on_scan_finished)
+        self.scan_worker.finished.connect(self.scan_thread.quit)
+        self.scan_thread.finished.connect(self.scan_worker.deleteLater)
+
+        self.scan_label.setText("Scanning...")
+        self.set_scan_controls_visible(True)
+        self.scan_thread.start()
+
+        # Stop a running scan, keeping whatever totals have been collected so far
+    def cancel_scan(self):
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()
+        if self.scan_thread is not None:
+            self.scan_thread.quit()
+            self.scan_thread.wait()
+        self.scan_worker = None
+        self.scan_thread = None
+        self.set_scan_controls_visible(False)
+
+        # Stop the background work, waiting for its thread, before the tab is closed
+    def shutdown(self):
+        self.cancel_scan()
+        self.reader_pool.shutdown()
+
+    def on_cancel_clicked(self):
+        self.cancel_scan()
         self.update_info()
 
-        # Update the check state of child items
-    def update_children(self, item, check_state):
-        for i in range(item.childCount()):
-            child = item.child(i)
-            child.setCheckState(0, check_state)
-            self.update_children(child, check_state)
+    def set_scan_controls_visible(self, visible):
+        self.scan_progress.setVisible(visible)
+        self.scan_label.setVisible(visible)
+        self.cancel_button.setVisible(visible)
+        self.view_button.setEnabled(not visible)
 
-        # Update the check state of parent items
-    def update_parents(self, item):
-        if item is None:
+        # Hand a batch of directory totals reported by the scan worker to the model
+    def add_scan_batch(self, batch):
+        if self.sender() is not self.scan_worker:
             return
+        self.model.apply_dir_totals(batch)
 
-        checked_count = sum(item.child(i).checkState(0) == Qt.Checked for i in range(item.childCount()))
-        total_count = item.childCount()
+        # Change the number of threads used to read files
+    def set_reader_workers(self, workers):
+        if workers == self.reader_pool.workers:
+            return
+        scanning = self.scan_worker is not None
+        self.cancel_scan()
+        self.reader_pool.shutdown()
+        self.reader_pool = ReaderPool(workers)
+        self.model.reader_pool = self.reader_pool
+        if scanning:
+            self.start_scan()
 
-        if checked_count == 0:
-            item.setCheckState(0, Qt.Unchecked)
-        elif checked_count == total_count:
-            item.setCheckState(0, Qt.Checked)
-        else:
-            item.setCheckState(0, Qt.PartiallyChecked)
+        # Change the custom ignore patterns and whether .gitignore files are honoured
+    def set_ignore_rules(self, patterns, use_gitignore):
+        patterns = list(patterns)
+        if patterns == self.ignore_patterns and use_gitignore == self.use_gitignore:
+            return
+        self.ignore_patterns = patterns
+        self.use_gitignore = use_gitignore
+        if self.model.root is not None:
+            self.view_structure()
 
-        self.update_parents(item.parent())
+        # Lines and content tokens are only counted while file contents are included
+    def on_include_contents_changed(self):
+        self.cancel_scan()
+        self.model.set_count_contents(self.include_contents.isChecked())
+        self.start_scan()
 
-        # Update the total lines and size information
+    def on_scan_progress(self, count):
+        self.scan_label.setText(f"Scanned {count} entries")
+
+    def on_scan_finished(self, completed):
+        if self.sender() is not self.scan_worker:
+            return
+        # The thread is still running until it handles the quit, so wait for it before letting it go
+        self.cancel_scan()
+        self.file_index.flush()
+        self.update_info()
+
+        # Update the total lines, size and token information from the root's selected totals
     def update_info(self):
-        total_lines = 0
-        total_size = 0
-
-        def count_lines_and_size(item):
-            nonlocal total_lines, total_size
-            if item.checkState(0) == Qt.Checked:
-                path = self.get_full_path(item)
-                if os.path.isfile(path):
-                    size = int(item.text(1).split()[0])
-                    total_size += size
-                    if self.include_contents.isChecked():
-                        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                            total_lines += sum(1 for _ in f)
-                for i in range(item.childCount()):
-                    count_lines_and_size(item.child(i))
-
-        root = self.tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            count_lines_and_size(root.child(i))
+        root = self.model.root
+        total_size, total_lines, total_tokens = root.selected if root is not None else EMPTY_TOTALS
 
         self.line_count_label.setText(f"Total lines: {total_lines}")
         self.file_size_label.setText(f"Total size: {total_size} bytes")
 
-        # Get the full path of an item in the tree
-    def get_full_path(self, item):
-        path = item.text(0)
-        parent = item.parent()
-        while parent:
-            path = os.path.join(parent.text(0), path)
-            parent = parent.parent()
-        return path
-
-        # Generate and copy the folder structure to clipboard
-    def generate_output(self):
-        output = []
-
-        def generate_structure(item, level=0):
-            if item.checkState(0) == Qt.Checked:
-                path = self.get_full_path(item)
-                output.append("  " * level + item.text(0))
-                if os.path.isfile(path) and self.include_contents.isChecked():
-                    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        output.append("  " * (level + 1) + "Content:")
-                        output.extend("  " * (level + 2) + line for line in content.splitlines())
-                for i in range(item.childCount()):
-                    generate_structure(item.child(i), level + 1)
-
-        root = self.tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            generate_structure(root.child(i))
-
-        pyperclip.copy("\n".join(output))
\ No newline at end of file
+        budget = self.token_budget_spin.value()
+        if budget:
+            self.token_count_label.setText(f"Estimated tokens: {total_tokens} / {budget}")
+            self.token_count_label.setStyleSheet("color: red;" if total_tokens > budget else "")
+        else:
+            self.token_count_label.setText(f"Estimated tokens: {total_tokens}")
+            self.token_count_label.setStyleSheet("")
+
+        # Deselect files, largest or lowest priority first, until the selection fits the token budget
+    def fit_to_budget(self):
+        budget = self.token_budget_spin.value()
+        if self.model.root is None or not budget:
+            return
+        if self.root_tokens() <= budget:
+            return
+
+        # Files inside unexpanded folders can only be deselected once they are listed
+        self.model.fetch_checked()
+        self.model.refresh_loaded_totals()
+        files = [(node, node.path(), node.selected[2]) for node in self.model.iter_checked_files()]
+        dropped = select_files_to_drop(files, self.root_tokens(), budget, self.fit_mode_combo.currentData())
+        self.model.set_check_states(dropped, Qt.Unchecked)
+
+    def root_tokens(self):
+        return self.model.root.selected[2] if self.model.root is not None else 0
+
+        # Get the full path of a node in the tree
+    def get_full_path(self, node):
+        return node.path()
+
+        # Yield (level, name, path, is_dir) for every checked entry, walking unloaded folders on disk
+    def iter_checked_entries(self, node, level=0):
+        if node.check_state == Qt.Unchecked:
+            return
+        path = node.path()
+        yield level, node.name, path, node.is_dir
+        if node.children is not None:
+            for child in node.children:
+                yield from self.iter_checked_entries(child, level + 1)
+        elif node.is_dir and node.check_state == Qt.Checked:
+            yield from iter_disk_entries(path, node.depth, level + 1, self.model.matcher_for(node))
+
+        # Yield the output lines for the checked entries, streaming file contents
+    def iter_output(self):
+        if self.model.root is None:
+            return
+        entries = self.iter_checked_entries(self.model.root)
+        yield from iter_output_lines(entries, self.include_contents.isChecked(), self.file_index, self.reader_pool)
+
+        # Create the sink for the selected output, or None if no file was chosen
+    def create_sink(self):
+        output = self.output_combo.currentText()
+        if output == "File":
+            file_path, _ = QFileDialog.getSaveFileName(self, "Save Folder Structure", "", "Text Files (*.txt);;All Files (*)")
+            if not file_path:
+                return None
+            return FileSink(file_path)
+        if output == "Standard Output":
+            return StdoutSink()
+        return ClipboardSink()
+
+        # Generate the folder structure and write it to the selected output
+    def generate_output(self, sink=None):
+        if sink is None:
+            sink = self.create_sink()
+            if sink is None:
+                return
+
+        with sink:
+            write_lines(self.iter_output(), sink)
+        self.file_index.flush()
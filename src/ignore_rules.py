@@ -0,0 +1,169 @@
+# ignore_rules.py
+# This module provides matching of .gitignore files and custom glob patterns while walking a folder.
+
+import os
+import re
+
+GITIGNORE_FILE_NAME = ".gitignore"
+
+# Patterns used when none have been configured
+DEFAULT_IGNORE_PATTERNS = [".git/", "node_modules/", "__pycache__/", ".venv/", "venv/", "*.pyc"]
+
+def translate_glob(pattern):
+    """Translate a gitignore glob (without leading '!' or trailing '/') to a regular expression."""
+    i = 0
+    n = len(pattern)
+    parts = []
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                at_start = i == 0 or pattern[i - 1] == "/"
+                if at_start and pattern.startswith("**/", i):
+                    # Leading or inner "**/" matches zero or more directories
+                    parts.append("(?:.*/)?")
+                    i += 3
+                    continue
+                if at_start and i + 2 == n:
+                    # Trailing "/**" matches everything inside
+                    parts.append(".*")
+                    i += 2
+                    continue
+            parts.append("[^/]*")
+        elif c == "?":
+            parts.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith("[!", i) or pattern.startswith("[^", i) else i + 1)
+            if end == -1:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                parts.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return "".join(parts)
+
+def parse_pattern(line):
+    """
+    Parse one .gitignore line into (regex, negated, dir_only), or None for blanks and comments.
+
+    The regex matches paths relative to the directory of the .gitignore, using '/' separators.
+    """
+    line = line.rstrip("\n\r")
+    if not line.strip() or line.startswith("#"):
+        return None
+    # Trailing spaces are ignored unless escaped
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+    line = stripped
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    anchored = "/" in line
+    line = line.lstrip("/")
+    regex = translate_glob(line)
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return regex, negated, dir_only
+
+class IgnoreRules:
+    """
+    The rules of a single .gitignore file (or list of patterns), compiled into combined regexes.
+
+    The alternatives are in reverse order, so the first one to match is the last matching rule,
+    which is the one that decides. Directory-only rules are left out of the file regex.
+    """
+
+    def __init__(self, base, lines):
+        self.base = base
+        # Paths below base start with base plus a separator
+        self.prefix_length = len(base) if base.endswith(os.sep) else len(base) + 1
+        rules = [rule for rule in (parse_pattern(line) for line in lines) if rule is not None]
+        self.dir_regex, self.dir_negated = self._compile(rules)
+        self.file_regex, self.file_negated = self._compile([rule for rule in rules if not rule[2]])
+
+    @staticmethod
+    def _compile(rules):
+        if not rules:
+            return None, ()
+        rules = list(reversed(rules))
+        regex = re.compile("|".join(f"({rule[0]})" for rule in rules), re.DOTALL)
+        return regex, tuple(rule[1] for rule in rules)
+
+    def __bool__(self):
+        return self.dir_regex is not None
+
+    def match(self, relative_path, is_dir):
+        """Return True if ignored, False if re-included by a negated rule, None if no rule matches."""
+        regex, negated = (self.dir_regex, self.dir_negated) if is_dir else (self.file_regex, self.file_negated)
+        if regex is None:
+            return None
+        m = regex.fullmatch(relative_path)
+        if m is None:
+            return None
+        return not negated[m.lastindex - 1]
+
+class IgnoreMatcher:
+    """
+    Decide which entries of a folder walk are ignored.
+
+    Holds the custom patterns of the walk's root and the .gitignore files found on the way
+    down, deepest first. Call child() for each directory that is descended into.
+    """
+
+    def __init__(self, root, patterns=(), use_gitignore=True, _chain=None):
+        self.root = root
+        self.use_gitignore = use_gitignore
+        if _chain is not None:
+            self.chain = _chain
+            return
+        self.chain = ()
+        custom = IgnoreRules(root, patterns)
+        if custom:
+            self.chain = (custom,)
+        self.chain = self._with_gitignore(root)
+
+    def _with_gitignore(self, directory):
+        if not self.use_gitignore:
+            return self.chain
+        try:
+            with open(os.path.join(directory, GITIGNORE_FILE_NAME), 'r', encoding='utf-8', errors='ignore') as f:
+                rules = IgnoreRules(directory, f.read().splitlines())
+        except OSError:
+            return self.chain
+        if not rules:
+            return self.chain
+        return (rules,) + self.chain
+
+    def child(self, directory):
+        """Return the matcher for the entries of a subdirectory, adding its .gitignore if it has one."""
+        chain = self._with_gitignore(directory)
+        if chain is self.chain:
+            return self
+        return IgnoreMatcher(self.root, use_gitignore=self.use_gitignore, _chain=chain)
+
+    def is_ignored(self, path, is_dir):
+        for rules in self.chain:
+            relative_path = path[rules.prefix_length:]
+            if os.sep != "/":
+                relative_path = relative_path.replace(os.sep, "/")
+            result = rules.match(relative_path, is_dir)
+            if result is not None:
+                return result
+        return False
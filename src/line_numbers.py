@@ -1,7 +1,108 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, 
+from itertools import count
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QStackedWidget,
                              QPushButton, QPlainTextEdit, QLabel, QFileDialog, QSpinBox)
-from PyQt5.QtGui import QFont
-import pyperclip
+from PyQt5.QtGui import QFont, QPainter, QPalette
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+from src.export import ClipboardSink, FileSink, write_lines
+from src.ignore_rules import DEFAULT_IGNORE_PATTERNS, IgnoreMatcher
+from src.line_view import TEXT_MARGIN, LineView
+from src.snippet_batch import iter_folder_files, locate_snippets, parse_code_blocks
+from src.snippet_index import SnippetIndex
+
+# How similar to a snippet the closest place in the file must be to number the snippet from it, when it is not found as it is
+FUZZY_MIN_SCORE = 0.6
+
+# Snippets with more lines than this are numbered as they are painted, saved or copied, instead of all at once
+LARGE_OUTPUT_LINES = 20000
+
+def iter_numbered_lines(lines, start):
+    """
+    Yield lines prefixed with their line numbers, right-aligned to the width of the highest one.
+
+    Args:
+        lines (list): The lines to number.
+        start (int): The number of the first line.
+    """
+    width = len(str(start + len(lines) - 1))
+    for number, line in zip(count(start), lines):
+        yield f"{number:>{width}}: {line}"
+
+class LocateWorker(QObject):
+    """
+    Locate the snippets of a batch in the files of a folder off the GUI thread.
+
+    `finished` carries the list of SnippetLocation lists, one per snippet, or None if the worker
+    was cancelled.
+    """
+    finished = pyqtSignal(object)
+
+    def __init__(self, folder, snippets, matcher=None):
+        super().__init__()
+        self.folder = folder
+        self.snippets = snippets
+        self.matcher = matcher
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        files = iter_folder_files(self.folder, self.matcher)
+        self.finished.emit(locate_snippets(self.snippets, files, cancelled=self.is_cancelled))
+
+class NumberedLinesView(LineView):
+    """
+    Read-only view of numbered lines that only formats and paints the lines in view.
+
+    It keeps the lines of the snippet and their first number, so showing a very large snippet
+    does not build the numbered text.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.start = 1
+        self.width_digits = 1
+
+        font = QFont("Courier", 10)
+        font.setStyleHint(QFont.Monospace)
+        self.setFont(font)
+
+        # Set the lines to show and the number of the first one
+    def set_lines(self, lines, start):
+        self.lines = lines
+        self.start = start
+        self.width_digits = len(str(start + len(lines) - 1))
+        self.max_line_length = self.width_digits + 2 + max(map(len, lines), default=0)
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self.update_scroll_bars()
+        self.viewport().update()
+
+    def iter_text_lines(self):
+        return iter_numbered_lines(self.lines, self.start)
+
+    def row_count(self):
+        return len(self.lines)
+
+        # Format and paint only the lines intersecting the exposed rectangle
+    def paintEvent(self, event):
+        first, last = self.rows_in(event.rect())
+        if last < first:
+            return
+
+        painter = QPainter(self.viewport())
+        painter.setFont(self.font())
+        painter.setPen(self.palette().color(QPalette.Text))
+        x = TEXT_MARGIN - self.horizontalScrollBar().value()
+        y = self.row_top(first)
+        for row in range(first, last + 1):
+            painter.drawText(x, y + self.ascent, f"{self.start + row:>{self.width_digits}}: {self.lines[row]}")
+            y += self.line_height
+        painter.end()
 
 class LineNumbersTab(QWidget):
     def __init__(self):
@@ -28,23 +129,46 @@ class LineNumbersTab(QWidget):
         self.start_line.setMinimum(1)
         options_layout.addWidget(QLabel("Start Line:"))
         options_layout.addWidget(self.start_line)
+        self.matches_label = QLabel()
+        options_layout.addWidget(self.matches_label, 1)
         self.layout.addLayout(options_layout)
 
-        # Add line numbers button
+        # Add line numbers and batch buttons
+        numbers_buttons_layout = QHBoxLayout()
         self.add_numbers_button = QPushButton("Add Line Numbers")
         self.add_numbers_button.clicked.connect(self.add_line_numbers)
-        self.layout.addWidget(self.add_numbers_button)
+        numbers_buttons_layout.addWidget(self.add_numbers_button)
+        self.locate_button = QPushButton("Locate Code Blocks in Folder")
+        self.locate_button.setToolTip("Find every fenced code block of the input in the files of a folder and number it")
+        self.locate_button.clicked.connect(self.browse_locate_folder)
+        numbers_buttons_layout.addWidget(self.locate_button)
+        self.layout.addLayout(numbers_buttons_layout)
+        # Cancelled threads are not waited for, so keep them and their workers until they have stopped
+        self.locate_threads = {}
+        self.locate_worker = None
+        self.locate_snippets = []
+        self.ignore_patterns = list(DEFAULT_IGNORE_PATTERNS)
+        self.use_gitignore = True
 
-        # Output
+        # Output, with a separate view for large snippets
         self.output = QPlainTextEdit()
         self.output.setFont(QFont("Courier", 10))
         self.output.setReadOnly(True)
-        self.layout.addWidget(self.output)
+        self.large_output = NumberedLinesView()
+        self.output_stack = QStackedWidget()
+        self.output_stack.addWidget(self.output)
+        self.output_stack.addWidget(self.large_output)
+        self.layout.addWidget(self.output_stack)
 
-        # Copy to clipboard button
+        # Copy to clipboard and save buttons
+        output_buttons_layout = QHBoxLayout()
         self.copy_button = QPushButton("Copy to Clipboard")
         self.copy_button.clicked.connect(self.copy_to_clipboard)
-        self.layout.addWidget(self.copy_button)
+        output_buttons_layout.addWidget(self.copy_button)
+        self.save_button = QPushButton("Save to File")
+        self.save_button.clicked.connect(self.save_to_file)
+        output_buttons_layout.addWidget(self.save_button)
+        self.layout.addLayout(output_buttons_layout)
 
     def browse_file(self):
         file, _ = QFileDialog.getOpenFileName(self, "Select File")
@@ -55,16 +179,32 @@ class LineNumbersTab(QWidget):
             with open(file, 'r') as f:
                 self.file_contents = f.read()
 
+    @property
+    def file_contents(self):
+        return self._file_contents
+
+        # Setting the contents indexes their lines once for all snippet lookups
+    @file_contents.setter
+    def file_contents(self, contents):
+        self._file_contents = contents
+        self.snippet_index = SnippetIndex(contents)
+
+        # Get the line numbers at which the snippet occurs in the loaded file
+    def find_all_lines_for_snippet(self, snippet):
+        return [i + 1 for i in self.snippet_index.find(snippet)]  # Line numbers start at 1
+
     def find_lines_for_snippet(self, snippet):
-        file_lines = self.file_contents.splitlines()
-        snippet_lines = snippet.splitlines()
-        start = -1
+        matches = self.find_all_lines_for_snippet(snippet)
+        if len(matches) > 1:
+            shown = ", ".join(map(str, matches[:10])) + (", ..." if len(matches) > 10 else "")
+            self.matches_label.setText(f"Found {len(matches)} times, at lines {shown}; numbering from the first")
+        else:
+            self.matches_label.setText("")
+        return matches[0] if matches else -1
 
-        for i in range(len(file_lines) - len(snippet_lines) + 1):
-            if all(file_lines[i+j].lstrip().startswith(snippet_line.lstrip()) for j, snippet_line in enumerate(snippet_lines)):
-                start = i + 1  # Line numbers start at 1
-                break
-        return start
+        # Get the closest places to a snippet that is not in the loaded file as it is, as (line number, score) tuples
+    def find_similar_lines_for_snippet(self, snippet):
+        return [(i + 1, score) for i, score in self.snippet_index.find_similar(snippet)]
 
     def add_line_numbers(self):
         snippet = self.code_input.toPlainText()
@@ -74,26 +214,134 @@ class LineNumbersTab(QWidget):
         # If file is loaded, find the start line of the snippet
         if hasattr(self, 'file_contents'):
             start = self.find_lines_for_snippet(snippet)
+            if start == -1:
+                # Fall back to the closest place, for snippets that were reformatted or edited after copying
+                candidates = [c for c in self.find_similar_lines_for_snippet(snippet) if c[1] >= FUZZY_MIN_SCORE]
+                if candidates:
+                    start = candidates[0][0]
+                    shown = ", ".join(f"line {line} ({score:.0%})" for line, score in candidates)
+                    self.matches_label.setText(f"Not found exactly; closest matches: {shown}; numbering from the first")
             if start != -1:
                 self.start_line.setValue(start)
             else:
-                self.output.setPlainText("Snippet not found in the loaded file.")
+                self.show_output("Snippet not found in the loaded file.")
                 return
         else:
             start = self.start_line.value()
 
-        # Calculate the width of the line number column based on the highest line number
-        num_lines = len(snippet.splitlines())
-        max_line_number = start + num_lines - 1
-        line_number_width = len(str(max_line_number))
+        lines = snippet.splitlines()
+        if len(lines) > LARGE_OUTPUT_LINES:
+            self.output.clear()
+            self.large_output.set_lines(lines, start)
+            self.output_stack.setCurrentWidget(self.large_output)
+        else:
+            self.show_output("\n".join(iter_numbered_lines(lines, start)))
+
+    def browse_locate_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder")
+        if folder:
+            self.locate_in_folder(folder)
+
+        # Locate the code blocks of the input in the files of a folder in the background
+    def locate_in_folder(self, folder):
+        snippets = parse_code_blocks(self.code_input.toPlainText())
+        if not snippets:
+            return
+        self.cancel_locate()
+        self.locate_snippets = snippets
+        thread = QThread()
+        worker = LocateWorker(folder, snippets, IgnoreMatcher(folder, self.ignore_patterns, self.use_gitignore))
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(self.on_locate_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(self.on_locate_thread_finished)
+        self.locate_threads[thread] = worker
+        self.locate_worker = worker
+        self.matches_label.setText(f"Locating {len(snippets)} code blocks in {folder}...")
+        self.locate_button.setEnabled(False)
+        thread.start()
+
+        # Stop locating without waiting for it; its result will be ignored
+    def cancel_locate(self):
+        if self.locate_worker is not None:
+            self.locate_worker.cancel()
+            self.locate_worker = None
+        self.locate_button.setEnabled(True)
+
+    def on_locate_thread_finished(self):
+        thread = self.sender()
+        # finished is emitted just before the thread exits
+        thread.wait()
+        self.locate_threads.pop(thread, None)
+
+    def on_locate_finished(self, locations):
+        if self.locate_worker is None or self.sender() is not self.locate_worker or locations is None:
+            return
+        self.cancel_locate()
+        self.show_batch_results(self.locate_snippets, locations)
+
+        # Stop locating and wait for the threads, before the tab is closed; the threads are still
+        # let go of by on_locate_thread_finished
+    def shutdown(self):
+        self.cancel_locate()
+        for thread, worker in list(self.locate_threads.items()):
+            worker.cancel()
+            thread.quit()
+            thread.wait()
 
-        # Generate the output with correctly aligned line numbers
+        # Change the entries left out when locating code blocks in a folder
+    def set_ignore_rules(self, patterns, use_gitignore):
+        self.ignore_patterns = list(patterns)
+        self.use_gitignore = use_gitignore
+
+        # Number every snippet from the first place it was found, under a header with its path and line range
+    def show_batch_results(self, snippets, locations):
         output = []
-        for i, line in enumerate(snippet.splitlines(), start=start):
-            formatted_line_number = f"{i:>{line_number_width}}"
-            output.append(f"{formatted_line_number}: {line}")
+        found = 0
+        for number, (snippet, snippet_locations) in enumerate(zip(snippets, locations), start=1):
+            if output:
+                output.append("")
+            lines = snippet.splitlines()
+            if not snippet_locations:
+                output.append(f"# Snippet {number}: not found")
+                output.extend(lines)
+                continue
+            found += 1
+            first, *others = snippet_locations
+            header = f"# {first.path}, lines {first.start}-{first.end}"
+            if others:
+                header += " (also at " + ", ".join(f"{o.path}:{o.start}-{o.end}" for o in others[:5])
+                header += ", ...)" if len(others) > 5 else ")"
+            output.append(header)
+            output.extend(iter_numbered_lines(lines, first.start))
+        self.matches_label.setText(f"Located {found} of {len(snippets)} code blocks")
+        self.show_output("\n".join(output))
+
+    def show_output(self, text):
+        self.output.setPlainText(text)
+        self.output_stack.setCurrentWidget(self.output)
+        self.large_output.set_lines([], 1)
 
-        self.output.setPlainText("\n".join(output))
+        # Yield the lines of the output, numbering the lines of a large snippet as they are needed
+    def iter_output_lines(self):
+        if self.output_stack.currentWidget() is self.large_output:
+            return self.large_output.iter_text_lines()
+        return iter(self.output.toPlainText().splitlines())
 
     def copy_to_clipboard(self):
-        pyperclip.copy(self.output.toPlainText())
\ No newline at end of file
+        if self.output_stack.currentWidget() is self.large_output:
+            with ClipboardSink() as sink:
+                write_lines(self.iter_output_lines(), sink)
+        else:
+            import pyperclip
+            pyperclip.copy(self.output.toPlainText())
+
+        # Write the output to a file in chunks
+    def save_to_file(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Numbered Lines", "", "Text Files (*.txt);;All Files (*)")
+        if not file_path:
+            return
+        with FileSink(file_path) as sink:
+            write_lines(self.iter_output_lines(), sink)
\ No newline at end of file
@@ -0,0 +1,83 @@
+# line_view.py
+# This module provides the base of the scrollable views that paint their lines of text themselves.
+
+from PyQt5.QtWidgets import QAbstractScrollArea
+from PyQt5.QtGui import QFontMetrics, QPalette
+from PyQt5.QtCore import QEvent
+
+# Space left above the first line and before the text of every line, in pixels
+TOP_MARGIN = 5
+TEXT_MARGIN = 5
+
+class LineView(QAbstractScrollArea):
+    """
+    Scroll area of lines of a monospace font, leaving the painting of the lines to subclasses.
+
+    Scrolling is by whole lines vertically and by pixels horizontally. Subclasses tell how many
+    rows there are (row_count), the width of the text area (pane_width), and keep max_line_length,
+    the length of the longest line in characters, up to date. The font metrics are cached once
+    per font, so subclasses set their font once the rows can be counted.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.max_line_length = 0
+        self.viewport().setBackgroundRole(QPalette.Base)
+        self.viewport().setAutoFillBackground(True)
+        self.verticalScrollBar().setSingleStep(1)
+        self.update_metrics()
+
+    def row_count(self):
+        return 0
+
+        # Width available to the text of a line
+    def pane_width(self):
+        return self.viewport().width()
+
+        # Cache the font metrics used for layout and painting
+    def update_metrics(self):
+        metrics = QFontMetrics(self.font())
+        self.line_height = max(1, metrics.height())
+        self.ascent = metrics.ascent()
+        self.char_width = max(1, metrics.horizontalAdvance("M"))
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.FontChange:
+            self.update_metrics()
+            self.update_scroll_bars()
+        super().changeEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scroll_bars()
+
+    def visible_line_count(self):
+        return max(1, (self.viewport().height() - TOP_MARGIN) // self.line_height)
+
+        # Get the first and last rows intersecting a rectangle of the viewport; last < first if there are none
+    def rows_in(self, rect):
+        first_visible = self.verticalScrollBar().value()
+        first = first_visible + max(0, (rect.top() - TOP_MARGIN) // self.line_height)
+        last = min(self.row_count() - 1, first_visible + (rect.bottom() - TOP_MARGIN) // self.line_height)
+        return first, last
+
+        # Get the top of a row in the viewport
+    def row_top(self, row):
+        return TOP_MARGIN + (row - self.verticalScrollBar().value()) * self.line_height
+
+        # Size the scroll bars to the number of lines and the longest line
+    def update_scroll_bars(self):
+        visible = self.visible_line_count()
+        vertical = self.verticalScrollBar()
+        vertical.setPageStep(visible)
+        vertical.setRange(0, max(0, self.row_count() - visible))
+
+        horizontal = self.horizontalScrollBar()
+        width = self.pane_width()
+        horizontal.setPageStep(width)
+        horizontal.setSingleStep(self.char_width)
+        horizontal.setRange(0, max(0, TEXT_MARGIN * 2 + self.max_line_length * self.char_width - width))
+
+        # Move the already painted part of the viewport and only repaint what scrolled into view
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().scroll(dx, dy * self.line_height)
@@ -7,14 +7,19 @@
 
 import sys
 import os
+import multiprocessing
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QTabWidget, QVBoxLayout, QAction, QMessageBox
 from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import QSettings
-from src.folder_structure import FolderStructureTab
-from src.line_numbers import LineNumbersTab
-from src.diff_viewer import DiffViewerTab
-from src.settings import SettingsDialog
-from src.update_checker import check_for_updates
+from PyQt5.QtCore import QSettings, QThread, QTimer
+from src.parallel import DEFAULT_READER_WORKERS
+from src.ignore_rules import DEFAULT_IGNORE_PATTERNS
+
+# The attribute each tool tab is kept in once it has been created, and its title, in tab order
+TABS = [
+    ("folder_structure_tab", "Folder Structure"),
+    ("line_numbers_tab", "Add Line Numbers"),
+    ("diff_viewer_tab", "Diff Viewer"),
+]
 
 os.environ['QT_ENABLE_HIGHDPI_SCALING'] = '0'
 os.environ['QT_FONT_DPI'] = '96'
@@ -38,18 +43,51 @@ class MainWindow(QMainWindow):
         self.tabs = QTabWidget()
         self.layout.addWidget(self.tabs)
 
-        # Initialize the three main tool tabs
-        self.folder_structure_tab = FolderStructureTab()
-        self.line_numbers_tab = LineNumbersTab()
-        self.diff_viewer_tab = DiffViewerTab()
+        # Add an empty page per tool tab; each tool is only created, and its module imported,
+        # when its tab is first shown
+        self.file_index = None
+        for name, title in TABS:
+            setattr(self, name, None)
+            page = QWidget()
+            QVBoxLayout(page).setContentsMargins(0, 0, 0, 0)
+            self.tabs.addTab(page, title)
+        self.tabs.currentChanged.connect(self.create_tab)
 
-        # Add the tool tabs to the tab widget
-        self.tabs.addTab(self.folder_structure_tab, "Folder Structure")
-        self.tabs.addTab(self.line_numbers_tab, "Add Line Numbers")
-        self.tabs.addTab(self.diff_viewer_tab, "Diff Viewer")
+        self.update_thread = None
+        self.update_worker = None
+        self.update_quiet = False
 
         self.create_menu()
         self.load_settings()
+        self.create_tab(self.tabs.currentIndex())
+
+        # Check for updates once the window is up
+        QTimer.singleShot(0, self.auto_check_updates)
+
+    def create_tab(self, index):
+        # Create the tool of a tab the first time it is shown
+        name = TABS[index][0]
+        if getattr(self, name) is not None:
+            return
+        if name == "folder_structure_tab":
+            from src.folder_structure import FolderStructureTab
+            tab = FolderStructureTab(self.shared_file_index())
+        elif name == "line_numbers_tab":
+            from src.line_numbers import LineNumbersTab
+            tab = LineNumbersTab()
+        else:
+            from src.diff_viewer import DiffViewerTab
+            tab = DiffViewerTab(self.shared_file_index())
+        setattr(self, name, tab)
+        self.tabs.widget(index).layout().addWidget(tab)
+        self.apply_tab_settings(name)
+
+    def shared_file_index(self):
+        # The folder structure and the diff viewer share one index of file contents
+        if self.file_index is None:
+            from src.file_index import FileIndex
+            self.file_index = FileIndex.open_default()
+        return self.file_index
 
     def create_menu(self):
         # Create the main menu bar with File and Help menus
@@ -79,6 +117,7 @@ class MainWindow(QMainWindow):
 
     def open_settings(self):
         # Open the settings dialog
+        from src.settings import SettingsDialog
         dialog = SettingsDialog(self)
         if dialog.exec_():
             self.load_settings()
@@ -89,9 +128,31 @@ class MainWindow(QMainWindow):
         theme = settings.value("theme", "Light")
         self.apply_theme(theme)
         
-        # Set the default folder structure depth
-        default_depth = int(settings.value("default_depth", 3))
-        self.folder_structure_tab.depth_combo.setCurrentText(str(default_depth))
+        # The default folder structure depth
+        self.default_depth = int(settings.value("default_depth", 3))
+
+        # The number of threads used to read files
+        self.reader_workers = settings.value("reader_workers", DEFAULT_READER_WORKERS, type=int)
+
+        # The entries left out of the folder structure, of folder comparisons and when locating code blocks
+        self.use_gitignore = settings.value("use_gitignore", True, type=bool)
+        self.ignore_patterns = settings.value("ignore_patterns", "\n".join(DEFAULT_IGNORE_PATTERNS)).splitlines()
+
+        for name, _ in TABS:
+            if getattr(self, name) is not None:
+                self.apply_tab_settings(name)
+
+    def apply_tab_settings(self, name):
+        # Apply the loaded settings to a created tab
+        if name == "folder_structure_tab":
+            self.folder_structure_tab.depth_combo.setCurrentText(str(self.default_depth))
+            self.folder_structure_tab.set_reader_workers(self.reader_workers)
+            self.folder_structure_tab.set_ignore_rules(self.ignore_patterns, self.use_gitignore)
+        elif name == "line_numbers_tab":
+            self.line_numbers_tab.set_ignore_rules(self.ignore_patterns, self.use_gitignore)
+        elif name == "diff_viewer_tab":
+            self.diff_viewer_tab.set_reader_workers(self.reader_workers)
+            self.diff_viewer_tab.set_ignore_rules(self.ignore_patterns, self.use_gitignore)
 
     def apply_theme(self, theme):
         # Apply the selected theme (light or dark)
@@ -100,7 +161,58 @@ class MainWindow(QMainWindow):
 
     def check_updates(self):
         # Check for available updates
-        check_for_updates(self)
+        self.start_update_check()
+
+    def auto_check_updates(self):
+        # Check for updates at startup if enabled, at most once per configured interval
+        from src.update_checker import DEFAULT_UPDATE_INTERVAL_DAYS, is_check_due
+        settings = QSettings("darkstarworks", "LLM-Coding Toolset")
+        if not settings.value("auto_update", True, type=bool):
+            return
+        interval = settings.value("update_interval_days", DEFAULT_UPDATE_INTERVAL_DAYS, type=int)
+        if is_check_due(interval):
+            self.start_update_check(quiet=True)
+
+    def start_update_check(self, quiet=False):
+        # Run the update check in the background; a quiet check only reports an available update
+        from src.update_checker import UpdateCheckWorker, default_cache_path
+        if self.update_thread is not None:
+            self.update_quiet = self.update_quiet and quiet
+            return
+        self.update_quiet = quiet
+        self.update_thread = QThread(self)
+        self.update_worker = UpdateCheckWorker(cache_path=default_cache_path())
+        self.update_worker.moveToThread(self.update_thread)
+        self.update_thread.started.connect(self.update_worker.run)
+        self.update_worker.finished.connect(self.on_update_check_finished)
+        self.update_thread.finished.connect(self.update_worker.deleteLater)
+        self.update_thread.start()
+
+    def on_update_check_finished(self, latest_version, error):
+        from src.update_checker import show_update_result
+        self.finish_update_thread()
+        show_update_result(self, latest_version, error, self.update_quiet)
+
+    def finish_update_thread(self):
+        if self.update_thread is not None:
+            self.update_thread.quit()
+            self.update_thread.wait()
+        self.update_thread = None
+        self.update_worker = None
+
+    def closeEvent(self, event):
+        # Stop the background work of the tabs, so that no thread is left running at exit
+        for name, _ in TABS:
+            tab = getattr(self, name)
+            if tab is not None:
+                tab.shutdown()
+        # Records of the shared file index are written in batches; write the last one
+        if self.file_index is not None:
+            self.file_index.close()
+            self.file_index = None
+        # A check in progress ends within the update timeout
+        self.finish_update_thread()
+        super().closeEvent(event)
 
     def show_about(self):
         # Display information about the application
@@ -115,4 +227,6 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    # Worker processes of a frozen build start by running the application again
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+# mapped_lines.py
+# This module provides read-only access to the lines of large files through a memory map and a line offset index.
+
+import mmap
+from array import array
+from itertools import accumulate, islice
+from src.file_index import SNIFF_SIZE, detect_encoding
+
+# Number of bytes split at a time while building the line offset index
+INDEX_CHUNK_SIZE = 1 << 22
+
+# Number of lines decoded at a time while iterating
+ITER_BLOCK_LINES = 8192
+
+class MappedLines:
+    """
+    The lines of a file, read on demand from a memory map instead of being loaded into memory.
+
+    Opening a file only builds an index of the byte offset at which every line starts, 8 bytes
+    per line; lines are decoded when they are accessed. The object behaves like a read-only
+    list of lines without their line breaks, so it can be passed to the diff engines in place of
+    the result of splitlines(). Lines are split at "\\n", with a "\\r" before it removed.
+
+    Args:
+        path (str): The file to map.
+
+    Raises:
+        OSError: If the file cannot be opened.
+        ValueError: If the file is UTF-16, whose line breaks are not single bytes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_SIZE)
+            encoding = detect_encoding(head)
+            if encoding == "utf-16":
+                raise ValueError(f"{path} is UTF-16 encoded")
+            self.encoding = encoding or "utf-8"
+            # Empty files cannot be mapped
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if head else b""
+        self._starts = self._index(3 if encoding == "utf-8-sig" else 0)
+
+    def _index(self, offset):
+        data = self._data
+        size = len(data)
+        starts = array('q', [offset])
+        for chunk_start in range(offset, size, INDEX_CHUNK_SIZE):
+            pieces = data[chunk_start:chunk_start + INDEX_CHUNK_SIZE].split(b"\n")
+            # Every piece but the last ends at a line break; the next line starts after it
+            ends = accumulate(map((1).__add__, map(len, pieces[:-1])), initial=chunk_start)
+            starts.extend(islice(ends, 1, None))
+        # A sentinel one past the line break that would end the last line, unless there is no last line
+        if starts[-1] < size:
+            starts.append(size + 1)
+        return starts
+
+    def __len__(self):
+        return len(self._starts) - 1
+
+    def lines(self, start, stop):
+        """Decode the lines from start up to stop in one go."""
+        start = max(0, start)
+        stop = min(len(self), stop)
+        if start >= stop:
+            return []
+        text = self._data[self._starts[start]:self._starts[stop] - 1].decode(self.encoding, errors='replace')
+        lines = text.split("\n")
+        if "\r" in text:
+            lines = [line[:-1] if line.endswith("\r") else line for line in lines]
+        return lines
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self.lines(start, stop)
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("line index out of range")
+        return self.lines(index, index + 1)[0]
+
+    def __iter__(self):
+        for start in range(0, len(self), ITER_BLOCK_LINES):
+            yield from self.lines(start, start + ITER_BLOCK_LINES)
@@ -0,0 +1,60 @@
+# parallel.py
+# This module provides a bounded thread pool for reading files concurrently.
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_READER_WORKERS = 4
+MAX_READER_WORKERS = 32
+
+class ReaderPool:
+    """
+    Thread pool for I/O-bound file reads. With a single worker everything runs inline.
+
+    Args:
+        workers (int): Number of reader threads.
+    """
+
+    def __init__(self, workers=DEFAULT_READER_WORKERS):
+        self.workers = max(1, min(int(workers), MAX_READER_WORKERS))
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="reader") if self.workers > 1 else None
+
+    def submit(self, func, *args):
+        """Schedule func(*args) and return a Future for its result."""
+        if self._executor is not None:
+            return self._executor.submit(func, *args)
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def map_ordered(self, func, items, prefetch=None):
+        """
+        Yield func(item) for every item, in the order of items.
+
+        At most `prefetch` calls (twice the number of workers by default) are in flight or
+        waiting to be consumed, so memory stays bounded however many items there are.
+        """
+        if self._executor is None:
+            for item in items:
+                yield func(item)
+            return
+
+        prefetch = prefetch or self.workers * 2
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(self._executor.submit(func, item))
+                if len(pending) >= prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,354 @@
+# patches.py
+# This module provides writing diffs as unified patches and applying unified patches, including imprecise ones.
+
+import os
+import re
+from collections import namedtuple
+from src.diff_engines import DEFAULT_ENGINE, diff_blocks, format_unified
+from src.file_index import KIND_TEXT, FileIndex
+
+# Unchanged lines written around each change of a patch
+PATCH_CONTEXT_LINES = 3
+
+# Number of context lines that may be dropped from each end of a hunk that does not match as a whole
+MAX_FUZZ = 2
+
+NULL_PATH = "/dev/null"
+
+_HUNK_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# A hunk of a patch: where its old lines were, the old and new lines, the " ", "-" or "+" prefix
+# of each of its lines, and the number of unchanged lines it starts and ends with
+Hunk = namedtuple("Hunk", ["old_start", "old_lines", "new_lines", "prefixes", "leading", "trailing"])
+
+# The hunks of one file; old_path is None for a new file and new_path None for a deleted one
+FilePatch = namedtuple("FilePatch", ["old_path", "new_path", "hunks"])
+
+# What happened when a file patch was applied to a folder: the number of hunks applied, the
+# indices of the ones that were not, and why the file could not be patched at all, if it could not
+PatchResult = namedtuple("PatchResult", ["path", "applied", "failed", "error"])
+
+def iter_patch_lines(old_lines, new_lines, old_name, new_name, blocks=None, engine=DEFAULT_ENGINE,
+                     n=PATCH_CONTEXT_LINES):
+    """
+    Yield the lines of a patch turning one list of lines into another, without line breaks.
+
+    Args:
+        old_name (str): The path written in the "---" header, or None for a new file.
+        new_name (str): The path written in the "+++" header, or None for a deleted file.
+        blocks (list): The matching blocks of the two lists, if already known.
+    """
+    if blocks is None:
+        blocks = diff_blocks(old_lines, new_lines, engine)
+    yield from format_unified(old_lines, new_lines, blocks, old_name or NULL_PATH, new_name or NULL_PATH, n, '')
+
+def iter_folder_patch_lines(changes, file_index=None, engine=DEFAULT_ENGINE):
+    """
+    Yield the lines of a patch for the changed files of a folder comparison, without line breaks.
+
+    Paths are written relative to the folders with git's "a/" and "b/" prefixes. Binary files
+    get a "Binary files ... differ" line instead of hunks.
+    """
+    file_index = file_index if file_index is not None else FileIndex()
+    for change in changes:
+        sides = []
+        for path in (change.old_path, change.new_path):
+            info = file_index.get_for_path(path) if path is not None else None
+            sides.append(info)
+        if any(info is not None and info.kind != KIND_TEXT for info in sides):
+            yield f"Binary files a/{change.path} and b/{change.path} differ"
+            continue
+        texts = []
+        for path, info in zip((change.old_path, change.new_path), sides):
+            if path is None:
+                texts.append([])
+                continue
+            with open(path, 'r', encoding=info.encoding if info is not None else 'utf-8', errors='replace') as f:
+                texts.append(f.read().splitlines())
+        yield from iter_patch_lines(texts[0], texts[1], f"a/{change.path}" if change.old_path else None,
+                                    f"b/{change.path}" if change.new_path else None, engine=engine)
+
+def _header_path(header):
+    path = header.split("\t")[0].strip()
+    return None if path == NULL_PATH else path
+
+def _make_hunk(old_start, old_count, lines):
+    # Blank lines at the end are usually the gap before the next part of the message
+    while lines and lines[-1][2]:
+        lines.pop()
+    old_lines = [text for prefix, text, _ in lines if prefix != '+']
+    new_lines = [text for prefix, text, _ in lines if prefix != '-']
+    leading = 0
+    while leading < len(lines) and lines[leading][0] == ' ':
+        leading += 1
+    trailing = 0
+    while trailing < len(lines) - leading and lines[-1 - trailing][0] == ' ':
+        trailing += 1
+    # Hunks that remove nothing start after the line in their header
+    start = old_start - 1 if old_count else old_start
+    prefixes = "".join(prefix for prefix, _, _ in lines)
+    return Hunk(max(0, start), old_lines, new_lines, prefixes, leading, trailing)
+
+def parse_patch(text):
+    """
+    Parse the unified diffs in a text, such as a patch pasted from a chat.
+
+    Line counts in hunk headers are not trusted to end a hunk: it runs until the next header or
+    the first line that is not part of a diff, and empty lines inside a hunk are taken as
+    unchanged empty lines whose leading space was lost. The counts do keep a removed "-- " line
+    followed by an added "++ " line, such as changed SQL comments, from being taken as a file
+    header while they are not used up. Hunks before any "---"/"+++" header are returned in a
+    FilePatch without paths.
+
+    Returns:
+        list: FilePatch tuples.
+    """
+    patches = []
+    hunks = None
+    hunk = None
+    # Only "\n" ends a line, so that form feeds and other separators stay inside their line
+    lines = [line[:-1] if line.endswith("\r") else line for line in text.split("\n")]
+    # Old and new lines the header of the current hunk has yet to see
+    old_left = new_left = 0
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ") and \
+                not (hunk is not None and old_left > 0 and new_left > 0):
+            if hunk is not None:
+                hunks.append(_make_hunk(*hunk))
+                hunk = None
+            hunks = []
+            patches.append(FilePatch(_header_path(line[4:]), _header_path(lines[i + 1][4:]), hunks))
+            i += 2
+            continue
+        match = _HUNK_HEADER_PATTERN.match(line)
+        if match:
+            if hunk is not None:
+                hunks.append(_make_hunk(*hunk))
+            if hunks is None:
+                hunks = []
+                patches.append(FilePatch(None, None, hunks))
+            old_count = int(match.group(2)) if match.group(2) is not None else 1
+            old_left = old_count
+            new_left = int(match.group(4)) if match.group(4) is not None else 1
+            hunk = (int(match.group(1)), old_count, [])
+        elif hunk is not None:
+            if line[:1] in (' ', '-', '+'):
+                hunk[2].append((line[:1], line[1:], False))
+                old_left -= line[:1] != '+'
+                new_left -= line[:1] != '-'
+            elif not line:
+                hunk[2].append((' ', '', True))
+                old_left -= 1
+                new_left -= 1
+            elif not line.startswith("\\"):
+                # "\ No newline at end of file" is skipped; anything else ends the hunk
+                hunks.append(_make_hunk(*hunk))
+                hunk = None
+        i += 1
+    if hunk is not None:
+        hunks.append(_make_hunk(*hunk))
+    return patches
+
+class LineIndex:
+    """
+    Positions of the lines of a text by their content, ignoring trailing whitespace.
+
+    Finding a block of lines looks up the positions of its rarest line and only compares the
+    block at those, instead of scanning the whole text.
+    """
+
+    def __init__(self, lines):
+        self.keys = [line.rstrip() for line in lines]
+        self.positions = {}
+        for number, key in enumerate(self.keys):
+            self.positions.setdefault(key, []).append(number)
+
+    def find(self, block, expected, min_start=0):
+        """
+        Find where a block of lines occurs, at or after min_start.
+
+        Returns:
+            int: The start of the occurrence nearest to the expected start, or None. An empty
+                block is found at the expected start.
+        """
+        if not block:
+            return max(min_start, min(expected, len(self.keys)))
+        keys = [line.rstrip() for line in block]
+        positions = self.positions
+        anchor = min(range(len(keys)), key=lambda k: len(positions.get(keys[k], ())))
+        best = None
+        for position in positions.get(keys[anchor], ()):
+            start = position - anchor
+            if start < min_start or start + len(keys) > len(self.keys):
+                continue
+            if (best is None or abs(start - expected) < abs(best - expected)) and \
+                    self.keys[start:start + len(keys)] == keys:
+                best = start
+        return best
+
+def _replacement(hunk, head, tail, lines, start):
+    # Unchanged lines are taken from the text, which may differ from the hunk in trailing whitespace
+    added = iter(hunk.new_lines[head:])
+    replacement = []
+    position = start
+    for prefix in hunk.prefixes[head:len(hunk.prefixes) - tail]:
+        if prefix == ' ':
+            next(added)
+            replacement.append(lines[position])
+            position += 1
+        elif prefix == '-':
+            position += 1
+        else:
+            replacement.append(next(added))
+    return replacement
+
+def apply_hunks(lines, hunks):
+    """
+    Apply hunks to a list of lines, locating each one by content rather than by line number.
+
+    Each hunk is looked for nearest to where its header puts it, corrected by how far the hunks
+    before it moved, and after the hunks before it. A hunk that does not match as a whole is
+    tried again with up to MAX_FUZZ unchanged lines dropped from each end.
+
+    The lines may keep their line breaks, which are ignored when matching. Unchanged lines are
+    copied from the given lines as they are; added lines come from the hunks, without line breaks.
+
+    Returns:
+        tuple: (new_lines, failed) where failed lists the indices of the hunks that were not applied.
+    """
+    index = LineIndex(lines)
+    edits = []
+    failed = []
+    min_start = 0
+    offset = 0
+    for number, hunk in enumerate(hunks):
+        start = None
+        for fuzz in range(MAX_FUZZ + 1):
+            head = min(fuzz, hunk.leading)
+            tail = min(fuzz, hunk.trailing)
+            if fuzz and head + tail < fuzz:
+                # Not enough context left to drop
+                break
+            block = hunk.old_lines[head:len(hunk.old_lines) - tail]
+            start = index.find(block, hunk.old_start + offset + head, min_start)
+            if start is not None:
+                break
+        if start is None:
+            failed.append(number)
+            continue
+        end = start + len(block)
+        edits.append((start, end, _replacement(hunk, head, tail, lines, start)))
+        offset = start - head - hunk.old_start
+        min_start = end
+
+    new_lines = []
+    position = 0
+    for start, end, replacement in edits:
+        new_lines.extend(lines[position:start])
+        new_lines.extend(replacement)
+        position = end
+    new_lines.extend(lines[position:])
+    return new_lines, failed
+
+def _split_lines(text):
+    # Lines with their own line breaks; only "\n" ends a line, unlike str.splitlines(), which
+    # also breaks at form feeds and other separators
+    parts = text.split("\n")
+    lines = [part + "\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+def _path_parts(path):
+    return path.replace("\\", "/").split("/")
+
+def _strip_count(folder, patches):
+    # The number of leading directories to strip, like patch -p: the first that finds a file the patch changes
+    for patch in patches:
+        if patch.old_path is None:
+            continue
+        parts = _path_parts(patch.old_path)
+        for strip in range(len(parts)):
+            if os.path.isfile(os.path.join(folder, *parts[strip:])):
+                return strip
+    return None
+
+def _patch_target(folder, path, must_exist, strip):
+    # An existing file is looked for with strip leading directories removed, then with any number;
+    # a new file is put where strip puts it, or else only loses an "a/" or "b/" prefix
+    parts = _path_parts(path)
+    if not must_exist:
+        if strip is None:
+            strip = 1 if parts[0] in ("a", "b") and len(parts) > 1 else 0
+        return os.path.join(folder, *parts[strip:]) if strip < len(parts) else None
+    for count in ([strip] if strip is not None else []) + list(range(len(parts))):
+        candidate = os.path.join(folder, *parts[count:])
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+def _is_inside(folder, path):
+    folder = os.path.realpath(folder)
+    path = os.path.realpath(path)
+    try:
+        return os.path.commonpath([folder, path]) == folder
+    except ValueError:
+        # Paths on different drives
+        return False
+
+def apply_patch_to_folder(folder, patches):
+    """
+    Apply file patches to the files of a folder, writing the files in place.
+
+    Paths are resolved against the folder with as many leading directories stripped as it takes
+    to find the files the patch changes, and new files get the same number stripped (so "a/" and
+    "b/" prefixes work). Paths that lead outside the folder, through ".." or symbolic links, are
+    refused. Lines the patch does not touch are written back as they were, with their own line
+    endings; added lines get the file's most common ending, and the final line break of the file
+    is kept. New files are created,
+    along with their directories, and deleted files removed once all their hunks applied.
+
+    Returns:
+        list: A PatchResult per file patch.
+    """
+    strip = _strip_count(folder, patches)
+    results = []
+    for patch in patches:
+        path = patch.old_path or patch.new_path
+        if path is None:
+            results.append(PatchResult(None, 0, list(range(len(patch.hunks))), "No file name in the patch"))
+            continue
+        target = _patch_target(folder, path, patch.old_path is not None, strip)
+        if target is None:
+            results.append(PatchResult(path, 0, list(range(len(patch.hunks))), "File not found"))
+            continue
+        if not _is_inside(folder, target):
+            results.append(PatchResult(path, 0, list(range(len(patch.hunks))), "Path is outside the folder"))
+            continue
+        try:
+            text = ""
+            if patch.old_path is not None:
+                with open(target, 'r', encoding='utf-8', errors='surrogateescape', newline='') as f:
+                    text = f.read()
+            crlf = text.count("\r\n")
+            newline = "\r\n" if crlf > text.count("\n") - crlf else "\n"
+            lines, failed = apply_hunks(_split_lines(text), patch.hunks)
+            applied = len(patch.hunks) - len(failed)
+            if patch.new_path is None and not failed and not lines:
+                os.remove(target)
+            elif applied:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                final_newline = text.endswith("\n") or not text
+                with open(target, 'w', encoding='utf-8', errors='surrogateescape', newline='') as f:
+                    for number, line in enumerate(lines, start=1):
+                        # Added lines have no line break, and neither may the line that was last
+                        if not line.endswith("\n") and (number < len(lines) or final_newline):
+                            line += newline
+                        f.write(line)
+        except OSError as e:
+            results.append(PatchResult(path, 0, list(range(len(patch.hunks))), str(e)))
+            continue
+        results.append(PatchResult(path, applied, failed, None))
+    return results
@@ -0,0 +1,24 @@
+# paths.py
+# This module provides the locations where the application keeps its data files.
+
+import os
+import sys
+
+ORGANIZATION_NAME = "darkstarworks"
+APPLICATION_NAME = "LLM-Coding Toolset"
+
+def app_data_dir():
+    """
+    Return the per-user data directory of the application, creating it if needed.
+
+    Uses the same organization and application names as QSettings, without importing Qt.
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(os.path.join("~", "AppData", "Local"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser(os.path.join("~", "Library", "Application Support"))
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser(os.path.join("~", ".local", "share"))
+    path = os.path.join(base, ORGANIZATION_NAME, APPLICATION_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -2,8 +2,11 @@
 # This module provides a dialog for managing user settings.
 
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QComboBox, QCheckBox, QPushButton)
+                             QComboBox, QCheckBox, QPushButton, QSpinBox, QPlainTextEdit)
 from PyQt5.QtCore import QSettings
+from src.ignore_rules import DEFAULT_IGNORE_PATTERNS
+from src.parallel import DEFAULT_READER_WORKERS, MAX_READER_WORKERS
+from src.update_checker import DEFAULT_UPDATE_INTERVAL_DAYS
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -26,10 +29,31 @@ class SettingsDialog(QDialog):
         self.depth_combo.addItems([str(i) for i in range(1, 11)])
         depth_layout.addWidget(self.depth_combo)
         self.layout.addLayout(depth_layout)
+
+        # Number of threads reading files in the folder structure tab
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("File Reader Threads:"))
+        self.reader_workers_spin = QSpinBox()
+        self.reader_workers_spin.setRange(1, MAX_READER_WORKERS)
+        workers_layout.addWidget(self.reader_workers_spin)
+        self.layout.addLayout(workers_layout)
+
+        # Entries left out of the folder structure
+        self.use_gitignore_check = QCheckBox("Honour .gitignore files")
+        self.layout.addWidget(self.use_gitignore_check)
+        self.layout.addWidget(QLabel("Ignore Patterns (one per line, .gitignore syntax):"))
+        self.ignore_patterns_edit = QPlainTextEdit()
+        self.layout.addWidget(self.ignore_patterns_edit)
         
         # Auto-check for updates
         self.auto_update_check = QCheckBox("Automatically check for updates")
         self.layout.addWidget(self.auto_update_check)
+        interval_layout = QHBoxLayout()
+        interval_layout.addWidget(QLabel("Days Between Automatic Checks:"))
+        self.update_interval_spin = QSpinBox()
+        self.update_interval_spin.setRange(1, 90)
+        interval_layout.addWidget(self.update_interval_spin)
+        self.layout.addLayout(interval_layout)
         
         # Save and Cancel buttons
         button_layout = QHBoxLayout()
@@ -48,12 +72,20 @@ class SettingsDialog(QDialog):
         settings = QSettings("darkstarworks", "LLM-Coding Toolset")
         self.theme_combo.setCurrentText(settings.value("theme", "Light"))
         self.depth_combo.setCurrentText(settings.value("default_depth", "3"))
+        self.reader_workers_spin.setValue(settings.value("reader_workers", DEFAULT_READER_WORKERS, type=int))
+        self.use_gitignore_check.setChecked(settings.value("use_gitignore", True, type=bool))
+        self.ignore_patterns_edit.setPlainText(settings.value("ignore_patterns", "\n".join(DEFAULT_IGNORE_PATTERNS)))
         self.auto_update_check.setChecked(settings.value("auto_update", True, type=bool))
+        self.update_interval_spin.setValue(settings.value("update_interval_days", DEFAULT_UPDATE_INTERVAL_DAYS, type=int))
     
         # Save current settings
     def save_settings(self):
         settings = QSettings("darkstarworks", "LLM-Coding Toolset")
         settings.setValue("theme", self.theme_combo.currentText())
         settings.setValue("default_depth", self.depth_combo.currentText())
+        settings.setValue("reader_workers", self.reader_workers_spin.value())
+        settings.setValue("use_gitignore", self.use_gitignore_check.isChecked())
+        settings.setValue("ignore_patterns", self.ignore_patterns_edit.toPlainText())
         settings.setValue("auto_update", self.auto_update_check.isChecked())
+        settings.setValue("update_interval_days", self.update_interval_spin.value())
         self.accept()
\ No newline at end of file
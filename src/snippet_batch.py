@@ -0,0 +1,162 @@
+# snippet_batch.py
+# This module provides locating many snippets, such as the code blocks of a chat answer, across the files of a folder.
+
+import multiprocessing
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from src.file_index import HUGE_FILE_SIZE, KIND_TEXT, SNIFF_SIZE, classify, detect_encoding
+from src.folder_core import scan_directory
+from src.snippet_index import SnippetIndex
+
+# Files handed to a worker process at a time
+FILES_PER_TASK = 32
+
+# Seconds between checks for cancellation while waiting for the worker processes
+CANCEL_POLL_INTERVAL = 0.1
+
+_FENCE_PATTERN = re.compile(r"^\s*(`{3,}|~{3,})")
+
+# Where a snippet was found: the path relative to the folder, with "/" as separator, and its first and last line numbers
+SnippetLocation = namedtuple("SnippetLocation", ["path", "start", "end"])
+
+def parse_code_blocks(text):
+    """
+    Get the contents of the fenced code blocks of a text, such as a chat answer.
+
+    Blocks are fenced by lines of three or more backticks or tildes; a block runs until a fence
+    of the same character at least as long, or to the end of the text. Text without any fence is
+    taken as a single snippet. Empty blocks are left out.
+
+    Returns:
+        list: The snippets, without their fences.
+    """
+    lines = text.splitlines()
+    if not any(_FENCE_PATTERN.match(line) for line in lines):
+        return [text] if text.strip() else []
+
+    blocks = []
+    block = None
+    for line in lines:
+        match = _FENCE_PATTERN.match(line)
+        if block is None:
+            if match:
+                fence = match.group(1)
+                block = []
+        elif match and match.group(1).startswith(fence) and line.strip() == match.group(1):
+            # A closing fence has no info string
+            blocks.append(block)
+            block = None
+        else:
+            block.append(line)
+    if block is not None:
+        blocks.append(block)
+    return ["\n".join(block) for block in blocks if any(line.strip() for line in block)]
+
+def iter_folder_files(folder, matcher=None, relative=""):
+    """
+    Yield the files below a folder that the matcher does not ignore.
+
+    Yields:
+        tuple: (relative_path, full_path, size), with "/" as separator in relative paths.
+    """
+    for name, full_path, is_dir, stat in scan_directory(folder, matcher):
+        if is_dir:
+            child_matcher = matcher.child(full_path) if matcher is not None else None
+            yield from iter_folder_files(full_path, child_matcher, relative + name + "/")
+        else:
+            yield relative + name, full_path, stat.st_size
+
+def _read_text(path, size):
+    # The text of a file, or None for binary, huge and unreadable files
+    if size > HUGE_FILE_SIZE:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    head = data[:SNIFF_SIZE]
+    if classify(head, size) != KIND_TEXT:
+        return None
+    return data.decode(detect_encoding(head) or 'utf-8', errors='replace')
+
+def _locate_in_files(snippets, files):
+    """
+    Find snippets in a list of (relative_path, full_path, size) files.
+
+    A file is only indexed if the longest line of one of the snippets occurs in it, and its index
+    is then shared by all the snippets.
+
+    Returns:
+        list: (snippet_number, SnippetLocation) tuples.
+    """
+    probes = [max((line.strip() for line in snippet.splitlines()), key=len, default="") for snippet in snippets]
+    found = []
+    for relative, full_path, size in files:
+        text = _read_text(full_path, size)
+        if text is None:
+            continue
+        candidates = [number for number, probe in enumerate(probes) if probe and probe in text]
+        if not candidates:
+            continue
+        index = SnippetIndex(text)
+        for number in candidates:
+            length = len(snippets[number].splitlines())
+            for start in index.find(snippets[number]):
+                found.append((number, SnippetLocation(relative, start + 1, start + length)))
+    return found
+
+def locate_snippets(snippets, files, workers=None, cancelled=None):
+    """
+    Find every place each snippet occurs in a set of files, using a pool of processes.
+
+    Matching is the same as for a single file (see SnippetIndex): indentation and surrounding
+    whitespace are ignored. Files are split into tasks of FILES_PER_TASK files; with one worker,
+    or a single task, everything runs in this process.
+
+    Args:
+        snippets (list): The snippets to find.
+        files (iterable): (relative_path, full_path, size) tuples, such as from iter_folder_files().
+        workers (int): Number of processes; the number of CPUs by default.
+        cancelled (callable): Polled between tasks; once it returns True, the tasks not started
+            yet are dropped and None is returned at once, without waiting for the running ones.
+
+    Returns:
+        list: A list of SnippetLocation tuples per snippet, sorted by path and line, or None if cancelled.
+    """
+    files = list(files)
+    tasks = [files[i:i + FILES_PER_TASK] for i in range(0, len(files), FILES_PER_TASK)]
+    workers = workers or os.cpu_count() or 1
+    results = []
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            if cancelled is not None and cancelled():
+                return None
+            results.append(_locate_in_files(snippets, task))
+    else:
+        # Processes are spawned rather than forked, as the caller may be running other threads, such as Qt's
+        context = multiprocessing.get_context("spawn")
+        # Not used as a context manager, which would wait for the running tasks when cancelled
+        executor = ProcessPoolExecutor(min(workers, len(tasks)), mp_context=context)
+        try:
+            pending = {executor.submit(_locate_in_files, snippets, task) for task in tasks}
+            while pending:
+                if cancelled is not None and cancelled():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return None
+                done, pending = wait(pending, CANCEL_POLL_INTERVAL, FIRST_COMPLETED)
+                results.extend(future.result() for future in done)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+    locations = [[] for _ in snippets]
+    for result in results:
+        for number, location in result:
+            locations[number].append(location)
+    for snippet_locations in locations:
+        snippet_locations.sort()
+    return locations
@@ -0,0 +1,133 @@
+# snippet_index.py
+# This module provides an index of the lines of a file for finding where a snippet of it occurs.
+
+from bisect import bisect_left
+from collections import Counter
+
+# Sorts after any character, to find the end of the range of lines starting with a prefix
+_MAX_CHAR = chr(0x10FFFF)
+
+# Lines occurring more often than this in the file, such as blank lines or lone braces, do not vote for candidates
+MAX_LINE_OCCURRENCES = 50
+
+# Number of candidate positions compared with a snippet in a similarity search
+SCORED_CANDIDATES = 10
+
+def _loose_key(line):
+    # Lines compared loosely have their whitespace removed and their quotes made the same
+    return "".join(line.split()).replace("'", '"').replace("`", '"')
+
+class SnippetIndex:
+    """
+    Index of the lines of a text for locating snippets copied from it.
+
+    A snippet matches at a line if each of its lines, stripped of surrounding whitespace, is
+    the start of the corresponding line of the text with its indentation removed. So snippets
+    match whatever their indentation, and their lines may be cut short.
+
+    The indented-stripped lines are kept sorted, so the lines starting with a given prefix are
+    a contiguous range found by binary search. A snippet is only compared at the positions of
+    its rarest line.
+
+    find_similar() also finds snippets that were reformatted or slightly edited; it indexes the
+    lines of the text a second way, without whitespace, the first time it is used.
+
+    Args:
+        text (str): The text to index.
+    """
+
+    def __init__(self, text):
+        self.keys = [line.lstrip() for line in text.splitlines()]
+        self.order = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self.sorted_keys = [self.keys[i] for i in self.order]
+        self.loose_keys = None
+        self.loose_first = None
+        self.loose_repeats = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _prefix_range(self, prefix):
+        start = bisect_left(self.sorted_keys, prefix)
+        end = bisect_left(self.sorted_keys, prefix + _MAX_CHAR, start) if prefix else len(self.sorted_keys)
+        return start, end
+
+    def find(self, snippet):
+        """
+        Find every place a snippet occurs.
+
+        Returns:
+            list: The 0-based indices of the lines at which matches start, in order.
+        """
+        snippet_lines = [line.strip() for line in snippet.splitlines()]
+        if not snippet_lines or len(snippet_lines) > len(self.keys):
+            return []
+        ranges = [self._prefix_range(line) for line in snippet_lines]
+        anchor = min(range(len(ranges)), key=lambda j: ranges[j][1] - ranges[j][0])
+        start, end = ranges[anchor]
+
+        keys = self.keys
+        last_start = len(keys) - len(snippet_lines)
+        matches = []
+        for position in self.order[start:end]:
+            first = position - anchor
+            if 0 <= first <= last_start and all(keys[first + j].startswith(line)
+                                                for j, line in enumerate(snippet_lines)):
+                matches.append(first)
+        matches.sort()
+        return matches
+
+    def _build_loose_index(self):
+        self.loose_keys = [_loose_key(key) for key in self.keys]
+        # Most lines are unique, so only the lines that repeat get a list of their positions
+        self.loose_first = {}
+        self.loose_repeats = {}
+        for number, key in enumerate(self.loose_keys):
+            first = self.loose_first.setdefault(key, number)
+            if first != number:
+                self.loose_repeats.setdefault(key, [first]).append(number)
+
+    def _loose_positions(self, key):
+        if key in self.loose_repeats:
+            return self.loose_repeats[key]
+        return [self.loose_first[key]] if key in self.loose_first else []
+
+    def find_similar(self, snippet, limit=3):
+        """
+        Find the places most similar to a snippet, for snippets that do not occur as they are.
+
+        Lines are compared without whitespace and with all quotes the same. Each line of the
+        snippet found in the text votes for the position the snippet would start at, so a
+        snippet with edited or re-wrapped lines is still located by its other lines. The
+        SCORED_CANDIDATES positions with the most votes are then scored by the similarity of
+        the snippet to the lines there.
+
+        Returns:
+            list: Up to limit (line_index, score) tuples, best first, with scores between 0 and 1.
+        """
+        from difflib import SequenceMatcher
+        if self.loose_keys is None:
+            self._build_loose_index()
+        snippet_keys = [_loose_key(line) for line in snippet.splitlines()]
+        votes = Counter()
+        for j, key in enumerate(snippet_keys):
+            positions = self._loose_positions(key) if key else None
+            if positions and len(positions) <= MAX_LINE_OCCURRENCES:
+                votes.update(position - j for position in positions)
+
+        # Take the best voted starts, leaving out ones overlapping a better one
+        candidates = []
+        for start, _ in votes.most_common():
+            if len(candidates) == SCORED_CANDIDATES:
+                break
+            if all(abs(start - other) >= max(1, len(snippet_keys)) for other in candidates):
+                candidates.append(start)
+
+        target = "".join(snippet_keys)
+        scored = []
+        for start in candidates:
+            first = max(0, start)
+            window = "".join(self.loose_keys[first:start + len(snippet_keys)])
+            scored.append((first, SequenceMatcher(None, target, window, autojunk=False).ratio()))
+        scored.sort(key=lambda candidate: -candidate[1])
+        return scored[:limit]
@@ -0,0 +1,102 @@
+# tokens.py
+# This module provides a fast token count estimate and fitting a selection of files to a token budget.
+
+import os
+import re
+
+# Runs of letters and groups of up to DIGITS_PER_TOKEN digits are at least one token each;
+# long words are split every LETTERS_PER_TOKEN letters
+_WORD_PATTERN = re.compile(rb"[A-Za-z]+|[0-9]{1,3}")
+LETTERS_PER_TOKEN = 5
+DIGITS_PER_TOKEN = 3
+NON_ASCII_BYTES_PER_TOKEN = 2
+
+_ALL_BYTES = bytes(range(256))
+_LETTERS = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_DIGITS = b"0123456789"
+_WHITESPACE = b" \t\r\n\x0b\x0c"
+_SYMBOLS = bytes(b for b in range(0x80) if b not in _LETTERS + _DIGITS + _WHITESPACE)
+
+# bytes.translate deletion tables: deleting everything except one class leaves only that class
+_NOT_LETTERS = bytes(b for b in _ALL_BYTES if b not in _LETTERS)
+_NOT_DIGITS = bytes(b for b in _ALL_BYTES if b not in _DIGITS)
+_NOT_SYMBOLS = bytes(b for b in _ALL_BYTES if b not in _SYMBOLS)
+_NOT_NON_ASCII = bytes(range(0x80))
+
+# Tokens for the "Content:" line written before every exported file
+CONTENT_HEADER_TOKENS = 2
+
+def estimate_tokens(data):
+    """
+    Estimate the number of tokens a BPE tokenizer produces for a block of text.
+
+    Works on raw bytes with bytes.translate and a single regex, so it runs at C speed: a token
+    per word or group of digits (more for long words), per symbol, per line break, and per
+    couple of non-ASCII bytes.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'ignore')
+    if not data:
+        return 0
+    words = len(_WORD_PATTERN.findall(data))
+    letters = len(data.translate(None, _NOT_LETTERS))
+    digits = len(data.translate(None, _NOT_DIGITS))
+    symbols = len(data.translate(None, _NOT_SYMBOLS))
+    non_ascii = len(data.translate(None, _NOT_NON_ASCII))
+    return (max(words, -(-letters // LETTERS_PER_TOKEN) + -(-digits // DIGITS_PER_TOKEN))
+            + symbols
+            + data.count(b"\n")
+            + -(-non_ascii // NON_ASCII_BYTES_PER_TOKEN))
+
+def entry_tokens(name):
+    """Estimate the tokens of an entry's line in the exported structure."""
+    return estimate_tokens(name) + 1
+
+# Files that are rarely worth their tokens: lockfiles, minified or generated output, data and logs
+LOW_PRIORITY_NAMES = {"package-lock.json", "pnpm-lock.yaml", "go.sum"}
+LOW_PRIORITY_SUFFIXES = (".lock", ".min.js", ".min.css", ".map", ".svg", ".csv", ".tsv", ".log", ".snap")
+
+# Documentation and configuration
+MEDIUM_PRIORITY_SUFFIXES = (".md", ".rst", ".txt", ".json", ".yaml", ".yml", ".toml", ".ini", ".cfg",
+                            ".xml", ".html", ".css")
+
+def file_priority(path):
+    """Return 0 (lowest), 1 or 2 (source code) for how much a file is worth including."""
+    name = os.path.basename(path).lower()
+    if name in LOW_PRIORITY_NAMES or name.endswith(LOW_PRIORITY_SUFFIXES):
+        return 0
+    if name.endswith(MEDIUM_PRIORITY_SUFFIXES):
+        return 1
+    return 2
+
+FIT_LARGEST_FIRST = "largest"
+FIT_LOWEST_PRIORITY_FIRST = "priority"
+
+def select_files_to_drop(files, total_tokens, budget, mode=FIT_LARGEST_FIRST):
+    """
+    Pick files to deselect until the selection fits a token budget.
+
+    Args:
+        files (list): (key, path, tokens) tuples of the selected files.
+        total_tokens (int): Estimated tokens of the whole selection.
+        budget (int): The token budget.
+        mode (str): FIT_LARGEST_FIRST, or FIT_LOWEST_PRIORITY_FIRST to drop low priority
+            files first, largest first within a priority.
+
+    Returns:
+        list: The keys of the files to deselect, in the order they were dropped.
+    """
+    if total_tokens <= budget:
+        return []
+    if mode == FIT_LOWEST_PRIORITY_FIRST:
+        ordered = sorted(files, key=lambda f: (file_priority(f[1]), -f[2]))
+    else:
+        ordered = sorted(files, key=lambda f: -f[2])
+
+    dropped = []
+    for key, _, tokens in ordered:
+        if total_tokens <= budget:
+            break
+        dropped.append(key)
+        total_tokens -= tokens
+    return dropped
@@ -1,29 +1,163 @@
 # update_checker.py
 # This module provides functionality to check for updates to the application.
 
-import requests
+import json
+import os
+import re
+import time
 from PyQt5.QtWidgets import QMessageBox
+from PyQt5.QtCore import QObject, pyqtSignal
+from src.paths import app_data_dir
 
 CURRENT_VERSION = "1.0.0"
 UPDATE_URL = "https://api.github.com/repos/darkstarworks/llm-coding-toolset/releases/latest"
 
-def check_for_updates(parent=None):
+# Seconds to wait for the server to connect and to answer before a check fails
+UPDATE_TIMEOUT = 5
+
+# Automatic checks at startup are made at most once per this many days
+DEFAULT_UPDATE_INTERVAL_DAYS = 1
+
+# The ETag and tag of the last release response, and the time of the last check
+CACHE_FILE_NAME = "update_check.json"
+
+def default_cache_path():
+    return os.path.join(app_data_dir(), CACHE_FILE_NAME)
+
+def version_key(version):
+    """
+    Turn a version such as "v1.10.0" or "2.0.0-rc.1" into a key that sorts versions semantically.
+
+    Release numbers compare as numbers, with missing ones counting as 0. A pre-release sorts
+    before its release, and its dot-separated identifiers compare as numbers when they are
+    numbers. Build metadata after "+" is ignored.
+    """
+    version = version.strip().lstrip("vV").split("+", 1)[0]
+    release, _, prerelease = version.partition("-")
+    numbers = [int(re.match(r"\d*", part).group() or 0) for part in release.split(".")]
+    while numbers and numbers[-1] == 0:
+        numbers.pop()
+    if not prerelease:
+        return (tuple(numbers), 1, ())
+    identifiers = tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in prerelease.split("."))
+    return (tuple(numbers), 0, identifiers)
+
+def is_newer_version(latest, current=CURRENT_VERSION):
+    return version_key(latest) > version_key(current)
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def save_cache(cache_path, cache):
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+
+def is_check_due(interval_days=DEFAULT_UPDATE_INTERVAL_DAYS, cache_path=None):
+    """Tell whether the last check recorded in the cache is at least interval_days old."""
+    cache = load_cache(cache_path or default_cache_path())
+    checked_at = cache.get("checked_at", 0)
+    return not isinstance(checked_at, (int, float)) or time.time() - checked_at >= interval_days * 86400
+
+def fetch_latest_version(url=None, timeout=UPDATE_TIMEOUT, cache_path=None):
+    """
+    Get the tag of the latest release, revalidating the cached response by its ETag.
+
+    With a cache, the request carries If-None-Match, and a 304 Not Modified answer reuses the
+    cached tag, so repeated checks do not download the release again. The time of the check is
+    recorded in the cache.
+
+    Args:
+        url (str): The release to check; UPDATE_URL by default.
+        cache_path (str): The JSON file caching the last response; None to not cache.
+
+    Raises:
+        requests.RequestException: If the server cannot be reached in time or answers with an error.
+        ValueError: If the response is not JSON.
+        KeyError: If the response has no tag_name.
+    """
+    # requests takes a while to import, so it is only imported once a check is made
+    import requests
+    cache = load_cache(cache_path) if cache_path else {}
+    headers = {}
+    if isinstance(cache.get("etag"), str) and isinstance(cache.get("tag_name"), str):
+        headers["If-None-Match"] = cache["etag"]
+    response = requests.get(url or UPDATE_URL, headers=headers, timeout=timeout)
+    if headers and response.status_code == 304:
+        latest_version = cache["tag_name"]
+    else:
+        response.raise_for_status()
+        latest_version = response.json()["tag_name"]
+        etag = response.headers.get("ETag")
+        cache = {"etag": etag if isinstance(etag, str) else None, "tag_name": latest_version}
+    if cache_path:
+        cache["checked_at"] = time.time()
+        save_cache(cache_path, cache)
+    return latest_version
+
+def show_update_result(parent, latest_version, error, quiet=False):
+    """
+    Tell the user the outcome of an update check.
+
+    Args:
+        latest_version (str): The latest release, or None if the check failed.
+        error (str): Why the check failed.
+        quiet (bool): Only speak up if an update is available, as for automatic checks.
+    """
+    if latest_version is None:
+        if not quiet:
+            QMessageBox.warning(parent, "Update Check Failed", f"Failed to check for updates: {error}")
+    elif is_newer_version(latest_version):
+        QMessageBox.information(parent, "Update Available",
+                                f"A new version ({latest_version}) is available. "
+                                "Please visit the GitHub repository to download the latest version.")
+    elif not quiet:
+        QMessageBox.information(parent, "No Updates", "You are using the latest version.")
+
+class UpdateCheckWorker(QObject):
+    """
+    Fetch the latest release off the GUI thread.
+
+    `finished` carries the latest version and an empty string, or None and the error message
+    if the check failed.
+    """
+    finished = pyqtSignal(object, str)
+
+    def __init__(self, url=None, timeout=UPDATE_TIMEOUT, cache_path=None):
+        super().__init__()
+        self.url = url
+        self.timeout = timeout
+        self.cache_path = cache_path
+
+    def run(self):
+        try:
+            latest_version = fetch_latest_version(self.url, self.timeout, self.cache_path)
+        except Exception as e:
+            self.finished.emit(None, str(e))
+            return
+        self.finished.emit(latest_version, "")
+
+def check_for_updates(parent=None, cache_path=None):
     """
     Check for updates by comparing the current version with the latest release on GitHub.
-    
+
+    This blocks until the server answers or UPDATE_TIMEOUT passes; UpdateCheckWorker runs the
+    same check in the background.
+
     Args:
         parent (QWidget): The parent widget for displaying message boxes.
+        cache_path (str): The file caching the last response, if any.
     """
     try:
-        response = requests.get(UPDATE_URL)
-        response.raise_for_status()
-        latest_version = response.json()["tag_name"]
-        
-        if latest_version > CURRENT_VERSION:
-            QMessageBox.information(parent, "Update Available", 
-                                    f"A new version ({latest_version}) is available. "
-                                    "Please visit the GitHub repository to download the latest version.")
-        else:
-            QMessageBox.information(parent, "No Updates", "You are using the latest version.")
+        latest_version = fetch_latest_version(cache_path=cache_path)
     except Exception as e:
-        QMessageBox.warning(parent, "Update Check Failed", f"Failed to check for updates: {str(e)}")
\ No newline at end of file
+        show_update_result(parent, None, str(e))
+        return
+    show_update_result(parent, latest_version, "")
@@ -0,0 +1,63 @@
+# From the root directory, run:
+# python -m unittest tests.test_cli
+
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+import shutil
+from src.cli import main
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.test_dir, "folder", "subfolder"))
+        os.makedirs(os.path.join(self.test_dir, "folder", "node_modules"))
+        with open(os.path.join(self.test_dir, "folder", "file1.txt"), "w") as f:
+            f.write("Test content")
+        with open(os.path.join(self.test_dir, "folder", "subfolder", "file2.txt"), "w") as f:
+            f.write("first\nsecond")
+        with open(os.path.join(self.test_dir, "folder", "node_modules", "lib.js"), "w") as f:
+            f.write("ignored")
+        self.folder = os.path.join(self.test_dir, "folder")
+        self.out_path = os.path.join(self.test_dir, "out.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def read_output(self):
+        with open(self.out_path, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_export_structure(self):
+        self.assertEqual(main(["export", self.folder, "--depth", "2", "--out", self.out_path]), 0)
+        output = self.read_output()
+        self.assertEqual(output[0], self.folder)
+        self.assertCountEqual(output[1:], ["  file1.txt", "  subfolder", "    file2.txt"])
+
+    def test_export_with_contents(self):
+        main(["export", self.folder, "--depth", "1", "--contents", "--ignore", "subfolder/",
+              "--out", self.out_path])
+        self.assertEqual(self.read_output(), [self.folder, "  file1.txt", "    Content:", "      Test content"])
+
+    def test_missing_folder(self):
+        self.assertEqual(main(["export", os.path.join(self.test_dir, "missing"), "--out", self.out_path]), 1)
+        self.assertFalse(os.path.exists(self.out_path))
+
+    def test_export_does_not_import_gui_dependencies(self):
+        code = ("import sys\n"
+                "from src.cli import main\n"
+                f"main(['export', {self.folder!r}, '--out', {self.out_path!r}])\n"
+                "print(sorted(m for m in ('PyQt5', 'pyperclip', 'requests') if m in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "[]")
+        self.assertTrue(os.path.exists(self.out_path))
+
+    # ... (other test methods)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+# From the root directory, run:
+# python -m unittest tests.test_diff_engines
+
+import unittest
+import difflib
+import random
+from src.diff_engines import (ENGINES, ENGINE_MYERS, ROW_CHANGE, ROW_EQUAL, ROW_FOLD, HunkIndex, IncrementalDiff,
+                              common_prefix_length, common_suffix_length, diff_blocks, get_opcodes, intern_lines,
+                              intraline_changes, unified_diff)
+
+class TestDiffEngines(unittest.TestCase):
+    def random_texts(self, rng):
+        alphabet = rng.randint(1, 6)
+        a = [str(rng.randint(0, alphabet)) for _ in range(rng.randint(0, 20))]
+        b = [str(rng.randint(0, alphabet)) for _ in range(rng.randint(0, 20))]
+        return a, b
+
+    def longest_common_subsequence(self, a, b):
+        previous = [0] * (len(b) + 1)
+        for x in a:
+            current = [0]
+            for j, y in enumerate(b):
+                current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+            previous = current
+        return previous[-1]
+
+    def test_intern_lines(self):
+        a_ids, b_ids = intern_lines(["x", "y", "x"], ["y", "z"])
+        self.assertEqual(a_ids, [0, 1, 0])
+        self.assertEqual(b_ids, [1, 2])
+
+    def test_engines_produce_valid_edits(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            a, b = self.random_texts(rng)
+            a_ids, b_ids = intern_lines(a, b)
+            for name, blocks_for in ENGINES.items():
+                blocks = blocks_for(a_ids, b_ids)
+                self.assertEqual(blocks[-1], (len(a), len(b), 0))
+                rebuilt = []
+                for tag, i1, i2, j1, j2 in get_opcodes(blocks):
+                    if tag == 'equal':
+                        self.assertEqual(a[i1:i2], b[j1:j2], name)
+                        rebuilt += a[i1:i2]
+                    else:
+                        rebuilt += b[j1:j2]
+                self.assertEqual(rebuilt, b, name)
+
+    def test_myers_is_minimal(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            a, b = self.random_texts(rng)
+            blocks = ENGINES[ENGINE_MYERS](*intern_lines(a, b))
+            self.assertEqual(sum(size for _, _, size in blocks), self.longest_common_subsequence(a, b))
+
+    def test_difflib_engine_matches_difflib(self):
+        rng = random.Random(2)
+        for _ in range(200):
+            a, b = self.random_texts(rng)
+            for n in (0, 3):
+                self.assertEqual(list(unified_diff(a, b, n=n, lineterm='')),
+                                 list(difflib.unified_diff(a, b, n=n, lineterm='')))
+
+    def test_unified_diff_format(self):
+        diff = list(unified_diff(["line1", "line2", "line3"], ["line1", "modified", "line3"],
+                                 lineterm='', n=0, engine=ENGINE_MYERS))
+        self.assertEqual(diff, ['--- ', '+++ ', '@@ -2 +2 @@', '-line2', '+modified'])
+
+    def test_incremental_diff_follows_edits(self):
+        rng = random.Random(3)
+        a = [str(rng.randint(0, 8)) for _ in range(500)]
+        b = list(a)
+        for engine in ENGINES:
+            live_diff = IncrementalDiff(engine)
+            live_diff.set_texts(a, b)
+            for _ in range(50):
+                edited = list(b)
+                position = rng.randrange(len(edited))
+                if rng.random() < 0.5:
+                    edited.insert(position, str(rng.randint(0, 12)))
+                else:
+                    del edited[position]
+                b = edited
+                self.assertTrue(live_diff.update(a, b))
+
+                rebuilt = []
+                for tag, i1, i2, j1, j2 in get_opcodes(live_diff.blocks):
+                    if tag == 'equal':
+                        self.assertEqual(a[i1:i2], b[j1:j2])
+                        rebuilt += a[i1:i2]
+                    else:
+                        rebuilt += b[j1:j2]
+                self.assertEqual(rebuilt, b)
+            self.assertFalse(live_diff.update(a, list(b)))
+
+    def test_incremental_diff_one_sided_edit(self):
+        a = [f"line {i}" for i in range(20000)]
+        b = list(a)
+        for k in range(0, len(b), 1000):
+            b[k] = "changed"
+        for engine in ENGINES:
+            live_diff = IncrementalDiff(engine)
+            live_diff.set_texts(a, b)
+            edited = list(b)
+            for k, line in [(10001, "typed"), (15000, None)]:
+                edited = list(edited)
+                if line is None:
+                    edited.insert(k, "inserted")
+                else:
+                    edited[k] = line
+
+                # Only the lines around the edit are diffed again, and the matches after it are kept
+                update = live_diff.plan(a, edited)
+                self.assertLess(update.size, 20, engine)
+                live_diff.apply(update, live_diff.compute(update))
+                for tag, i1, i2, j1, j2 in get_opcodes(live_diff.blocks):
+                    if tag == 'equal':
+                        self.assertEqual(a[i1:i2], edited[j1:j2])
+                matched = sum(size for _, _, size in live_diff.blocks)
+                self.assertEqual(matched, sum(size for _, _, size in diff_blocks(a, edited, engine)), engine)
+
+    def test_incremental_diff_output(self):
+        live_diff = IncrementalDiff(ENGINE_MYERS)
+        live_diff.set_texts(["a", "b", "c", "d"], ["a", "b", "c", "d"])
+        live_diff.update(["a", "b", "c", "d"], ["a", "x", "c", "d"])
+        self.assertEqual(list(live_diff.unified_diff(lineterm='', n=0)),
+                         ['--- ', '+++ ', '@@ -2 +2 @@', '-b', '+x'])
+
+    def test_common_prefix_and_suffix(self):
+        old = list(range(5000))
+        new = old[:1234] + [-1] + old[1300:]
+        self.assertEqual(common_prefix_length(old, new), 1234)
+        self.assertEqual(common_suffix_length(old, new, 5000), 3700)
+        self.assertEqual(common_suffix_length(old, new, 10), 10)
+
+    def test_hunk_index(self):
+        old = [f"line{i}" for i in range(100)]
+        new = old[:10] + ["changed"] + old[11:50] + old[52:]
+        index = HunkIndex(diff_blocks(old, new), context=3)
+
+        # Fold, 3 context lines, change, 3 context lines, fold, 3 context lines, change, 3 context lines, fold
+        self.assertEqual(len(index), 1 + 3 + 1 + 3 + 1 + 3 + 2 + 3 + 1)
+        self.assertEqual(index.row(0), (ROW_FOLD, range(0, 7), range(0, 7)))
+        self.assertEqual(index.row(4), (ROW_CHANGE, 10, 10))
+        self.assertEqual(index.row(12), (ROW_CHANGE, 50, None))
+        self.assertEqual(index.row(13), (ROW_CHANGE, 51, None))
+        self.assertEqual(index.row(14), (ROW_EQUAL, 52, 50))
+
+        self.assertEqual(index.next_change_row(0), 4)
+        self.assertEqual(index.next_change_row(4), 12)
+        self.assertIsNone(index.next_change_row(12))
+        self.assertEqual(index.previous_change_row(12), 4)
+        self.assertIsNone(index.previous_change_row(4))
+
+        # Expanding a fold shows its first lines and keeps the rest folded
+        self.assertTrue(index.expand(0, 5))
+        self.assertEqual(index.row(0), (ROW_EQUAL, 0, 0))
+        self.assertEqual(index.row(5), (ROW_FOLD, range(5, 7), range(5, 7)))
+        self.assertEqual(index.next_change_row(0), 9)
+        self.assertFalse(index.expand(9, 5))
+
+        index.set_context(0)
+        self.assertEqual(index.change_rows, [1, 3])
+
+    def test_intraline_changes(self):
+        # A replaced word is narrowed down to the characters that differ
+        self.assertEqual(intraline_changes('value = compute(1, 2)', 'value = compute(1, 3)'),
+                         (((19, 20),), ((19, 20),)))
+        self.assertEqual(intraline_changes('hello world', 'hello brave world'), ((), ((6, 12),)))
+        self.assertEqual(intraline_changes('same', 'same'), ((), ()))
+
+if __name__ == '__main__':
+    unittest.main()
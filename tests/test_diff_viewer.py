@@ -3,9 +3,18 @@
 
 import unittest
 from unittest.mock import patch, MagicMock
+import os
+import tempfile
+import shutil
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QSize
-from src.diff_viewer import DiffViewerTab, DiffViewer
+from PyQt5.QtCore import QPoint, QRect, QSize
+from PyQt5.QtCore import Qt
+from PyQt5.QtTest import QTest
+from src.diff_viewer import (AUTO_COMPARE_DELAY, BACKGROUND_DIFF_MIN_LINES, FOLD_EXPAND_LINES, PREVIEW_LINES,
+                             DiffViewerTab, DiffViewer, SideBySideViewer)
+from src.diff_engines import diff_blocks
+from src.file_index import FileIndex
+from src.patches import parse_patch
 
 class TestDiffViewer(unittest.TestCase):
     @classmethod
@@ -13,7 +22,7 @@ class TestDiffViewer(unittest.TestCase):
         cls.app = QApplication([])
 
     def setUp(self):
-        self.diff_viewer_tab = DiffViewerTab()
+        self.diff_viewer_tab = DiffViewerTab(FileIndex())
 
     def test_initial_state(self):
         self.assertEqual(self.diff_viewer_tab.text1.toPlainText(), "")
@@ -54,6 +63,205 @@ class TestDiffViewer(unittest.TestCase):
         ]
         self.diff_viewer_tab.diff_viewer.set_diff.assert_called_once_with(expected_diff)
 
+    def wait_for_diff(self):
+        for _ in range(200):
+            if not self.diff_viewer_tab.diff_threads:
+                break
+            QTest.qWait(20)
+
+    def test_compare_large_texts_in_background(self):
+        lines = [f"line{i}" for i in range(BACKGROUND_DIFF_MIN_LINES)]
+        self.diff_viewer_tab.text1.setPlainText("\n".join(lines))
+        lines[10] = "modified"
+        self.diff_viewer_tab.text2.setPlainText("\n".join(lines))
+        self.diff_viewer_tab.diff_viewer.set_diff = MagicMock()
+
+        self.diff_viewer_tab.compare_texts()
+        self.assertTrue(self.diff_viewer_tab.cancel_button.isVisibleTo(self.diff_viewer_tab))
+        self.wait_for_diff()
+
+        self.diff_viewer_tab.diff_viewer.set_diff.assert_called_once_with(
+            ['--- ', '+++ ', '@@ -11 +11 @@', '-line10', '+modified'])
+        self.assertFalse(self.diff_viewer_tab.cancel_button.isVisibleTo(self.diff_viewer_tab))
+
+    def test_shutdown_waits_for_comparisons(self):
+        lines = [f"line{i}" for i in range(BACKGROUND_DIFF_MIN_LINES)]
+        self.diff_viewer_tab.text1.setPlainText("\n".join(lines))
+        self.diff_viewer_tab.text2.setPlainText("\n".join(lines + ["added"]))
+        self.diff_viewer_tab.compare_texts()
+        self.diff_viewer_tab.compare_texts()
+        threads = list(self.diff_viewer_tab.diff_threads)
+        self.assertEqual(len(threads), 2)
+
+        self.diff_viewer_tab.shutdown()
+        self.assertTrue(all(thread.isFinished() for thread in threads))
+        self.wait_for_diff()
+        self.assertEqual(self.diff_viewer_tab.diff_threads, {})
+
+    def test_new_comparison_supersedes_running_one(self):
+        lines = [f"line{i}" for i in range(BACKGROUND_DIFF_MIN_LINES)]
+        self.diff_viewer_tab.text1.setPlainText("\n".join(lines))
+        self.diff_viewer_tab.text2.setPlainText("\n".join(lines + ["first"]))
+        self.diff_viewer_tab.diff_viewer.set_diff = MagicMock()
+        self.diff_viewer_tab.compare_texts()
+
+        self.diff_viewer_tab.text2.setPlainText("\n".join(lines + ["second"]))
+        self.diff_viewer_tab.compare_texts()
+        self.wait_for_diff()
+
+        self.diff_viewer_tab.diff_viewer.set_diff.assert_called_once()
+        self.assertEqual(self.diff_viewer_tab.diff_viewer.set_diff.call_args[0][0][-1], '+second')
+
+    def test_cancel_diff(self):
+        lines = [f"line{i}" for i in range(BACKGROUND_DIFF_MIN_LINES)]
+        self.diff_viewer_tab.text1.setPlainText("\n".join(lines))
+        self.diff_viewer_tab.diff_viewer.set_diff = MagicMock()
+        self.diff_viewer_tab.compare_texts()
+        self.diff_viewer_tab.cancel_diff()
+        self.wait_for_diff()
+
+        self.diff_viewer_tab.diff_viewer.set_diff.assert_not_called()
+        self.assertFalse(self.diff_viewer_tab.cancel_button.isVisibleTo(self.diff_viewer_tab))
+
+    def test_auto_compare_updates_after_edits(self):
+        lines = [f"line{i}" for i in range(100)]
+        self.diff_viewer_tab.text1.setPlainText("\n".join(lines))
+        self.diff_viewer_tab.text2.setPlainText("\n".join(lines))
+        self.diff_viewer_tab.auto_compare_check.setChecked(True)
+        self.assertEqual(self.diff_viewer_tab.diff_viewer.diff_lines, [])
+
+        self.diff_viewer_tab.diff_viewer.set_diff = MagicMock()
+        cursor = self.diff_viewer_tab.text2.textCursor()
+        cursor.setPosition(self.diff_viewer_tab.text2.document().findBlockByNumber(50).position())
+        cursor.insertText("inserted\n")
+        cursor.insertText("another\n")
+
+        # Edits are debounced into a single update
+        self.diff_viewer_tab.diff_viewer.set_diff.assert_not_called()
+        QTest.qWait(AUTO_COMPARE_DELAY + 200)
+        self.diff_viewer_tab.diff_viewer.set_diff.assert_called_once_with(
+            ['--- ', '+++ ', '@@ -50,0 +51,2 @@', '+inserted', '+another'])
+
+    def test_auto_compare_large_texts_in_background(self):
+        lines = [f"line{i}" for i in range(BACKGROUND_DIFF_MIN_LINES)]
+        self.diff_viewer_tab.text1.setPlainText("\n".join(lines))
+        self.diff_viewer_tab.text2.setPlainText("\n".join(lines[:100] + ["changed"] + lines[101:]))
+        self.diff_viewer_tab.auto_compare_check.setChecked(True)
+
+        # The first diff covers the whole texts, so it runs in the background
+        self.assertIsNotNone(self.diff_viewer_tab.diff_worker)
+        self.wait_for_diff()
+        self.assertEqual(self.diff_viewer_tab.diff_viewer.diff_lines, ['@@ -101 +101 @@', '-line100', '+changed'])
+
+        # A later edit only diffs a few lines again, on the GUI thread
+        self.diff_viewer_tab.diff_viewer.set_diff = MagicMock()
+        cursor = self.diff_viewer_tab.text2.textCursor()
+        cursor.setPosition(self.diff_viewer_tab.text2.document().findBlockByNumber(3000).position())
+        cursor.insertText("inserted\n")
+        self.diff_viewer_tab.auto_compare()
+        self.assertIsNone(self.diff_viewer_tab.diff_worker)
+        self.diff_viewer_tab.diff_viewer.set_diff.assert_called_once_with(
+            ['--- ', '+++ ', '@@ -101 +101 @@', '-line100', '+changed', '@@ -3000,0 +3001 @@', '+inserted'])
+
+    @patch('src.diff_viewer.LARGE_FILE_MIN_SIZE', 1)
+    @patch('PyQt5.QtWidgets.QFileDialog.getOpenFileName')
+    def test_load_large_file_is_mapped(self, mock_file_dialog):
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        lines = [f"line{i}" for i in range(PREVIEW_LINES * 4)]
+        for number, content in ((1, lines), (2, lines[:1500] + ["changed"] + lines[1501:])):
+            path = os.path.join(test_dir, f"file{number}.txt")
+            with open(path, "w") as f:
+                f.write("\n".join(content))
+            mock_file_dialog.return_value = (path, '')
+            self.diff_viewer_tab.load_file(number)
+
+        # The editors only hold a read-only preview
+        self.assertTrue(self.diff_viewer_tab.text1.isReadOnly())
+        self.assertEqual(self.diff_viewer_tab.text1.toPlainText().splitlines(), lines[:PREVIEW_LINES])
+
+        self.diff_viewer_tab.compare_texts()
+        self.assertEqual(self.diff_viewer_tab.diff_viewer.diff_lines, ['@@ -1501 +1501 @@', '-line1500', '+changed'])
+
+        # Scrolling the diff moves the previews to the hunk in view
+        self.diff_viewer_tab.on_diff_scrolled(0)
+        self.assertIn("changed", self.diff_viewer_tab.text2.toPlainText().splitlines())
+        self.assertNotIn("line0", self.diff_viewer_tab.text2.toPlainText().splitlines())
+
+    def test_side_by_side_and_change_navigation(self):
+        lines = [f"line{i}" for i in range(2000)]
+        changed = lines[:]
+        for i in range(20, 2000, 100):
+            changed[i] = "changed"
+        self.diff_viewer_tab.text1.setPlainText("\n".join(lines))
+        self.diff_viewer_tab.text2.setPlainText("\n".join(changed))
+        self.diff_viewer_tab.compare_texts()
+
+        self.diff_viewer_tab.side_by_side_check.setChecked(True)
+        viewer = self.diff_viewer_tab.side_by_side_viewer
+        self.diff_viewer_tab.resize(800, 600)
+        self.diff_viewer_tab.show()
+        self.addCleanup(self.diff_viewer_tab.close)
+        self.assertIs(self.diff_viewer_tab.current_viewer(), viewer)
+        self.assertTrue(viewer.isVisibleTo(self.diff_viewer_tab))
+        self.assertFalse(self.diff_viewer_tab.diff_viewer.isVisibleTo(self.diff_viewer_tab))
+
+        self.diff_viewer_tab.next_change_button.click()
+        self.diff_viewer_tab.next_change_button.click()
+        self.assertEqual(viewer.index.row(viewer.verticalScrollBar().value())[1:], (120, 120))
+        self.diff_viewer_tab.previous_change_button.click()
+        self.assertEqual(viewer.index.row(viewer.verticalScrollBar().value())[1:], (20, 20))
+
+        # 20 changes and the folds before, between and after them
+        self.diff_viewer_tab.context_spin.setValue(0)
+        self.assertEqual(len(viewer.index), 41)
+
+    def test_compare_folders_diffs_selected_file(self):
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        for folder, content in (("old", "line1\nline2"), ("new", "line1\nchanged")):
+            os.makedirs(os.path.join(test_dir, folder))
+            with open(os.path.join(test_dir, folder, "file.txt"), "w") as f:
+                f.write(content)
+            with open(os.path.join(test_dir, folder, "same.txt"), "w") as f:
+                f.write("same")
+        with open(os.path.join(test_dir, "new", "added.txt"), "w") as f:
+            f.write("added")
+
+        self.diff_viewer_tab.compare_folders(os.path.join(test_dir, "old"), os.path.join(test_dir, "new"))
+        self.wait_for_diff()
+        self.assertEqual([self.diff_viewer_tab.folder_changes_list.item(i).text()
+                          for i in range(self.diff_viewer_tab.folder_changes_list.count())],
+                         ["A  added.txt", "M  file.txt"])
+
+        self.diff_viewer_tab.diff_viewer.set_diff = MagicMock()
+        self.diff_viewer_tab.folder_changes_list.setCurrentRow(1)
+        self.diff_viewer_tab.diff_viewer.set_diff.assert_called_once_with(
+            ['--- ', '+++ ', '@@ -2 +2 @@', '-line2', '+changed'])
+
+    @patch('PyQt5.QtWidgets.QFileDialog.getSaveFileName')
+    def test_save_patch(self, mock_file_dialog):
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        patch_path = os.path.join(test_dir, "change.patch")
+        mock_file_dialog.return_value = (patch_path, '')
+        self.diff_viewer_tab.text1.setPlainText("line1\nline2\nline3")
+        self.diff_viewer_tab.text2.setPlainText("line1\nmodified\nline3")
+        self.diff_viewer_tab.compare_texts()
+
+        self.diff_viewer_tab.save_patch()
+        with open(patch_path) as f:
+            self.assertEqual(f.read(), "--- a/text1\n+++ b/text2\n@@ -1,3 +1,3 @@\n line1\n-line2\n+modified\n line3\n")
+
+    @patch('src.diff_viewer.QMessageBox')
+    def test_patch_text(self, mock_message_box):
+        self.diff_viewer_tab.text1.setPlainText("line1\nline2\nline3")
+        self.diff_viewer_tab.patch_text(parse_patch("@@ -7 +7 @@\n line1\n-line2\n+patched\n@@ -9 +9 @@\n-missing\n"))
+
+        self.assertEqual(self.diff_viewer_tab.text2.toPlainText(), "line1\npatched\nline3")
+        self.assertEqual(self.diff_viewer_tab.diff_viewer.diff_lines, ['@@ -2 +2 @@', '-line2', '+patched'])
+        mock_message_box.warning.assert_called_once()
+
 class TestDiffViewerWidget(unittest.TestCase):
     def setUp(self):
         self.diff_viewer = DiffViewer()
@@ -76,7 +284,7 @@ class TestDiffViewerWidget(unittest.TestCase):
         expected_size = QSize(600, 3 * 20)  # 3 lines * 20 pixels per line
         self.assertEqual(self.diff_viewer.sizeHint(), expected_size)
 
-    @patch('PyQt5.QtGui.QPainter')
+    @patch('src.diff_viewer.QPainter')
     def test_paint_event(self, mock_painter):
         self.diff_viewer.diff_lines = [
             '@@ -1,3 +1,3 @@',
@@ -85,17 +293,14 @@ class TestDiffViewerWidget(unittest.TestCase):
             '+modified',
             ' line3'
         ]
+        self.diff_viewer.resize(600, 400)
         mock_event = MagicMock()
-        
+        mock_event.rect.return_value = QRect(0, 0, 600, 400)
+
         # Create a mock painter object
         mock_painter_instance = MagicMock()
         mock_painter.return_value = mock_painter_instance
 
-        # Mock the font metrics
-        mock_font_metrics = MagicMock()
-        mock_font_metrics.height.return_value = 15
-        mock_painter_instance.fontMetrics.return_value = mock_font_metrics
-
         self.diff_viewer.paintEvent(mock_event)
 
         # Check if the correct number of lines were drawn
@@ -104,6 +309,80 @@ class TestDiffViewerWidget(unittest.TestCase):
         # Check if the correct colors were set for different line types
         color_calls = mock_painter_instance.setPen.call_args_list
         self.assertEqual(len(color_calls), 5)  # 5 lines, 5 color settings
+        # Header, removed and added lines, and the changed part of the removed and added lines
+        self.assertEqual(mock_painter_instance.fillRect.call_count, 5)
+
+    def test_changed_spans_are_paired_within_hunks(self):
+        self.diff_viewer.set_diff(['--- ', '+++ ',
+                                   '@@ -1,2 +1,2 @@', '-value = 1', '-old', '+value = 2', '+new',
+                                   '@@ -9 +9,0 @@', '-removed'])
+        self.assertEqual(self.diff_viewer.hunk_pairs, {})
+        self.assertEqual(self.diff_viewer.partner_row(1), 3)
+        self.assertEqual(self.diff_viewer.partner_row(4), 2)
+        self.assertEqual(self.diff_viewer.changed_spans(1), ((8, 9),))
+        self.assertEqual(self.diff_viewer.changed_spans(3), ((8, 9),))
+        # Only the painted hunk has been paired
+        self.assertEqual(list(self.diff_viewer.hunk_pairs), [1])
+        self.assertIsNone(self.diff_viewer.partner_row(6))
+        self.assertEqual(self.diff_viewer.changed_spans(6), ())
+
+    @patch('src.diff_viewer.QPainter')
+    def test_paint_event_only_draws_exposed_lines(self, mock_painter):
+        self.diff_viewer.set_diff(['--- ', '+++ '] + [f'+line{i}' for i in range(100000)])
+        self.diff_viewer.resize(600, 400)
+        self.diff_viewer.verticalScrollBar().setValue(50000)
+        line_height = self.diff_viewer.line_height
+        mock_event = MagicMock()
+        mock_event.rect.return_value = QRect(0, 5 + line_height, 600, line_height * 2)
+
+        mock_painter_instance = MagicMock()
+        mock_painter.return_value = mock_painter_instance
+        self.diff_viewer.paintEvent(mock_event)
+
+        drawn = [call.args[2] for call in mock_painter_instance.drawText.call_args_list]
+        self.assertEqual(drawn, ['+line50001', '+line50002'])
+
+    def test_next_change_in_unified_view(self):
+        self.diff_viewer.set_diff(['--- ', '+++ '] + ['@@ -1 +1 @@', '-a', '+b'] * 100)
+        self.diff_viewer.resize(600, 400)
+        self.diff_viewer.go_to_next_change()
+        self.assertEqual(self.diff_viewer.verticalScrollBar().value(), 3)
+        self.diff_viewer.go_to_previous_change()
+        self.assertEqual(self.diff_viewer.verticalScrollBar().value(), 0)
+
+class TestSideBySideViewer(unittest.TestCase):
+    def setUp(self):
+        self.viewer = SideBySideViewer(context=1)
+        self.old = [f"line{i}" for i in range(100)]
+        self.new = self.old[:50] + ["line50 changed"] + self.old[51:]
+        self.viewer.set_diff(self.old, self.new, diff_blocks(self.old, self.new))
+        self.viewer.resize(800, 400)
+
+    @patch('src.diff_viewer.QPainter')
+    def test_paint_event(self, mock_painter):
+        mock_event = MagicMock()
+        mock_event.rect.return_value = QRect(0, 0, 800, 400)
+        mock_painter_instance = MagicMock()
+        mock_painter.return_value = mock_painter_instance
+
+        self.viewer.paintEvent(mock_event)
+
+        # Fold, context, change, context, fold
+        drawn = [call.args[2] for call in mock_painter_instance.drawText.call_args_list]
+        self.assertEqual(drawn, [
+            f"... 49 unchanged lines, click to show {FOLD_EXPAND_LINES}",
+            " 50", "line49", " 50", "line49",
+            " 51", "line50", " 51", "line50 changed",
+            " 52", "line51", " 52", "line51",
+            f"... 48 unchanged lines, click to show {FOLD_EXPAND_LINES}",
+        ])
+        self.assertEqual(self.viewer.max_line_length, len("line50 changed"))
+
+    def test_click_expands_fold(self):
+        rows = len(self.viewer.index)
+        QTest.mouseClick(self.viewer.viewport(), Qt.LeftButton, pos=QPoint(10, 5 + self.viewer.line_height // 2))
+        self.assertEqual(len(self.viewer.index), rows + FOLD_EXPAND_LINES)
+        self.assertEqual(self.viewer.index.row(0)[1:], (0, 0))
 
     # ... (other test methods)
 
@@ -0,0 +1,56 @@
+# From the root directory, run:
+# python -m unittest tests.test_export
+
+import unittest
+from unittest.mock import patch
+import io
+import os
+import tempfile
+import shutil
+from src.export import ClipboardSink, FileSink, StreamSink, iter_file_lines, write_lines
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.test_dir, "file.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_iter_file_lines_matches_splitlines(self):
+        content = "first\r\nsecond\n\nthird line that spans chunks\rfourth\x0cfifth"
+        with open(self.file_path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+
+        # Every chunk size must give the same lines as reading the whole file
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            expected = f.read().splitlines()
+        for chunk_size in (1, 2, 3, 7, 64):
+            self.assertEqual(list(iter_file_lines(self.file_path, chunk_size=chunk_size)), expected)
+
+    def test_iter_file_lines_missing_file(self):
+        self.assertEqual(list(iter_file_lines(os.path.join(self.test_dir, "missing.txt"))), [])
+
+    def test_write_lines_in_chunks(self):
+        stream = io.StringIO()
+        with patch.object(stream, "write", wraps=stream.write) as mock_write:
+            count = write_lines(["a", "bb", "ccc"], StreamSink(stream), chunk_size=3)
+        self.assertEqual(count, 3)
+        self.assertEqual(stream.getvalue(), "a\nbb\nccc")
+        self.assertEqual(mock_write.call_count, 2)
+
+    def test_file_sink(self):
+        out_path = os.path.join(self.test_dir, "out.txt")
+        with FileSink(out_path) as sink:
+            write_lines(["one", "two"], sink)
+        with open(out_path, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "one\ntwo")
+
+    @patch('pyperclip.copy')
+    def test_clipboard_sink(self, mock_copy):
+        with ClipboardSink() as sink:
+            write_lines(["one", "two"], sink, chunk_size=1)
+        mock_copy.assert_called_once_with("one\ntwo")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# From the root directory, run:
+# python -m unittest tests.test_file_index
+
+import unittest
+from unittest.mock import patch
+import codecs
+import os
+import tempfile
+import shutil
+from src.file_index import (HUGE_FILE_SIZE, KIND_BINARY, KIND_HUGE, KIND_TEXT, FileIndex, FileInfo,
+                            classify, read_file_info)
+
+class TestFileIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.test_dir, "file.txt")
+        with open(self.file_path, "wb") as f:
+            f.write(b"line1\nline2\nline3")
+        self.db_path = os.path.join(self.test_dir, "index.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_read_file_info(self):
+        info = read_file_info(self.file_path)
+        self.assertEqual(info.lines, 3)
+        self.assertEqual(info.tokens, 8)
+        self.assertEqual(info.encoding, "utf-8")
+        self.assertEqual(len(info.hash), 32)
+
+    def test_read_file_info_encodings(self):
+        with open(self.file_path, "wb") as f:
+            f.write(codecs.BOM_UTF8 + b"bom\n")
+        self.assertEqual(read_file_info(self.file_path).encoding, "utf-8-sig")
+
+        with open(self.file_path, "wb") as f:
+            f.write(b"caf\xe9\n")
+        self.assertEqual(read_file_info(self.file_path).encoding, "latin-1")
+
+    def test_classify(self):
+        self.assertEqual(classify(b"", 0), KIND_TEXT)
+        self.assertEqual(classify(b"def main():\n\tpass\n", 18), KIND_TEXT)
+        self.assertEqual(classify(codecs.BOM_UTF16_LE + "text".encode("utf-16-le"), 10), KIND_TEXT)
+        self.assertEqual(classify(b"\x89PNG\r\n\x1a\n\x00\x00", 10), KIND_BINARY)
+        self.assertEqual(classify(bytes(range(1, 32)) * 4, 124), KIND_BINARY)
+        self.assertEqual(classify(b"text", HUGE_FILE_SIZE + 1), KIND_HUGE)
+
+    def test_binary_and_huge_files_are_not_read(self):
+        with open(self.file_path, "wb") as f:
+            f.write(b"\x00\x01\x02" * 100)
+        self.assertEqual(read_file_info(self.file_path), FileInfo(0, 0, None, None, KIND_BINARY))
+
+        with patch('src.file_index.open') as mock_open:
+            info = read_file_info(self.file_path, HUGE_FILE_SIZE + 1)
+        mock_open.assert_not_called()
+        self.assertEqual(info.kind, KIND_HUGE)
+
+    def test_kind_is_persisted(self):
+        with open(self.file_path, "wb") as f:
+            f.write(b"\x00binary")
+        index = FileIndex(self.db_path)
+        self.assertEqual(index.get_for_path(self.file_path).kind, KIND_BINARY)
+        index.close()
+
+        index = FileIndex(self.db_path)
+        with patch('src.file_index.read_file_info') as mock_read:
+            self.assertEqual(index.get_for_path(self.file_path).kind, KIND_BINARY)
+        mock_read.assert_not_called()
+        index.close()
+
+    def test_records_persist_between_sessions(self):
+        stat = os.stat(self.file_path)
+        index = FileIndex(self.db_path)
+        self.assertEqual(index.line_count(self.file_path, stat.st_mtime_ns, stat.st_size, stat.st_ino), 3)
+        index.close()
+
+        # An unchanged file is answered from the index without being read
+        index = FileIndex(self.db_path)
+        with patch('src.file_index.read_file_info') as mock_read:
+            info = index.get(self.file_path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        mock_read.assert_not_called()
+        self.assertEqual(info.lines, 3)
+        index.close()
+
+    def test_changed_file_is_read_again(self):
+        index = FileIndex()
+        stat = os.stat(self.file_path)
+        index.get(self.file_path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        with patch('src.file_index.read_file_info', return_value=FileInfo(9, 0, "", "utf-8")) as mock_read:
+            self.assertEqual(index.line_count(self.file_path, stat.st_mtime_ns + 1, stat.st_size, stat.st_ino), 9)
+            self.assertEqual(index.line_count(self.file_path, stat.st_mtime_ns + 1, stat.st_size + 1, stat.st_ino), 9)
+        self.assertEqual(mock_read.call_count, 2)
+
+    def test_missing_file(self):
+        index = FileIndex()
+        self.assertIsNone(index.get_for_path(os.path.join(self.test_dir, "missing.txt")))
+        self.assertEqual(index.line_count(os.path.join(self.test_dir, "missing.txt"), 0, 0), 0)
+
+if __name__ == '__main__':
+    unittest.main()
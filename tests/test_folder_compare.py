@@ -0,0 +1,73 @@
+# From the root directory, run:
+# python -m unittest tests.test_folder_compare
+
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+import shutil
+from src.file_index import FileIndex
+from src.folder_compare import STATUS_ADDED, STATUS_MODIFIED, STATUS_REMOVED, FileChange, compare_folders
+from src.ignore_rules import IgnoreMatcher
+from src.parallel import ReaderPool
+
+class TestFolderCompare(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.old = os.path.join(self.test_dir, "old")
+        self.new = os.path.join(self.test_dir, "new")
+        self.write(self.old, {
+            "same.txt": b"unchanged",
+            "edited.txt": b"version 1",
+            "resized.txt": b"short",
+            "image.bin": b"\x00\x01\x02",
+            "gone/file.txt": b"removed",
+            ".git/HEAD": b"old",
+        })
+        self.write(self.new, {
+            "same.txt": b"unchanged",
+            "edited.txt": b"version 2",
+            "resized.txt": b"much longer",
+            "image.bin": b"\x00\x01\x03",
+            "src/added.txt": b"added",
+            ".git/HEAD": b"new",
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, root, files):
+        for name, data in files.items():
+            path = os.path.join(root, *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+
+    def test_compare_folders(self):
+        changes = compare_folders(self.old, self.new, reader_pool=ReaderPool(4),
+                                  old_matcher=IgnoreMatcher(self.old, [".git/"]),
+                                  new_matcher=IgnoreMatcher(self.new, [".git/"]))
+        join = os.path.join
+        self.assertEqual(changes, [
+            FileChange("edited.txt", STATUS_MODIFIED, join(self.old, "edited.txt"), join(self.new, "edited.txt")),
+            FileChange("gone/file.txt", STATUS_REMOVED, join(self.old, "gone", "file.txt"), None),
+            FileChange("image.bin", STATUS_MODIFIED, join(self.old, "image.bin"), join(self.new, "image.bin")),
+            FileChange("resized.txt", STATUS_MODIFIED, join(self.old, "resized.txt"), join(self.new, "resized.txt")),
+            FileChange("src/added.txt", STATUS_ADDED, None, join(self.new, "src", "added.txt")),
+        ])
+
+    def test_hashes_are_reused(self):
+        file_index = FileIndex()
+        compare_folders(self.old, self.new, file_index)
+
+        # Unchanged files are answered from the index; files of different sizes are never read
+        with patch('src.file_index.read_file_info') as mock_read:
+            changes = compare_folders(self.old, self.new, file_index)
+        mock_read.assert_not_called()
+        self.assertEqual(len(changes), 6)
+
+    def test_cancelled(self):
+        self.assertIsNone(compare_folders(self.old, self.new, cancelled=lambda: True))
+
+if __name__ == '__main__':
+    unittest.main()
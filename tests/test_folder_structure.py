@@ -2,8 +2,14 @@
 # python -m unittest tests.test_folder_structure
 
 import unittest
-from PyQt5.QtWidgets import QApplication, QTreeWidgetItem
-from src.folder_structure import FolderStructureTab
+from unittest.mock import patch
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt
+from PyQt5.QtTest import QTest
+from src.export import FileSink
+from src.file_index import FileIndex
+from src.folder_structure import FolderStructureTab, FolderTreeModel, ScanWorker
+from src.ignore_rules import IgnoreMatcher
 import os
 import tempfile
 import shutil
@@ -14,7 +20,7 @@ class TestFolderStructure(unittest.TestCase):
         cls.app = QApplication([])
 
     def setUp(self):
-        self.folder_structure_tab = FolderStructureTab()
+        self.folder_structure_tab = FolderStructureTab(FileIndex())
         # Create a temporary directory structure for testing
         self.test_dir = tempfile.mkdtemp()
         os.makedirs(os.path.join(self.test_dir, "subfolder"))
@@ -27,22 +33,241 @@ class TestFolderStructure(unittest.TestCase):
         # Clean up the temporary directory after each test
         shutil.rmtree(self.test_dir)
 
-    def test_add_tree_items(self):
-        root = QTreeWidgetItem(self.folder_structure_tab.tree)
-        root.setText(0, self.test_dir)
-        self.folder_structure_tab.add_tree_items(root, self.test_dir, 2)
-        
-        # Check if the root item has the correct number of children
-        self.assertEqual(root.childCount(), 2)  # 1 file and 1 subfolder
-        
-        # Check if the subfolder is correctly added
-        subfolder = root.child(0) if root.child(0).text(0) == "subfolder" else root.child(1)
-        self.assertEqual(subfolder.text(0), "subfolder")
-        self.assertEqual(subfolder.childCount(), 1)  # 1 file in subfolder
-        
-        # Check if the file in the subfolder is correctly added
-        subfile = subfolder.child(0)
-        self.assertEqual(subfile.text(0), "file2.txt")
+    def find_child(self, node, name):
+        return next(child for child in node.children if child.name == name)
+
+    def test_fetch_on_expand(self):
+        model = FolderTreeModel()
+        model.set_root(self.test_dir, 2)
+        root_index = model.index(0, 0)
+
+        # Nothing is listed until the root is fetched
+        self.assertIsNone(model.root.children)
+        self.assertTrue(model.hasChildren(root_index))
+        self.assertTrue(model.canFetchMore(root_index))
+
+        model.fetchMore(root_index)
+        self.assertEqual(model.rowCount(root_index), 2)  # 1 file and 1 subfolder
+
+        subfolder = self.find_child(model.root, "subfolder")
+        self.assertIsNone(subfolder.children)
+        subfolder_index = model.index_for_node(subfolder)
+        model.fetchMore(subfolder_index)
+        self.assertEqual(model.rowCount(subfolder_index), 1)
+        self.assertEqual(subfolder.children[0].name, "file2.txt")
+        self.assertEqual(subfolder.children[0].path(), os.path.join(self.test_dir, "subfolder", "file2.txt"))
+
+        # The subfolder's children are at the depth limit
+        self.assertFalse(model.canFetchMore(model.index_for_node(subfolder.children[0])))
+
+    def test_check_state_propagation(self):
+        model = FolderTreeModel()
+        model.set_root(self.test_dir, 2)
+        model.fetchMore(model.index(0, 0))
+        file1 = self.find_child(model.root, "file1.txt")
+
+        model.setData(model.index_for_node(file1), Qt.Unchecked, Qt.CheckStateRole)
+        self.assertEqual(model.root.check_state, Qt.PartiallyChecked)
+
+        # Unloaded folders inherit the state of their parent when fetched
+        model.setData(model.index(0, 0), Qt.Unchecked, Qt.CheckStateRole)
+        subfolder = self.find_child(model.root, "subfolder")
+        model.fetchMore(model.index_for_node(subfolder))
+        self.assertEqual(subfolder.children[0].check_state, Qt.Unchecked)
+
+    def test_scan_worker_totals(self):
+        worker = ScanWorker(self.test_dir, 2, FileIndex(), batch_size=1)
+        batches = []
+        results = []
+        worker.batch_ready.connect(batches.append)
+        worker.finished.connect(results.append)
+        worker.run()
+
+        # One directory per batch, children before their parents
+        totals = [(path, size, lines) for batch in batches for path, (size, lines, _) in batch]
+        self.assertEqual(totals, [
+            (os.path.join(self.test_dir, "subfolder"), 17, 1),
+            (self.test_dir, 29, 2),
+        ])
+        self.assertEqual(results, [True])
+
+    def test_scan_worker_cancel(self):
+        worker = ScanWorker(self.test_dir, 2, batch_size=1)
+        batches = []
+        results = []
+        worker.batch_ready.connect(lambda batch: (batches.append(batch), worker.cancel()))
+        worker.finished.connect(results.append)
+        worker.run()
+
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(results, [False])
+
+    def test_view_structure_in_background(self):
+        self.folder_structure_tab.folder_input.setText(self.test_dir)
+        self.folder_structure_tab.depth_combo.setCurrentText("2")
+        self.folder_structure_tab.view_structure()
+        for _ in range(100):
+            if self.folder_structure_tab.scan_worker is None:
+                break
+            QTest.qWait(20)
+
+        # Only the root has been listed, but the totals cover the whole depth
+        model = self.folder_structure_tab.model
+        self.assertEqual(len(model.root.children), 2)
+        self.assertIsNone(self.find_child(model.root, "subfolder").children)
+        self.assertEqual(self.folder_structure_tab.file_size_label.text(), "Total size: 29 bytes")
+
+    def test_shutdown_waits_for_scan(self):
+        self.folder_structure_tab.folder_input.setText(self.test_dir)
+        self.folder_structure_tab.view_structure()
+        thread = self.folder_structure_tab.scan_thread
+        self.assertIsNotNone(thread)
+
+        self.folder_structure_tab.shutdown()
+        self.assertTrue(thread.isFinished())
+        self.assertIsNone(self.folder_structure_tab.scan_thread)
+
+    def test_selected_totals_follow_check_states(self):
+        model = FolderTreeModel()
+        model.count_contents = True
+        model.set_root(self.test_dir, 2)
+        model.fetchMore(model.index(0, 0))
+        worker = ScanWorker(self.test_dir, 2, model.file_index)
+        worker.batch_ready.connect(model.apply_dir_totals)
+        worker.run()
+        self.assertEqual(model.root.selected[:2], (29, 2))
+        full_tokens = model.root.selected[2]
+
+        # Unchecking an unexpanded folder subtracts its scanned totals
+        subfolder = self.find_child(model.root, "subfolder")
+        model.setData(model.index_for_node(subfolder), Qt.Unchecked, Qt.CheckStateRole)
+        self.assertEqual(model.root.selected[:2], (12, 1))
+        self.assertEqual(model.root.selected[2], full_tokens - subfolder.total[2])
+
+        model.setData(model.index_for_node(subfolder), Qt.Checked, Qt.CheckStateRole)
+        self.assertEqual(model.root.selected, (29, 2, full_tokens))
+        self.assertEqual(model.root.check_state, Qt.Checked)
+
+    @patch('pyperclip.copy')
+    def test_generate_output_walks_unloaded_folders(self, mock_copy):
+        self.folder_structure_tab.folder_input.setText(self.test_dir)
+        self.folder_structure_tab.depth_combo.setCurrentText("2")
+        self.folder_structure_tab.view_structure()
+        self.folder_structure_tab.cancel_scan()
+        self.folder_structure_tab.generate_output()
+
+        output = mock_copy.call_args[0][0].splitlines()
+        self.assertEqual(output[0], self.test_dir)
+        self.assertIn("    file2.txt", output)
+
+    def test_generate_output_to_file(self):
+        self.folder_structure_tab.folder_input.setText(self.test_dir)
+        self.folder_structure_tab.view_structure()
+        self.folder_structure_tab.cancel_scan()
+        self.folder_structure_tab.include_contents.setChecked(True)
+        self.folder_structure_tab.cancel_scan()
+
+        out_path = os.path.join(self.test_dir, "..", os.path.basename(self.test_dir) + ".out")
+        try:
+            self.folder_structure_tab.generate_output(FileSink(out_path))
+            with open(out_path, "r", encoding="utf-8") as f:
+                output = f.read().splitlines()
+        finally:
+            os.remove(out_path)
+        index = output.index("  file1.txt")
+        self.assertEqual(output[index + 1:index + 3], ["    Content:", "      Test content"])
+
+    @patch('pyperclip.copy')
+    def test_generate_output_order_with_reader_pool(self, mock_copy):
+        for i in range(20):
+            with open(os.path.join(self.test_dir, f"extra{i}.txt"), "w") as f:
+                f.write(f"extra {i}")
+        self.folder_structure_tab.folder_input.setText(self.test_dir)
+        self.folder_structure_tab.depth_combo.setCurrentText("2")
+        self.folder_structure_tab.include_contents.setChecked(True)
+        self.folder_structure_tab.view_structure()
+        self.folder_structure_tab.cancel_scan()
+
+        self.folder_structure_tab.set_reader_workers(1)
+        self.folder_structure_tab.generate_output()
+        sequential = mock_copy.call_args[0][0]
+        self.folder_structure_tab.set_reader_workers(4)
+        self.folder_structure_tab.generate_output()
+        self.assertEqual(mock_copy.call_args[0][0], sequential)
+
+    def test_fit_to_budget(self):
+        with open(os.path.join(self.test_dir, "subfolder", "big.txt"), "w") as f:
+            f.write("word " * 1000)
+        tab = self.folder_structure_tab
+        tab.folder_input.setText(self.test_dir)
+        tab.depth_combo.setCurrentText("2")
+        tab.include_contents.setChecked(True)
+        tab.view_structure()
+        for _ in range(100):
+            if tab.scan_worker is None:
+                break
+            QTest.qWait(20)
+        self.assertGreater(tab.root_tokens(), 1000)
+
+        tab.token_budget_spin.setValue(500)
+        self.assertIn("/ 500", tab.token_count_label.text())
+        tab.fit_to_budget()
+
+        # Only the large file in the unexpanded subfolder had to go
+        self.assertLessEqual(tab.root_tokens(), 500)
+        subfolder = self.find_child(tab.model.root, "subfolder")
+        self.assertEqual(self.find_child(subfolder, "big.txt").check_state, Qt.Unchecked)
+        self.assertEqual(self.find_child(subfolder, "file2.txt").check_state, Qt.Checked)
+        self.assertEqual(subfolder.check_state, Qt.PartiallyChecked)
+
+    def test_ignored_entries_are_pruned(self):
+        os.makedirs(os.path.join(self.test_dir, "node_modules", "pkg"))
+        with open(os.path.join(self.test_dir, "node_modules", "pkg", "index.js"), "w") as f:
+            f.write("module.exports = 1;")
+        with open(os.path.join(self.test_dir, ".gitignore"), "w") as f:
+            f.write("*.log\n")
+        with open(os.path.join(self.test_dir, "subfolder", "debug.log"), "w") as f:
+            f.write("log")
+
+        matcher = IgnoreMatcher(self.test_dir, ["node_modules/"])
+        model = FolderTreeModel()
+        model.set_root(self.test_dir, 3, matcher)
+        model.fetchMore(model.index(0, 0))
+        self.assertEqual(sorted(child.name for child in model.root.children), [".gitignore", "file1.txt", "subfolder"])
+        subfolder = self.find_child(model.root, "subfolder")
+        model.fetchMore(model.index_for_node(subfolder))
+        self.assertEqual([child.name for child in subfolder.children], ["file2.txt"])
+
+        worker = ScanWorker(self.test_dir, 3, batch_size=1, matcher=matcher)
+        batches = []
+        worker.batch_ready.connect(batches.append)
+        worker.run()
+        paths = [path for batch in batches for path, _ in batch]
+        self.assertNotIn(os.path.join(self.test_dir, "node_modules"), paths)
+        self.assertEqual(batches[-1][0][1][0], 29 + len("*.log\n"))
+
+    def test_binary_files_are_summarised(self):
+        with open(os.path.join(self.test_dir, "image.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n\x00\x00\x00\x0dIHDR")
+
+        model = FolderTreeModel()
+        model.count_contents = True
+        model.set_root(self.test_dir, 1)
+        model.fetchMore(model.index(0, 0))
+        image = self.find_child(model.root, "image.png")
+        self.assertEqual(image.total[1], 0)
+        self.assertIn("binary file", model.data(model.index_for_node(image, 1)))
+        self.assertIn("binary file", model.data(model.index_for_node(image), Qt.ToolTipRole))
+
+        self.folder_structure_tab.folder_input.setText(self.test_dir)
+        self.folder_structure_tab.view_structure()
+        self.folder_structure_tab.cancel_scan()
+        self.folder_structure_tab.include_contents.setChecked(True)
+        self.folder_structure_tab.cancel_scan()
+        output = list(self.folder_structure_tab.iter_output())
+        image_line = output.index("  image.png")
+        self.assertEqual(output[image_line + 1:image_line + 3],
+                         ["    Content:", "      [Contents skipped: binary file, 16 bytes]"])
 
     # ... (other test methods)
 
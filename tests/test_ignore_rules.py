@@ -0,0 +1,89 @@
+# From the root directory, run:
+# python -m unittest tests.test_ignore_rules
+
+import unittest
+import os
+import re
+import tempfile
+import shutil
+from src.ignore_rules import IgnoreMatcher, IgnoreRules, parse_pattern, translate_glob
+
+class TestIgnoreRules(unittest.TestCase):
+    def matches(self, pattern, path, is_dir=False):
+        return IgnoreRules("base", [pattern]).match(path, is_dir) is True
+
+    def test_translate_glob(self):
+        self.assertTrue(re.fullmatch(translate_glob("*.py"), "main.py"))
+        self.assertFalse(re.fullmatch(translate_glob("*.py"), "src/main.py"))
+        self.assertTrue(re.fullmatch(translate_glob("a/**/b"), "a/b"))
+        self.assertTrue(re.fullmatch(translate_glob("a/**/b"), "a/x/y/b"))
+        self.assertTrue(re.fullmatch(translate_glob("a/**"), "a/x/y"))
+        self.assertTrue(re.fullmatch(translate_glob("file[0-9].txt"), "file3.txt"))
+        self.assertFalse(re.fullmatch(translate_glob("file[!0-9].txt"), "file3.txt"))
+
+    def test_parse_pattern(self):
+        self.assertIsNone(parse_pattern("# comment"))
+        self.assertIsNone(parse_pattern("   "))
+        self.assertEqual(parse_pattern("build/")[1:], (False, True))
+        self.assertEqual(parse_pattern("!keep.log")[1:], (True, False))
+
+    def test_unanchored_patterns_match_at_any_level(self):
+        self.assertTrue(self.matches("*.log", "debug.log"))
+        self.assertTrue(self.matches("*.log", "logs/debug.log"))
+        self.assertTrue(self.matches("node_modules", "web/node_modules", is_dir=True))
+
+    def test_anchored_patterns(self):
+        self.assertTrue(self.matches("/build", "build", is_dir=True))
+        self.assertFalse(self.matches("/build", "src/build", is_dir=True))
+        self.assertTrue(self.matches("docs/*.md", "docs/index.md"))
+        self.assertFalse(self.matches("docs/*.md", "src/docs/index.md"))
+
+    def test_directory_only_patterns(self):
+        self.assertTrue(self.matches("build/", "build", is_dir=True))
+        self.assertFalse(self.matches("build/", "build", is_dir=False))
+
+    def test_last_matching_rule_wins(self):
+        rules = IgnoreRules("base", ["*.log", "!keep.log"])
+        self.assertTrue(rules.match("debug.log", False))
+        self.assertFalse(rules.match("keep.log", False))
+        self.assertIsNone(rules.match("main.py", False))
+
+class TestIgnoreMatcher(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.test_dir, "src", "generated"))
+        with open(os.path.join(self.test_dir, ".gitignore"), "w") as f:
+            f.write("*.log\n/dist/\n")
+        with open(os.path.join(self.test_dir, "src", ".gitignore"), "w") as f:
+            f.write("generated/\n!important.log\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_nested_gitignore_files(self):
+        matcher = IgnoreMatcher(self.test_dir, ["*.tmp"])
+        join = lambda *parts: os.path.join(self.test_dir, *parts)
+        self.assertTrue(matcher.is_ignored(join("debug.log"), False))
+        self.assertTrue(matcher.is_ignored(join("dist"), True))
+        self.assertTrue(matcher.is_ignored(join("notes.tmp"), False))
+        self.assertFalse(matcher.is_ignored(join("src"), True))
+
+        src_matcher = matcher.child(join("src"))
+        self.assertTrue(src_matcher.is_ignored(join("src", "generated"), True))
+        self.assertTrue(src_matcher.is_ignored(join("src", "debug.log"), False))
+        # The deeper .gitignore re-includes a file the root one ignores
+        self.assertFalse(src_matcher.is_ignored(join("src", "important.log"), False))
+        self.assertTrue(matcher.is_ignored(join("important.log"), False))
+
+    def test_child_without_gitignore_is_shared(self):
+        matcher = IgnoreMatcher(self.test_dir)
+        generated = os.path.join(self.test_dir, "src", "generated")
+        src_matcher = matcher.child(os.path.join(self.test_dir, "src"))
+        self.assertIs(src_matcher.child(generated), src_matcher)
+
+    def test_gitignore_can_be_disabled(self):
+        matcher = IgnoreMatcher(self.test_dir, use_gitignore=False)
+        self.assertFalse(matcher.is_ignored(os.path.join(self.test_dir, "debug.log"), False))
+
+if __name__ == '__main__':
+    unittest.main()
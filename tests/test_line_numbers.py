@@ -3,8 +3,12 @@
 
 import unittest
 from unittest.mock import patch, MagicMock
+import os
+import tempfile
+import shutil
 from PyQt5.QtWidgets import QApplication
-from src.line_numbers import LineNumbersTab
+from PyQt5.QtTest import QTest
+from src.line_numbers import LARGE_OUTPUT_LINES, LineNumbersTab
 
 class TestLineNumbers(unittest.TestCase):
     @classmethod
@@ -14,6 +18,12 @@ class TestLineNumbers(unittest.TestCase):
     def setUp(self):
         self.line_numbers_tab = LineNumbersTab()
 
+    def wait_for_locate(self):
+        for _ in range(200):
+            if not self.line_numbers_tab.locate_threads:
+                break
+            QTest.qWait(20)
+
     def test_initial_state(self):
         self.assertEqual(self.line_numbers_tab.file_input.text(), "")
         self.assertEqual(self.line_numbers_tab.start_line.value(), 1)
@@ -43,6 +53,44 @@ class TestLineNumbers(unittest.TestCase):
         # Test not finding a snippet
         self.assertEqual(self.line_numbers_tab.find_lines_for_snippet("nonexistent"), -1)
 
+    def test_find_all_lines_for_snippet(self):
+        self.line_numbers_tab.file_contents = "def f():\n    return 1\n\ndef g():\n    return 1\n"
+
+        # Indentation and trailing whitespace are ignored, and every match is reported
+        self.assertEqual(self.line_numbers_tab.find_all_lines_for_snippet("return 1  "), [2, 5])
+        self.assertEqual(self.line_numbers_tab.find_lines_for_snippet("  return 1"), 2)
+        self.assertIn("2, 5", self.line_numbers_tab.matches_label.text())
+
+        self.assertEqual(self.line_numbers_tab.find_lines_for_snippet("def g():\n    return"), 4)
+        self.assertEqual(self.line_numbers_tab.matches_label.text(), "")
+
+    def test_add_line_numbers_with_similar_snippet(self):
+        self.line_numbers_tab.file_contents = (
+            "import os\n\n"
+            "def load(path):\n"
+            "    with open(path, 'r') as f:\n"
+            "        data = f.read()\n"
+            "    return data.strip()\n\n"
+            "print(load('x'))\n")
+
+        # Reformatted, with different quotes and one edited line
+        self.line_numbers_tab.code_input.setPlainText(
+            'def load( path ):\n  with open(path, "r") as f:\n    data = f.read().lower()\n  return data.strip()')
+        self.line_numbers_tab.add_line_numbers()
+
+        self.assertTrue(self.line_numbers_tab.output.toPlainText().startswith("3: def load( path ):"))
+        self.assertIn("line 3", self.line_numbers_tab.matches_label.text())
+
+    def test_find_similar_lines_for_snippet(self):
+        lines = [f"value_{i} = compute({i}, 'x')" for i in range(1000)]
+        self.line_numbers_tab.file_contents = "\n".join(lines)
+
+        snippet = "\n".join(lines[500:505]).replace("'", '"').replace(" = ", "=")
+        (line, score), *_ = self.line_numbers_tab.find_similar_lines_for_snippet(snippet)
+        self.assertEqual(line, 501)
+        self.assertEqual(score, 1.0)
+        self.assertEqual(self.line_numbers_tab.find_similar_lines_for_snippet("nothing like it"), [])
+
     def test_add_line_numbers_without_file(self):
         self.line_numbers_tab.code_input.setPlainText("def example():\n    pass")
         self.line_numbers_tab.start_line.setValue(10)
@@ -67,6 +115,89 @@ class TestLineNumbers(unittest.TestCase):
         expected_output = "Snippet not found in the loaded file."
         self.assertEqual(self.line_numbers_tab.output.toPlainText(), expected_output)
 
+    def test_add_line_numbers_large_snippet(self):
+        count = LARGE_OUTPUT_LINES + 5
+        self.line_numbers_tab.code_input.setPlainText("\n".join(f"line {i}" for i in range(count)))
+        self.line_numbers_tab.start_line.setValue(1)
+        self.line_numbers_tab.add_line_numbers()
+
+        # The numbered text is not built; the view numbers lines as they are needed
+        self.assertIs(self.line_numbers_tab.output_stack.currentWidget(), self.line_numbers_tab.large_output)
+        self.assertEqual(self.line_numbers_tab.output.toPlainText(), "")
+        large_output = self.line_numbers_tab.large_output
+        large_output.resize(400, 300)
+        large_output.grab()
+        self.assertEqual(large_output.verticalScrollBar().maximum(), count - large_output.visible_line_count())
+
+        width = len(str(count))
+        test_dir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(test_dir, "numbered.txt")
+            with patch('PyQt5.QtWidgets.QFileDialog.getSaveFileName', return_value=(file_path, '')):
+                self.line_numbers_tab.save_to_file()
+            with open(file_path, encoding="utf-8") as f:
+                lines = f.read().split("\n")
+        finally:
+            shutil.rmtree(test_dir)
+        self.assertEqual(len(lines), count)
+        self.assertEqual(lines[0], f"{1:>{width}}: line 0")
+        self.assertEqual(lines[-1], f"{count}: line {count - 1}")
+
+        with patch('pyperclip.copy') as mock_copy:
+            self.line_numbers_tab.copy_to_clipboard()
+        self.assertEqual(mock_copy.call_args[0][0], "\n".join(lines))
+
+        # A small snippet goes back to the text output
+        self.line_numbers_tab.code_input.setPlainText("a\nb")
+        self.line_numbers_tab.add_line_numbers()
+        self.assertIs(self.line_numbers_tab.output_stack.currentWidget(), self.line_numbers_tab.output)
+        self.assertEqual(self.line_numbers_tab.output.toPlainText(), "1: a\n2: b")
+
+    def test_locate_in_folder(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(test_dir, "app.py"), "w", encoding="utf-8") as f:
+                f.write("import os\n\ndef main():\n    return 0\n")
+            self.line_numbers_tab.code_input.setPlainText(
+                "Like this:\n```python\ndef main():\n    return 0\n```\nand\n```\nmissing()\n```")
+            self.line_numbers_tab.locate_in_folder(test_dir)
+            self.wait_for_locate()
+        finally:
+            shutil.rmtree(test_dir)
+
+        self.assertEqual(self.line_numbers_tab.output.toPlainText(),
+                         "# app.py, lines 3-4\n3: def main():\n4:     return 0\n\n# Snippet 2: not found\nmissing()")
+        self.assertEqual(self.line_numbers_tab.matches_label.text(), "Located 1 of 2 code blocks")
+        self.assertTrue(self.line_numbers_tab.locate_button.isEnabled())
+
+    def test_locate_in_folder_ignore_rules(self):
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        for name in ("app.py", "build.log", ".gitignore"):
+            with open(os.path.join(test_dir, name), "w", encoding="utf-8") as f:
+                f.write("*.log\n" if name == ".gitignore" else "return 0\n")
+        self.line_numbers_tab.code_input.setPlainText("```\nreturn 0\n```")
+
+        self.line_numbers_tab.set_ignore_rules(["*.py"], False)
+        self.line_numbers_tab.locate_in_folder(test_dir)
+        self.wait_for_locate()
+        self.assertEqual(self.line_numbers_tab.output.toPlainText(), "# build.log, lines 1-1\n1: return 0")
+
+    def test_cancel_locate(self):
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        with open(os.path.join(test_dir, "app.py"), "w", encoding="utf-8") as f:
+            f.write("def main():\n    return 0\n")
+        self.line_numbers_tab.output.setPlainText("previous")
+        self.line_numbers_tab.code_input.setPlainText("```\nreturn 0\n```")
+        self.line_numbers_tab.locate_in_folder(test_dir)
+
+        # Cancelling does not wait for the worker, and its result is dropped
+        self.line_numbers_tab.cancel_locate()
+        self.assertTrue(self.line_numbers_tab.locate_button.isEnabled())
+        self.wait_for_locate()
+        self.assertEqual(self.line_numbers_tab.output.toPlainText(), "previous")
+
     @patch('pyperclip.copy')
     def test_copy_to_clipboard(self, mock_copy):
         self.line_numbers_tab.output.setPlainText("1: test\n2: output")
@@ -0,0 +1,50 @@
+# From the root directory, run:
+# python -m unittest tests.test_mapped_lines
+
+import unittest
+from unittest.mock import patch
+import codecs
+import os
+import tempfile
+import shutil
+from src.mapped_lines import MappedLines
+
+class TestMappedLines(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.test_dir, "file.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def map_bytes(self, data):
+        with open(self.file_path, "wb") as f:
+            f.write(data)
+        return MappedLines(self.file_path)
+
+    def test_lines_match_splitlines(self):
+        for data in [b"", b"\n", b"one", b"one\ntwo", b"one\r\ntwo\r\n\nthree\n", codecs.BOM_UTF8 + b"bom\nend"]:
+            lines = self.map_bytes(data)
+            expected = data.decode("utf-8-sig").splitlines()
+            self.assertEqual(list(lines), expected)
+            self.assertEqual(len(lines), len(expected))
+            self.assertEqual(lines[:], expected)
+
+    @patch('src.mapped_lines.INDEX_CHUNK_SIZE', 7)
+    def test_lines_spanning_index_chunks(self):
+        data = b"".join(b"line %d\n" % i for i in range(100)) + b"last"
+        lines = self.map_bytes(data)
+        self.assertEqual(len(lines), 101)
+        self.assertEqual(lines[42], "line 42")
+        self.assertEqual(lines[-1], "last")
+        self.assertEqual(lines[10:13], ["line 10", "line 11", "line 12"])
+        self.assertEqual(lines.lines(99, 200), ["line 99", "last"])
+        with self.assertRaises(IndexError):
+            lines[101]
+
+    def test_utf16_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.map_bytes(codecs.BOM_UTF16_LE + "text".encode("utf-16-le"))
+
+if __name__ == '__main__':
+    unittest.main()
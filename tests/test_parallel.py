@@ -0,0 +1,47 @@
+# From the root directory, run:
+# python -m unittest tests.test_parallel
+
+import unittest
+import threading
+import time
+from src.parallel import ReaderPool
+
+class TestReaderPool(unittest.TestCase):
+    def test_map_ordered_keeps_order(self):
+        pool = ReaderPool(4)
+        # Later items finish first, but results come back in input order
+        results = list(pool.map_ordered(lambda i: (time.sleep(0.01 * (5 - i)), i)[1], range(5)))
+        self.assertEqual(results, [0, 1, 2, 3, 4])
+        pool.shutdown()
+
+    def test_map_ordered_is_bounded(self):
+        pool = ReaderPool(2)
+        started = []
+        lock = threading.Lock()
+
+        def record(i):
+            with lock:
+                started.append(i)
+            return i
+
+        results = pool.map_ordered(record, range(100), prefetch=3)
+        self.assertEqual(next(results), 0)
+        time.sleep(0.05)
+        # Only the prefetch window has been submitted
+        self.assertLessEqual(len(started), 4)
+        results.close()
+        pool.shutdown()
+
+    def test_single_worker_runs_inline(self):
+        pool = ReaderPool(1)
+        self.assertEqual(list(pool.map_ordered(lambda i: i * 2, range(3))), [0, 2, 4])
+        self.assertEqual(pool.submit(sum, [1, 2]).result(), 3)
+
+    def test_submit_reports_exceptions(self):
+        pool = ReaderPool(1)
+        future = pool.submit(int, "not a number")
+        with self.assertRaises(ValueError):
+            future.result()
+
+if __name__ == '__main__':
+    unittest.main()
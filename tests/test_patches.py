@@ -0,0 +1,132 @@
+# From the root directory, run:
+# python -m unittest tests.test_patches
+
+import unittest
+import os
+import tempfile
+import shutil
+from src.patches import apply_hunks, apply_patch_to_folder, iter_patch_lines, parse_patch
+
+class TestPatches(unittest.TestCase):
+    def setUp(self):
+        self.old = [f"line {i}" for i in range(40)]
+        self.new = self.old[:5] + ["five"] + self.old[6:20] + ["x", "y", "z"] + self.old[22:]
+
+    def test_patch_round_trip(self):
+        patch = list(iter_patch_lines(self.old, self.new, "a/file.txt", "b/file.txt"))
+        self.assertEqual(patch[:3], ["--- a/file.txt", "+++ b/file.txt", "@@ -3,7 +3,7 @@"])
+
+        patches = parse_patch("\n".join(patch))
+        self.assertEqual([(p.old_path, p.new_path, len(p.hunks)) for p in patches], [("a/file.txt", "b/file.txt", 2)])
+        self.assertEqual(apply_hunks(self.old, patches[0].hunks), (self.new, []))
+
+        # Hunks are found by content when the text has moved
+        moved = ["added"] * 7 + self.old
+        self.assertEqual(apply_hunks(moved, patches[0].hunks), (["added"] * 7 + self.new, []))
+
+    def test_imprecise_patch(self):
+        # Wrong line numbers and counts, trailing whitespace, a context line missing its space,
+        # and text around the diff
+        text = ("Here is the fix:\n"
+                "```diff\n"
+                "@@ -1,2 +1,2 @@\n"
+                " line 4  \n"
+                "-line 5\n"
+                "+five\n"
+                " line 6\n"
+                "\n"
+                "```\n")
+        lines, failed = apply_hunks(self.old, parse_patch(text)[0].hunks)
+        self.assertEqual(failed, [])
+        self.assertEqual(lines[3:7], ["line 3", "line 4", "five", "line 6"])
+
+    def test_fuzz_and_failures(self):
+        text = ("@@ -10,4 +10,4 @@\n"
+                " line 9\n"
+                "-line 10\n"
+                "+ten\n"
+                " not in the file\n"
+                "@@ -30 +30 @@\n"
+                "-missing\n"
+                "+gone\n")
+        lines, failed = apply_hunks(self.old, parse_patch(text)[0].hunks)
+        self.assertEqual(lines[9:12], ["line 9", "ten", "line 11"])
+        self.assertEqual(failed, [1])
+
+    def test_parse_patch_removed_and_added_dashes(self):
+        # "-- old" removed and "++ new" added look like a file header, but the hunk is not done yet
+        text = ("--- a/query.sql\n+++ b/query.sql\n@@ -1,3 +1,3 @@\n select 1;\n--- old\n+++ new\n select 2;\n"
+                "--- a/other.sql\n+++ b/other.sql\n@@ -1 +1 @@\n-x\n+y\n")
+        patches = parse_patch(text)
+
+        self.assertEqual([(patch.old_path, patch.new_path, len(patch.hunks)) for patch in patches],
+                         [("a/query.sql", "b/query.sql", 1), ("a/other.sql", "b/other.sql", 1)])
+        hunk = patches[0].hunks[0]
+        self.assertEqual(hunk.old_lines, ["select 1;", "-- old", "select 2;"])
+        self.assertEqual(hunk.new_lines, ["select 1;", "++ new", "select 2;"])
+
+    def test_apply_patch_to_folder(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        os.makedirs(os.path.join(folder, "src"))
+        with open(os.path.join(folder, "src", "file.txt"), "w", newline="") as f:
+            f.write("\r\n".join(self.old) + "\r\n")
+        with open(os.path.join(folder, "old.txt"), "w") as f:
+            f.write("remove me\n")
+
+        text = "\n".join(list(iter_patch_lines(self.old, self.new, "a/src/file.txt", "b/src/file.txt")) +
+                         list(iter_patch_lines(["remove me"], [], "a/old.txt", None)) +
+                         list(iter_patch_lines([], ["created"], None, "b/src/new.txt")))
+        results = apply_patch_to_folder(folder, parse_patch(text))
+
+        self.assertEqual([(r.path, r.applied, r.failed, r.error) for r in results],
+                         [("a/src/file.txt", 2, [], None), ("a/old.txt", 1, [], None), ("b/src/new.txt", 1, [], None)])
+        with open(os.path.join(folder, "src", "file.txt"), newline="") as f:
+            self.assertEqual(f.read(), "\r\n".join(self.new) + "\r\n")
+        self.assertFalse(os.path.exists(os.path.join(folder, "old.txt")))
+        with open(os.path.join(folder, "src", "new.txt")) as f:
+            self.assertEqual(f.read(), "created\n")
+
+    def test_apply_patch_to_folder_paths(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        folder = os.path.join(root, "project")
+        os.makedirs(os.path.join(folder, "src"))
+        with open(os.path.join(folder, "src", "file.txt"), "w") as f:
+            f.write("\n".join(self.old) + "\n")
+        with open(os.path.join(root, "outside.txt"), "w") as f:
+            f.write("keep me\n")
+
+        # New files lose as many directories as the existing ones, even where no directory exists yet
+        text = "\n".join(list(iter_patch_lines(self.old, self.new, "a/src/file.txt", "b/src/file.txt")) +
+                         list(iter_patch_lines([], ["created"], None, "b/newpkg/mod.py")) +
+                         list(iter_patch_lines([], ["escaped"], None, "b/../escape.txt")) +
+                         list(iter_patch_lines(["keep me"], [], "a/../outside.txt", None)))
+        results = apply_patch_to_folder(folder, parse_patch(text))
+
+        self.assertEqual([(r.path, r.applied, r.error) for r in results],
+                         [("a/src/file.txt", 2, None), ("b/newpkg/mod.py", 1, None),
+                          ("b/../escape.txt", 0, "Path is outside the folder"),
+                          ("a/../outside.txt", 0, "Path is outside the folder")])
+        with open(os.path.join(folder, "newpkg", "mod.py")) as f:
+            self.assertEqual(f.read(), "created\n")
+        self.assertFalse(os.path.exists(os.path.join(root, "escape.txt")))
+        self.assertFalse(os.path.exists(os.path.join(root, "mod.py")))
+        with open(os.path.join(root, "outside.txt")) as f:
+            self.assertEqual(f.read(), "keep me\n")
+
+    def test_apply_patch_to_folder_keeps_untouched_lines(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        with open(os.path.join(folder, "page.txt"), "w", newline="") as f:
+            f.write("one\r\ntwo\nb\x0cc\nthree\u2028four\nfive\r\n")
+
+        text = "\n".join(iter_patch_lines(["one", "two", "b\x0cc"], ["one", "2", "b\x0cc"], "a/page.txt", "b/page.txt"))
+        results = apply_patch_to_folder(folder, parse_patch(text))
+
+        self.assertEqual([(r.applied, r.failed) for r in results], [(1, [])])
+        with open(os.path.join(folder, "page.txt"), newline="") as f:
+            self.assertEqual(f.read(), "one\r\n2\nb\x0cc\nthree\u2028four\nfive\r\n")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -37,33 +37,45 @@ class TestSettingsDialog(unittest.TestCase):
     def test_load_settings_default(self, mock_qsettings):
         # Mock QSettings to return default values
         mock_settings = MagicMock()
-        mock_settings.value.side_effect = ["Light", "3", True]
+        mock_settings.value.side_effect = ["Light", "3", 4, True, "*.log", True, 1]
         mock_qsettings.return_value = mock_settings
 
         dialog = SettingsDialog()
 
         self.assertEqual(dialog.theme_combo.currentText(), "Light")
         self.assertEqual(dialog.depth_combo.currentText(), "3")
+        self.assertEqual(dialog.reader_workers_spin.value(), 4)
+        self.assertTrue(dialog.use_gitignore_check.isChecked())
+        self.assertEqual(dialog.ignore_patterns_edit.toPlainText(), "*.log")
         self.assertTrue(dialog.auto_update_check.isChecked())
+        self.assertEqual(dialog.update_interval_spin.value(), 1)
 
     @patch('src.settings.QSettings')
     def test_load_settings_custom(self, mock_qsettings):
         # Mock QSettings to return custom values
         mock_settings = MagicMock()
-        mock_settings.value.side_effect = ["Dark", "5", False]
+        mock_settings.value.side_effect = ["Dark", "5", 8, False, "build/\ndist/", False, 7]
         mock_qsettings.return_value = mock_settings
 
         dialog = SettingsDialog()
 
         self.assertEqual(dialog.theme_combo.currentText(), "Dark")
         self.assertEqual(dialog.depth_combo.currentText(), "5")
+        self.assertEqual(dialog.reader_workers_spin.value(), 8)
+        self.assertFalse(dialog.use_gitignore_check.isChecked())
+        self.assertEqual(dialog.ignore_patterns_edit.toPlainText(), "build/\ndist/")
         self.assertFalse(dialog.auto_update_check.isChecked())
+        self.assertEqual(dialog.update_interval_spin.value(), 7)
 
     def test_save_settings(self):
         # Set up the dialog with some values
         self.dialog.theme_combo.setCurrentText("Dark")
         self.dialog.depth_combo.setCurrentText("7")
+        self.dialog.reader_workers_spin.setValue(6)
+        self.dialog.use_gitignore_check.setChecked(False)
+        self.dialog.ignore_patterns_edit.setPlainText("*.tmp")
         self.dialog.auto_update_check.setChecked(False)
+        self.dialog.update_interval_spin.setValue(14)
 
         # Call save_settings
         self.dialog.save_settings()
@@ -71,7 +83,11 @@ class TestSettingsDialog(unittest.TestCase):
         # Check that QSettings.setValue was called with the correct values
         self.mock_settings.setValue.assert_any_call("theme", "Dark")
         self.mock_settings.setValue.assert_any_call("default_depth", "7")
+        self.mock_settings.setValue.assert_any_call("reader_workers", 6)
+        self.mock_settings.setValue.assert_any_call("use_gitignore", False)
+        self.mock_settings.setValue.assert_any_call("ignore_patterns", "*.tmp")
         self.mock_settings.setValue.assert_any_call("auto_update", False)
+        self.mock_settings.setValue.assert_any_call("update_interval_days", 14)
 
     @patch('src.settings.QSettings')
     def test_accept_calls_save_settings(self, mock_qsettings):
@@ -0,0 +1,58 @@
+# From the root directory, run:
+# python -m unittest tests.test_snippet_batch
+
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+import shutil
+from src.snippet_batch import SnippetLocation, iter_folder_files, locate_snippets, parse_code_blocks
+
+class TestSnippetBatch(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.write("src/app.py", "import os\n\ndef main():\n    print('hello')\n    return 0\n")
+        self.write("src/util.py", "def helper():\n    return 0\n")
+        self.write("lib/copy.py", "def main():\n    print('hello')\n")
+        self.write("image.png", "\0\1\2")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, name, text):
+        path = os.path.join(self.test_dir, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_parse_code_blocks(self):
+        text = ("Change this:\n```python\ndef main():\n    pass\n```\nand this:\n"
+                "~~~~\nx = 1\n```\nstill inside\n~~~~\n```\n\n```\n```js\nunclosed();")
+        self.assertEqual(parse_code_blocks(text), ["def main():\n    pass", "x = 1\n```\nstill inside", "unclosed();"])
+
+        # Text without fences is a single snippet
+        self.assertEqual(parse_code_blocks("a\nb"), ["a\nb"])
+        self.assertEqual(parse_code_blocks("  \n"), [])
+
+    def test_locate_snippets(self):
+        snippets = ["def main():\n  print('hello')", "return 0", "not anywhere"]
+        files = list(iter_folder_files(self.test_dir))
+        expected = [
+            [SnippetLocation("lib/copy.py", 1, 2), SnippetLocation("src/app.py", 3, 4)],
+            [SnippetLocation("src/app.py", 5, 5), SnippetLocation("src/util.py", 2, 2)],
+            [],
+        ]
+        self.assertEqual(locate_snippets(snippets, files, workers=1), expected)
+
+        # Split across worker processes, one file per task
+        with patch('src.snippet_batch.FILES_PER_TASK', 1):
+            self.assertEqual(locate_snippets(snippets, files, workers=2), expected)
+
+    def test_locate_snippets_cancelled(self):
+        files = list(iter_folder_files(self.test_dir))
+        with patch('src.snippet_batch.FILES_PER_TASK', 1):
+            self.assertIsNone(locate_snippets(["return 0"], files, workers=1, cancelled=lambda: True))
+            self.assertIsNone(locate_snippets(["return 0"], files, workers=2, cancelled=lambda: True))
+
+if __name__ == '__main__':
+    unittest.main()
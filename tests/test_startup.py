@@ -0,0 +1,104 @@
+# From the root directory, run:
+# python -m unittest tests.test_startup
+
+import unittest
+from unittest.mock import patch
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from PyQt5.QtWidgets import QApplication
+from src.file_index import FileIndex
+from src.main import MainWindow
+
+# Generous bound on importing the application and painting its window, to catch large regressions
+STARTUP_BUDGET_SECONDS = 5
+
+# Modules that are only needed once a feature is used
+DEFERRED_MODULES = ["requests", "pyperclip", "difflib", "src.line_numbers", "src.diff_viewer", "src.settings"]
+
+# Measures a cold start in a fresh interpreter, without the automatic update check
+STARTUP_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+import src.main
+imported = time.perf_counter()
+app = QApplication([])
+src.main.MainWindow.auto_check_updates = lambda self: None
+window = src.main.MainWindow()
+window.show()
+window.grab()
+app.processEvents()
+painted = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "first_paint": painted - start,
+    "loaded": [name for name in {DEFERRED_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+class TestStartup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_cold_startup(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+        # Keep the file index the window opens out of the user's data directory
+        data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, data_dir)
+        env["XDG_DATA_HOME"] = env["LOCALAPPDATA"] = data_dir
+        result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=root, env=env,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+        self.assertEqual(timings["loaded"], [])
+        self.assertLess(timings["first_paint"], STARTUP_BUDGET_SECONDS,
+                        f"import {timings['import'] * 1000:.0f} ms, first paint {timings['first_paint'] * 1000:.0f} ms")
+
+    @patch.object(FileIndex, 'open_default', FileIndex)
+    @patch.object(MainWindow, 'auto_check_updates')
+    def test_tabs_are_created_when_shown(self, mock_auto_check):
+        window = MainWindow()
+        self.assertIsNotNone(window.folder_structure_tab)
+        self.assertIsNone(window.line_numbers_tab)
+        self.assertIsNone(window.diff_viewer_tab)
+
+        window.tabs.setCurrentIndex(2)
+        self.assertIsNotNone(window.diff_viewer_tab)
+        self.assertIs(window.tabs.widget(2).layout().itemAt(0).widget(), window.diff_viewer_tab)
+
+        # The tabs share the file index, and settings reach tabs created after they were loaded
+        self.assertIs(window.diff_viewer_tab.file_index, window.folder_structure_tab.file_index)
+        self.assertEqual(window.diff_viewer_tab.ignore_patterns, window.ignore_patterns)
+        self.assertIsNone(window.line_numbers_tab)
+
+    @patch.object(MainWindow, 'auto_check_updates')
+    def test_close_writes_file_index(self, mock_auto_check):
+        data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, data_dir)
+        file_path = os.path.join(data_dir, "file.txt")
+        with open(file_path, "w") as f:
+            f.write("one\ntwo\n")
+        db_path = os.path.join(data_dir, "index.db")
+
+        with patch.object(FileIndex, 'open_default', lambda: FileIndex(db_path)):
+            window = MainWindow()
+            window.file_index.get_for_path(file_path)
+            window.close()
+
+        # The record was still waiting for a full batch, and closing the window wrote it
+        index = FileIndex(db_path)
+        self.addCleanup(index.close)
+        with patch('src.file_index.read_file_info') as mock_read:
+            self.assertEqual(index.get_for_path(file_path).lines, 2)
+        mock_read.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
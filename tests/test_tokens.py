@@ -0,0 +1,39 @@
+# From the root directory, run:
+# python -m unittest tests.test_tokens
+
+import unittest
+from src.tokens import (FIT_LARGEST_FIRST, FIT_LOWEST_PRIORITY_FIRST, estimate_tokens,
+                        file_priority, select_files_to_drop)
+
+class TestTokens(unittest.TestCase):
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(b""), 0)
+        self.assertEqual(estimate_tokens("def example():\n    pass"), 7)
+        # Long numbers are split into groups of three digits
+        self.assertEqual(estimate_tokens(b"1234567"), 3)
+        # Long words count more than one token
+        self.assertEqual(estimate_tokens(b"internationalization"), 4)
+
+    def test_estimate_tokens_str_and_bytes_agree(self):
+        text = "naïve café = {'a': 1}"
+        self.assertEqual(estimate_tokens(text), estimate_tokens(text.encode("utf-8")))
+
+    def test_file_priority(self):
+        self.assertEqual(file_priority("project/package-lock.json"), 0)
+        self.assertEqual(file_priority("project/Cargo.lock"), 0)
+        self.assertEqual(file_priority("project/static/app.min.js"), 0)
+        self.assertEqual(file_priority("project/README.md"), 1)
+        self.assertEqual(file_priority("project/src/main.py"), 2)
+
+    def test_select_files_to_drop_largest_first(self):
+        files = [("a", "a.py", 100), ("b", "b.py", 300), ("c", "c.py", 200)]
+        self.assertEqual(select_files_to_drop(files, 600, 1000, FIT_LARGEST_FIRST), [])
+        self.assertEqual(select_files_to_drop(files, 600, 350, FIT_LARGEST_FIRST), ["b"])
+        self.assertEqual(select_files_to_drop(files, 600, 150, FIT_LARGEST_FIRST), ["b", "c"])
+
+    def test_select_files_to_drop_lowest_priority_first(self):
+        files = [("code", "main.py", 500), ("lock", "yarn.lock", 100), ("docs", "README.md", 200)]
+        self.assertEqual(select_files_to_drop(files, 800, 550, FIT_LOWEST_PRIORITY_FIRST), ["lock", "docs"])
+
+if __name__ == '__main__':
+    unittest.main()
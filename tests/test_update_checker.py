@@ -3,15 +3,24 @@
 
 import unittest
 from unittest.mock import patch, MagicMock
+import json
+import os
+import tempfile
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
 from PyQt5.QtWidgets import QApplication, QMessageBox
-from src.update_checker import check_for_updates, CURRENT_VERSION
+from src.update_checker import (check_for_updates, fetch_latest_version, is_check_due, is_newer_version,
+                                UpdateCheckWorker, CURRENT_VERSION)
 
 class TestUpdateChecker(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         cls.app = QApplication([])
 
-    @patch('src.update_checker.requests.get')
+    @patch('requests.get')
     @patch('src.update_checker.QMessageBox.information')
     def test_update_available(self, mock_message_box, mock_get):
         # Mock the API response
@@ -30,7 +39,7 @@ class TestUpdateChecker(unittest.TestCase):
             "A new version (2.0.0) is available. Please visit the GitHub repository to download the latest version."
         )
 
-    @patch('src.update_checker.requests.get')
+    @patch('requests.get')
     @patch('src.update_checker.QMessageBox.information')
     def test_no_update_available(self, mock_message_box, mock_get):
         # Mock the API response
@@ -49,7 +58,7 @@ class TestUpdateChecker(unittest.TestCase):
             "You are using the latest version."
         )
 
-    @patch('src.update_checker.requests.get')
+    @patch('requests.get')
     @patch('src.update_checker.QMessageBox.warning')
     def test_request_exception(self, mock_message_box, mock_get):
         # Mock a request exception
@@ -65,7 +74,7 @@ class TestUpdateChecker(unittest.TestCase):
             "Failed to check for updates: Connection error"
         )
 
-    @patch('src.update_checker.requests.get')
+    @patch('requests.get')
     @patch('src.update_checker.QMessageBox.warning')
     def test_invalid_json_response(self, mock_message_box, mock_get):
         # Mock an invalid JSON response
@@ -84,7 +93,7 @@ class TestUpdateChecker(unittest.TestCase):
             "Failed to check for updates: Invalid JSON"
         )
 
-    @patch('src.update_checker.requests.get')
+    @patch('requests.get')
     @patch('src.update_checker.QMessageBox.warning')
     def test_missing_tag_name(self, mock_message_box, mock_get):
         # Mock a response missing the tag_name
@@ -103,7 +112,7 @@ class TestUpdateChecker(unittest.TestCase):
             "Failed to check for updates: 'tag_name'"
         )
 
-    @patch('src.update_checker.requests.get')
+    @patch('requests.get')
     @patch('src.update_checker.QMessageBox.information')
     def test_with_parent_widget(self, mock_message_box, mock_get):
         # Mock the API response
@@ -125,7 +134,110 @@ class TestUpdateChecker(unittest.TestCase):
             "A new version (2.0.0) is available. Please visit the GitHub repository to download the latest version."
         )
 
+    def test_semantic_versions(self):
+        self.assertTrue(is_newer_version("1.10.0", "1.9.0"))
+        self.assertTrue(is_newer_version("v1.0.1", "1.0.0"))
+        self.assertTrue(is_newer_version("1.0.0", "1.0.0-rc.2"))
+        self.assertTrue(is_newer_version("1.0.0-rc.10", "1.0.0-rc.2"))
+        self.assertFalse(is_newer_version("1.0", "1.0.0"))
+        self.assertFalse(is_newer_version("1.0.0+build.5", "1.0.0"))
+        self.assertFalse(is_newer_version("0.9.12", CURRENT_VERSION))
+
     # ... (other test methods)
 
+class ReleaseHandler(BaseHTTPRequestHandler):
+    # Answers like the GitHub releases API, with an ETag, and waits delay seconds first
+    etag = '"release-2"'
+    delay = 0
+    requests_seen = []
+
+    def do_GET(self):
+        ReleaseHandler.requests_seen.append(self.headers.get("If-None-Match"))
+        time.sleep(ReleaseHandler.delay)
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps({"tag_name": "v2.0.0"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestUpdateServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ReleaseHandler)
+        cls.server.daemon_threads = True
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/releases/latest"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.test_dir, "update_check.json")
+        ReleaseHandler.delay = 0
+        ReleaseHandler.requests_seen = []
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_conditional_requests(self):
+        self.assertEqual(fetch_latest_version(self.url, cache_path=self.cache_path), "v2.0.0")
+        # The second check revalidates the cached release and gets a 304
+        self.assertEqual(fetch_latest_version(self.url, cache_path=self.cache_path), "v2.0.0")
+        self.assertEqual(ReleaseHandler.requests_seen, [None, '"release-2"'])
+
+    def test_check_is_throttled(self):
+        self.assertTrue(is_check_due(1, self.cache_path))
+        fetch_latest_version(self.url, cache_path=self.cache_path)
+        self.assertFalse(is_check_due(1, self.cache_path))
+
+        with open(self.cache_path, encoding="utf-8") as f:
+            cache = json.load(f)
+        cache["checked_at"] -= 2 * 86400
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        self.assertTrue(is_check_due(1, self.cache_path))
+        self.assertFalse(is_check_due(3, self.cache_path))
+
+    def test_timeout(self):
+        ReleaseHandler.delay = 1
+        with self.assertRaises(requests.Timeout):
+            fetch_latest_version(self.url, timeout=0.2)
+
+    def test_worker(self):
+        results = []
+        worker = UpdateCheckWorker(self.url, cache_path=self.cache_path)
+        worker.finished.connect(lambda latest, error: results.append((latest, error)))
+        worker.run()
+        self.assertEqual(results, [("v2.0.0", "")])
+
+        ReleaseHandler.delay = 1
+        worker = UpdateCheckWorker(self.url, timeout=0.2)
+        worker.finished.connect(lambda latest, error: results.append((latest, error)))
+        worker.run()
+        self.assertIsNone(results[1][0])
+        self.assertIn("timed out", results[1][1])
+
+    @patch('src.update_checker.QMessageBox.information')
+    def test_check_for_updates_with_cache(self, mock_message_box):
+        with patch('src.update_checker.UPDATE_URL', self.url):
+            check_for_updates(None, self.cache_path)
+            check_for_updates(None, self.cache_path)
+        self.assertEqual(mock_message_box.call_count, 2)
+        self.assertEqual(mock_message_box.call_args[0][1], "Update Available")
+        self.assertEqual(ReleaseHandler.requests_seen, [None, '"release-2"'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file